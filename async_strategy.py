@@ -0,0 +1,313 @@
+# async_strategy.py
+"""
+Agrégation asynchrone bufferisée (style FedBuff) à côté de MyCustomFedAvg.
+
+- Chaque client est relancé dès qu'il rend son résultat (pas de barrière de round).
+- Les mises à jour (delta par rapport à la version reçue) sont accumulées dans un buffer ;
+  dès que K mises à jour sont arrivées, l'agrégat est appliqué et une nouvelle version
+  globale est produite.
+- Chaque mise à jour est pondérée par num_examples * (1 + staleness)^(-alpha),
+  où staleness = version_courante - version_reçue par le client.
+- Chaque buffer appliqué reçoit son checkpoint et son export ZKP + engagements (round<version>).
+- Les clients connectés en cours de route sont relancés dès leur arrivée ; un client en échec
+  n'est relancé qu'après un délai croissant (FEDBUFF_RETRY_BASE .. FEDBUFF_RETRY_MAX secondes).
+"""
+import os
+import time
+import concurrent.futures
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from flwr.common import FitIns, Code, parameters_to_ndarrays, ndarrays_to_parameters
+from flwr.server import Server
+from flwr.server.history import History
+
+from strategy import MyCustomFedAvg
+from utils.checkpoints import save_checkpoint
+from utils.logging_utils import log_metrics
+
+POLL_INTERVAL = float(os.environ.get("FEDBUFF_POLL", "1.0"))         # sondage des nouveaux clients
+RETRY_BASE    = float(os.environ.get("FEDBUFF_RETRY_BASE", "1.0"))   # délai après un premier échec
+RETRY_MAX     = float(os.environ.get("FEDBUFF_RETRY_MAX", "60.0"))
+SHUTDOWN_GRACE = float(os.environ.get("FEDBUFF_SHUTDOWN_GRACE", "30.0"))   # attente des résultats en vol en fin de fit
+
+
+class FedBuffStrategy(MyCustomFedAvg):
+    def __init__(self, buffer_size=2, staleness_alpha=0.5, server_lr=1.0, max_staleness=None, **kwargs):
+        super().__init__(**kwargs)
+        if buffer_size < 1:
+            raise ValueError("[FEDBUFF] buffer_size doit être >= 1")
+        self.buffer_size = int(buffer_size)
+        self.staleness_alpha = float(staleness_alpha)
+        self.server_lr = float(server_lr)
+        self.max_staleness = max_staleness
+
+        self.version = 0
+        self._versions: Dict[int, List[np.ndarray]] = {}   # version -> ndarrays (références en vol)
+        self._version_digest: Optional[Tuple[int, str]] = None   # (version, empreinte) du modèle courant
+        self._in_flight: Dict[int, int] = {}               # version -> nb de clients en cours
+        self._reset_buffer()
+
+        self.applied_updates = 0
+        self.dropped_updates = 0
+        self._t0 = None
+
+    # ---------------------------------------------------------------
+    # Versions du modèle global
+    # ---------------------------------------------------------------
+    def start(self, parameters) -> None:
+        """Initialise la version 0 à partir des paramètres initiaux du serveur."""
+        self.version = 0
+        self._versions = {0: parameters_to_ndarrays(parameters)}
+        self._version_digest = None
+        self._in_flight = {}
+        self._reset_buffer()
+        self._t0 = time.time()
+
+    def current_parameters(self):
+        return ndarrays_to_parameters(self._versions[self.version])
+
+    def fit_ins_for_client(self, client_proxy) -> Tuple[FitIns, int]:
+        """Instruction de fit pour UN client sur la dernière version ; retourne (FitIns, version)."""
+        config = {}
+        if self.on_fit_config_fn is not None:
+            config = self.on_fit_config_fn(self.version)
+        self._fit_config(config)
+        if self.scheduler is not None:
+            # pas d'attente de round en asynchrone : le budget limite la durée (et donc la staleness)
+            config.update(self.scheduler.budget(client_proxy.cid, self.scheduler.deadline(self.version)))
+        config["model_version"] = self.version
+        self._in_flight[self.version] = self._in_flight.get(self.version, 0) + 1
+        ins = FitIns(self.current_parameters(), config)
+        [(_, ins)] = self._skip_transfer([(client_proxy, ins)], self._current_digest(), FitIns)
+        return ins, self.version
+
+    def _current_digest(self) -> Optional[str]:
+        """Empreinte de la version courante (écrite dans le store au premier besoin) ; None en mode full."""
+        if self.model_transfer == "full":
+            return None
+        if self._version_digest is None or self._version_digest[0] != self.version:
+            try:
+                self._version_digest = (self.version, save_checkpoint(self._versions[self.version]))
+            except Exception as e:
+                print(f"[CKPT] Version {self.version} non écrite dans le store, envoi complet: {e}")
+                return None
+        return self._version_digest[1]
+
+    def release(self, base_version: int) -> None:
+        """Libère une référence sur une version ; purge les versions plus utilisées."""
+        left = self._in_flight.get(base_version, 0) - 1
+        if left > 0:
+            self._in_flight[base_version] = left
+        else:
+            self._in_flight.pop(base_version, None)
+            if base_version != self.version:
+                self._versions.pop(base_version, None)
+
+    # ---------------------------------------------------------------
+    # Buffer
+    # ---------------------------------------------------------------
+    def _reset_buffer(self) -> None:
+        self._acc = None            # somme pondérée des deltas (float64)
+        self._wsum = 0.0
+        self._buffer_meta = []      # (num_examples, metrics, staleness)
+        self._exported = []         # (client_id, num_examples, tenseurs float32, engagement) — 2 premiers
+        self._wire_bytes = 0
+        self._raw_bytes = 0
+
+    def _staleness_weight(self, num_examples: int, staleness: int) -> float:
+        return float(num_examples) * (1.0 + staleness) ** (-self.staleness_alpha)
+
+    def submit(self, fit_res, base_version: int) -> Optional[Dict]:
+        """
+        Ajoute une mise à jour au buffer (accumulation immédiate, en flux).
+        Retourne les métriques du buffer si un nouvel agrégat a été appliqué, sinon None.
+        """
+        base = self._versions[base_version]
+        staleness = self.version - base_version
+        try:
+            if self.max_staleness is not None and staleness > self.max_staleness:
+                self.dropped_updates += 1
+                print(f"[FEDBUFF] Mise à jour ignorée (staleness={staleness} > {self.max_staleness})")
+                return None
+
+            nds, wire, raw = self._decode_fit_res(fit_res, base=base)
+            self._wire_bytes += wire
+            self._raw_bytes += raw
+            n = int(fit_res.num_examples)
+            w = self._staleness_weight(n, staleness)
+
+            if self._acc is None:
+                self._acc = np.zeros(sum(x.size for x in nds), dtype=np.float64)
+            off = 0
+            for x, b in zip(nds, base):
+                v = x.ravel()
+                self._acc[off:off + v.size] += (v.astype(np.float64) - b.ravel()) * w
+                off += v.size
+            if len(self._exported) < 2:
+                # tenseurs décodés conservés tels quels (pas de copie) pour l'export ZKP en flux
+                cid = (fit_res.metrics or {}).get("client_id", "unknown")
+                self._exported.append((cid, n, nds, self._client_commitment(fit_res.metrics)))
+            self._wsum += w
+            self._buffer_meta.append((n, fit_res.metrics or {}, staleness))
+        finally:
+            self.release(base_version)
+
+        if len(self._buffer_meta) >= self.buffer_size:
+            return self._apply_buffer()
+        return None
+
+    def _apply_buffer(self) -> Dict:
+        """Applique le buffer : global += server_lr * moyenne pondérée des deltas ; nouvelle version."""
+        current = self._versions[self.version]
+        step = self._acc * (self.server_lr / self._wsum) if self._wsum > 0 else self._acc
+        new_version = self.version + 1
+        new_flat = np.empty(step.size, dtype=np.float32)
+        new_nds, off = [], 0
+        for b in current:
+            size = b.size
+            new_flat[off:off + size] = b.ravel() + step[off:off + size]
+            new_nds.append(new_flat[off:off + size].reshape(b.shape))
+            off += size
+        del step
+
+        # Checkpoint de la nouvelle version (warm start de la session suivante, envoi par empreinte)
+        digest = self._save_checkpoint(new_version, new_nds)
+
+        # Export ZKP + engagements pour ce buffer (tri stable par client_id comme en synchrone)
+        try:
+            if len(self._exported) == 2:
+                exported = sorted(self._exported, key=lambda e: e[0])
+                self._export_round(new_version, exported, new_flat)
+        except Exception as e:
+            print(f"[ZKP] Erreur sauvegarde/export/prove version {new_version}: {e}")
+
+        metrics = self._weighted_fit_metrics([(n, m) for n, m, _ in self._buffer_meta])
+        stalenesses = [s for _, _, s in self._buffer_meta]
+        self.applied_updates += len(self._buffer_meta)
+        elapsed_min = max((time.time() - self._t0) / 60.0, 1e-9)
+        metrics.update({
+            "model_version": new_version,
+            "buffer_size": len(self._buffer_meta),
+            "staleness_mean": float(np.mean(stalenesses)),
+            "staleness_max": int(max(stalenesses)),
+            "update_bytes": self._wire_bytes,
+            "update_bytes_raw": self._raw_bytes,
+            "updates_per_min": self.applied_updates / elapsed_min,
+        })
+        log_metrics(self.log_file, new_version, metrics, None)
+        print(
+            f"[FEDBUFF] Version {new_version} appliquée ({len(self._buffer_meta)} mises à jour, "
+            f"staleness moy. {metrics['staleness_mean']:.2f}) — {metrics['updates_per_min']:.1f} updates/min"
+        )
+
+        # Nouvelle version ; l'ancienne n'est conservée que si des clients l'utilisent encore
+        old_version = self.version
+        self._versions[new_version] = new_nds
+        self.version = new_version
+        if digest is not None:
+            self._version_digest = (new_version, digest)
+        if self._in_flight.get(old_version, 0) == 0:
+            self._versions.pop(old_version, None)
+        self._reset_buffer()
+        return metrics
+
+
+class AsyncBufferedServer(Server):
+    """
+    Serveur Flower asynchrone : relance chaque client dès réception de son résultat
+    et applique le buffer de FedBuffStrategy tous les K résultats.
+    `num_rounds` = nombre de versions globales à produire.
+    """
+
+    def __init__(self, *, client_manager, strategy: FedBuffStrategy):
+        super().__init__(client_manager=client_manager, strategy=strategy)
+
+    def fit(self, num_rounds: int, timeout: Optional[float]):
+        history = History()
+        strategy: FedBuffStrategy = self.strategy
+
+        self.parameters = self._get_initial_parameters(server_round=0, timeout=timeout)
+        strategy.start(self.parameters)
+        self._client_manager.wait_for(strategy.min_available_clients)
+
+        start_time = time.time()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        in_flight = {}
+        busy = set()
+        errors: Dict[str, int] = {}          # cid -> échecs consécutifs
+        retry_at: Dict[str, float] = {}      # cid -> relance pas avant
+
+        def dispatch(proxy):
+            ins, base_version = strategy.fit_ins_for_client(proxy)
+            fut = executor.submit(proxy.fit, ins, timeout, None)
+            in_flight[fut] = (proxy, base_version)
+            busy.add(proxy.cid)
+
+        def dispatch_idle():
+            """Relance les clients inoccupés (dont les nouveaux connectés) hors délai de reprise."""
+            now = time.time()
+            for cid, proxy in list(self._client_manager.all().items()):
+                if cid not in busy and retry_at.get(cid, 0.0) <= now:
+                    dispatch(proxy)
+
+        dispatch_idle()
+        while strategy.version < num_rounds and (in_flight or self._client_manager.num_available() > 0):
+            if not in_flight:
+                # tous les clients en délai de reprise
+                time.sleep(POLL_INTERVAL)
+                dispatch_idle()
+                continue
+            done, _ = concurrent.futures.wait(
+                in_flight, timeout=POLL_INTERVAL, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for fut in done:
+                proxy, base_version = in_flight.pop(fut)
+                busy.discard(proxy.cid)
+                try:
+                    res = fut.result()
+                    ok = res.status.code == Code.OK
+                except Exception as e:
+                    print(f"[FEDBUFF] Échec fit client {proxy.cid}: {e}")
+                    res, ok = None, False
+
+                strategy.note_client_model(proxy.cid, (res.metrics or {}) if ok else None)
+                if ok:
+                    errors.pop(proxy.cid, None)
+                    retry_at.pop(proxy.cid, None)
+                    strategy.note_fit_stats(proxy.cid, res)
+                    metrics = strategy.submit(res, base_version)
+                    if metrics is not None:
+                        history.add_metrics_distributed_fit(server_round=strategy.version, metrics=metrics)
+                        self.parameters = strategy.current_parameters()
+                        ev = strategy.evaluate(strategy.version, parameters=self.parameters)
+                        if ev is not None:
+                            loss, eval_metrics = ev
+                            history.add_loss_centralized(server_round=strategy.version, loss=loss)
+                            history.add_metrics_centralized(server_round=strategy.version, metrics=eval_metrics)
+                else:
+                    strategy.release(base_version)
+                    errors[proxy.cid] = errors.get(proxy.cid, 0) + 1
+                    delay = min(RETRY_MAX, RETRY_BASE * 2 ** (errors[proxy.cid] - 1))
+                    retry_at[proxy.cid] = time.time() + delay
+                    print(f"[FEDBUFF] Client {proxy.cid} : {errors[proxy.cid]} échec(s) consécutif(s), relance dans {delay:.0f}s")
+
+            # clients ayant rendu leur résultat, nouveaux connectés, délais de reprise écoulés
+            # (un client déconnecté n'apparaît plus dans all() : pas de relance)
+            if strategy.version < num_rounds:
+                dispatch_idle()
+
+        # Résultats encore en vol : attendus (au plus timeout, ou SHUTDOWN_GRACE sans timeout) puis ignorés ;
+        # un client bloqué ou déconnecté ne retient pas l'arrêt du serveur
+        _, pending = concurrent.futures.wait(in_flight, timeout=timeout if timeout is not None else SHUTDOWN_GRACE)
+        if pending:
+            print(f"[FEDBUFF] {len(pending)} résultat(s) encore en vol abandonné(s) : "
+                  f"{', '.join(in_flight[f][0].cid for f in pending)}")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        elapsed = time.time() - start_time
+        print(
+            f"[FEDBUFF] {strategy.version} versions, {strategy.applied_updates} mises à jour appliquées "
+            f"en {elapsed:.1f}s ({60.0 * strategy.applied_updates / max(elapsed, 1e-9):.1f} updates/min)"
+        )
+        return history, elapsed
@@ -1,10 +1,13 @@
+import time
 import flwr as fl
 import torch
 import torch.nn as nn
 import torch.optim as optim
+from utils.update_codec import encode_update, payload_nbytes, DEFAULT_TOPK_RATIO
+from utils.checkpoints import HeldModel
 #from utils.federation import save_weights
 
-class FLClient(fl.client.NumPyClient):
+class FLClient(HeldModel, fl.client.NumPyClient):
 	def __init__(self, model, train_loader, val_loader, device, peer_id="client_unokwn"):
 		self.model = model
 		self.train_loader = train_loader
@@ -12,6 +15,8 @@ class FLClient(fl.client.NumPyClient):
 		self.device = device
 		self.criterion = nn.CrossEntropyLoss()
 		self.peer_id = peer_id
+		self.residual = None    # rétroaction d'erreur du codec (modes avec perte)
+		self.held = None        # (empreinte, ndarrays) du dernier modèle global reçu
 
 	# récupère les poids de modèle local
 	def get_parameters(self, config):
@@ -24,7 +29,10 @@ class FLClient(fl.client.NumPyClient):
 		self.model.load_state_dict(state_dict, strict = True)
 
 	def fit(self, parameters, config):
+		parameters = self.resolve_model(parameters, config)
 		self.set_parameters(parameters)  
+		codec = config.get("codec", "none")
+		t_start = time.perf_counter()
 
 		optimizer = optim.SGD(self.model.parameters(), lr = config.get("lr", 0.01))
 
@@ -33,9 +41,16 @@ class FLClient(fl.client.NumPyClient):
 		total_loss = 0
 		correct = 0
 		total = 0
+		# budget de pas fixé par l'ordonnanceur du serveur (0 : époques complètes)
+		max_steps = int(config.get("max_steps", 0))
+		steps = 0
 
 		for epoch in range(config.get("epochs", 3)):
+			if max_steps and steps >= max_steps:
+				break
 			for batch_idx, (data, target) in enumerate(self.train_loader):
+				if max_steps and steps >= max_steps:
+					break
 				data, target = data.to(self.device), target.to(self.device)
 				optimizer.zero_grad()
 				output = self.model(data)
@@ -47,15 +62,56 @@ class FLClient(fl.client.NumPyClient):
 				preds = output.argmax(dim = 1)
 				correct += (target == preds).sum().item()
 				total += target.size(0)
+				steps += 1
 
 
 		loss = total_loss / total
 		accuracy = correct / total
-
-
-		return (self.get_parameters({}), len(self.train_loader.dataset), {"loss": loss, "accuracy": accuracy, "client_id": self.peer_id})
+		fit_time = time.perf_counter() - t_start
+
+		# encodage de la mise à jour (delta / fp16 / int8 / topk) par rapport au global reçu
+		weights = self.get_parameters({})
+		payload, self.residual = encode_update(
+			weights,
+			parameters,
+			codec,
+			residual = self.residual,
+			topk_ratio = float(config.get("topk_ratio", DEFAULT_TOPK_RATIO)),
+		)
+
+		metrics = {
+			"loss": loss,
+			"accuracy": accuracy,
+			"client_id": self.peer_id,
+			"fit_time": fit_time,
+			"samples_per_sec": total / fit_time if fit_time > 0 else 0.0,
+			"steps": steps,
+			"batch_size": self.train_loader.batch_size,
+			"codec": codec,
+			"codec_bytes": payload_nbytes(payload),
+			"raw_bytes": payload_nbytes(weights),
+		}
+		metrics.update(self.model_metrics(config))
+		if config.get("zkp_commit", "off") != "off":
+			metrics.update(self.commit(payload, parameters, codec, config))
+		return (payload, len(self.train_loader.dataset), metrics)
+
+	def commit(self, payload, parameters, codec, config):
+		"""
+		Engagement local (feuilles Poseidon + racine Merkle) sur les poids tels que le serveur
+		les décodera : le hachage est réparti sur les clients, le serveur ne fait que contrôler.
+		En cas d'échec (node absent...), rien n'est renvoyé et le serveur hache lui-même.
+		"""
+		try:
+			from utils.commitment import commit_update
+
+			return commit_update(payload, parameters, codec, config)
+		except Exception as e:
+			print(f"[Commitments] Engagement local impossible ({self.peer_id}): {e}")
+			return {}
 
 	def evaluate(self, parameters, config):
+		parameters = self.resolve_model(parameters, config)
 		self.set_parameters(parameters)
 
 		self.model.eval()
@@ -75,5 +131,5 @@ class FLClient(fl.client.NumPyClient):
 			accuracy = correct / total
 			avg_loss = total_loss / total
 
-		return (float(avg_loss), total, {"loss": avg_loss, "accuracy" : accuracy})
+		return (float(avg_loss), total, {"loss": avg_loss, "accuracy" : accuracy, **self.model_metrics(config)})
 
@@ -8,8 +8,17 @@ contract FLAnchors {
         bool exists;
     }
 
+    struct BatchAnchor {
+        uint128 count;        // nombre de rounds dans le lot
+        uint64  blockNumber;
+        bool exists;
+    }
+
     mapping(uint256 => RoundAnchor) public anchors;
+    mapping(bytes32 => BatchAnchor) public batches;  // racine Merkle -> lot
+
     event RoundAnchored(uint256 indexed roundId, bytes32 H_model, bytes32 H_artifacts);
+    event BatchAnchored(bytes32 indexed root, uint256 count, uint256 firstRoundId, uint256 lastRoundId);
 
     function anchorRound(
         uint256 roundId,
@@ -20,4 +29,35 @@ contract FLAnchors {
         anchors[roundId] = RoundAnchor({ H_model: H_model, H_artifacts: H_artifacts, exists: true });
         emit RoundAnchored(roundId, H_model, H_artifacts);
     }
+
+    // Plusieurs rounds en une transaction : seule la racine Merkle des feuilles
+    // keccak256(abi.encode(roundId, H_model, H_artifacts)) est stockée (paires triées).
+    function anchorBatch(
+        bytes32 root,
+        uint256 count,
+        uint256 firstRoundId,
+        uint256 lastRoundId
+    ) external {
+        require(count > 0, "empty batch");
+        require(!batches[root].exists, "batch already anchored");
+        batches[root] = BatchAnchor({ count: uint128(count), blockNumber: uint64(block.number), exists: true });
+        emit BatchAnchored(root, count, firstRoundId, lastRoundId);
+    }
+
+    // Vérifie qu'un round appartient à un lot ancré (chemin Merkle fourni hors chaîne).
+    function verifyRound(
+        bytes32 root,
+        uint256 roundId,
+        bytes32 H_model,
+        bytes32 H_artifacts,
+        bytes32[] calldata proof
+    ) external view returns (bool) {
+        if (!batches[root].exists) return false;
+        bytes32 h = keccak256(abi.encode(roundId, H_model, H_artifacts));
+        for (uint256 i = 0; i < proof.length; i++) {
+            bytes32 p = proof[i];
+            h = h < p ? keccak256(abi.encodePacked(h, p)) : keccak256(abi.encodePacked(p, h));
+        }
+        return h == root;
+    }
 }
@@ -0,0 +1,179 @@
+# edge.py
+"""
+Agrégation hiérarchique : serveur racine <- agrégateurs de bord <- clients.
+
+- un agrégateur de bord est, dans le même processus, serveur Flower de son groupe (EdgeServer,
+  MyCustomFedAvg : agrégation, engagements et preuve du sous-agrégat sous le nom <edge>_s<session>_round<r>)
+  et client unique du serveur racine (EdgeClient) ;
+- chaque fit de la racine déclenche `local_rounds` rounds du groupe à partir du modèle reçu ; le
+  sous-agrégat remonte comme un client pondéré par le total d'exemples du groupe (FedAvg hiérarchique
+  = FedAvg à plat) avec le nom de son round de bord (edge_round, relié dans clients.json de la racine) ;
+- la racine n'agrège et ne prouve que les sorties des agrégateurs : sa charge et son travail de
+  preuve suivent le nombre de groupes, pas le nombre de clients.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import flwr as fl
+from flwr.common import parameters_to_ndarrays, ndarrays_to_parameters
+from flwr.server.history import History
+
+from strategy import DeadlineServer
+from utils.checkpoints import HeldModel
+from utils.commitment import commit_update
+from utils.update_codec import encode_update, payload_nbytes, DEFAULT_TOPK_RATIO
+
+# clés de config de la racine propres au lien racine -> bord (le bord applique les siennes à son groupe)
+UPSTREAM_CONFIG_KEYS = ("codec", "topk_ratio", "model_digest", "model_version")
+
+
+class EdgeServer(DeadlineServer):
+    """
+    Serveur Flower du groupe, piloté par la racine : fit() attend les clients du groupe puis exécute
+    les tâches (paramètres initiaux, fit, évaluation) soumises par EdgeClient, jusqu'à stop().
+    Si le groupe n'est pas au complet après `ready_timeout` secondes, les tâches en attente et
+    suivantes échouent (la racine voit un client en échec) au lieu de bloquer.
+    """
+
+    def __init__(self, *, client_manager, strategy, local_rounds=1, ready_timeout=600.0):
+        super().__init__(client_manager=client_manager, strategy=strategy)
+        self.local_rounds = max(1, int(local_rounds))
+        self.ready_timeout = float(ready_timeout)
+        self.edge_round = 0           # rounds du groupe, numérotés en continu sur la session
+        self._tasks = queue.Queue()
+        self._closed = None           # raison de fermeture : plus aucune tâche acceptée
+        self._lock = threading.Lock()
+        self._relay_config = {}
+        strategy.on_fit_config_fn = lambda server_round: dict(self._relay_config)
+        strategy.on_evaluate_config_fn = lambda server_round: dict(self._relay_config)
+
+    def call(self, kind, *args):
+        """Soumet une tâche à la boucle du serveur (thread Flower) et attend son résultat."""
+        fut = Future()
+        with self._lock:
+            if self._closed is not None:
+                raise RuntimeError(self._closed)
+            self._tasks.put((kind, args, fut))
+        return fut.result()
+
+    def stop(self):
+        self._tasks.put(None)
+
+    def _close(self, reason):
+        """Refuse les tâches suivantes et fait échouer celles encore en file."""
+        with self._lock:
+            self._closed = reason
+            while True:
+                try:
+                    task = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not None:
+                    task[2].set_exception(RuntimeError(reason))
+
+    def fit(self, num_rounds, timeout):
+        history = History()
+        start_time = time.time()
+        n = self.strategy.min_available_clients
+        if not self._client_manager.wait_for(n, timeout=self.ready_timeout):
+            self._close(f"[EDGE] Groupe incomplet après {self.ready_timeout:.0f}s "
+                        f"({self._client_manager.num_available()}/{n} clients)")
+            print(self._closed)
+            return history, time.time() - start_time
+        handlers = {"parameters": self._parameters, "fit": self._fit, "evaluate": self._evaluate}
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            kind, args, fut = task
+            try:
+                fut.set_result(handlers[kind](*args, timeout=timeout))
+            except Exception as e:
+                fut.set_exception(e)
+        self._close("[EDGE] Agrégateur arrêté")
+        self.strategy.finish_evaluations()
+        return history, time.time() - start_time
+
+    def _relay(self, config):
+        self._relay_config = {
+            k: v for k, v in config.items() if k not in UPSTREAM_CONFIG_KEYS and not k.startswith("zkp_")
+        }
+
+    def _parameters(self, timeout=None):
+        return parameters_to_ndarrays(self._get_initial_parameters(server_round=0, timeout=timeout))
+
+    def _fit(self, parameters, config, timeout=None):
+        """`local_rounds` rounds du groupe -> (ndarrays, exemples, metrics agrégées, nom du dernier round)."""
+        self._relay(config)
+        self.parameters = ndarrays_to_parameters(parameters)
+        num_examples, metrics = 0, {}
+        for _ in range(self.local_rounds):
+            self.edge_round += 1
+            res = self.fit_round(server_round=self.edge_round, timeout=timeout)
+            if res is None or res[0] is None:
+                raise RuntimeError(f"[EDGE] Round de bord {self.edge_round} sans résultat")
+            self.parameters, metrics, (results, _) = res
+            num_examples = sum(r.num_examples for _, r in results)
+            metrics = dict(metrics, edge_clients=len(results))
+        return parameters_to_ndarrays(self.parameters), num_examples, metrics, self.strategy._round_name(self.edge_round)
+
+    def _evaluate(self, parameters, config, timeout=None):
+        self._relay(config)
+        self.parameters = ndarrays_to_parameters(parameters)
+        res = self.evaluate_round(server_round=max(1, self.edge_round), timeout=timeout)
+        if res is None or res[0] is None:
+            raise RuntimeError("[EDGE] Évaluation du groupe sans résultat")
+        loss, metrics, (results, _) = res
+        return float(loss), sum(r.num_examples for _, r in results), metrics
+
+
+class EdgeClient(HeldModel, fl.client.NumPyClient):
+    """Client de la racine : relaie fit / evaluate à EdgeServer et renvoie le sous-agrégat du groupe."""
+
+    def __init__(self, edge_server, peer_id="edge_unknown"):
+        self.server = edge_server
+        self.peer_id = peer_id
+        self.residual = None    # rétroaction d'erreur du codec racine (modes avec perte)
+
+    def get_parameters(self, config):
+        return self.server.call("parameters")
+
+    def fit(self, parameters, config):
+        parameters = self.resolve_model(parameters, config)
+        t0 = time.perf_counter()
+        weights, num_examples, group_metrics, edge_round = self.server.call("fit", parameters, config)
+        fit_time = time.perf_counter() - t0
+
+        codec = config.get("codec", "none")
+        payload, self.residual = encode_update(
+            weights, parameters, codec,
+            residual=self.residual, topk_ratio=float(config.get("topk_ratio", DEFAULT_TOPK_RATIO)),
+        )
+        metrics = {
+            "loss": group_metrics.get("loss", 0.0),
+            "accuracy": group_metrics.get("accuracy", 0.0),
+            "client_id": self.peer_id,
+            "fit_time": fit_time,
+            "samples_per_sec": num_examples / fit_time if fit_time > 0 else 0.0,
+            "edge_round": edge_round,
+            "edge_clients": group_metrics.get("edge_clients", 0),
+            "codec": codec,
+            "codec_bytes": payload_nbytes(payload),
+            "raw_bytes": payload_nbytes(weights),
+        }
+        metrics.update(self.model_metrics(config))
+        if config.get("zkp_commit", "off") != "off":
+            try:
+                metrics.update(commit_update(payload, parameters, codec, config))
+            except Exception as e:
+                print(f"[Commitments] Engagement local impossible ({self.peer_id}): {e}")
+        print(f"[EDGE] {self.peer_id} : sous-agrégat {edge_round} ({metrics['edge_clients']} clients, "
+              f"{num_examples} exemples) en {fit_time:.1f}s")
+        return payload, num_examples, metrics
+
+    def evaluate(self, parameters, config):
+        parameters = self.resolve_model(parameters, config)
+        loss, num_examples, metrics = self.server.call("evaluate", parameters, config)
+        return loss, num_examples, {"loss": loss, "accuracy": metrics.get("accuracy", 0.0), **self.model_metrics(config)}
@@ -1,17 +1,11 @@
 import logging
-import torch
-from torch.utils.data import DataLoader, Subset
-from torchvision import datasets, transforms
-import flwr as fl
-from flwr.server import ServerConfig
-from model import Net
-from strategy import MyCustomFedAvg
-from client import FLClient
-from utils.logging_utils import create_log
-from utils.plot_metrics import find_latest_log, plot_metrics
+from utils import paths
 from typing import Dict, Tuple
 import time
 import socket
+import os
+import threading
+from utils.readiness import wait_until_listening
 
 logger = logging.getLogger(__name__)
 
@@ -30,56 +24,97 @@ def wait_for_server(host, port, timeout = 30):
 
 
 
-class FLPeer:
-	def __init__(self, config: Dict):
-		self.config = config
-
-		if self.config['device'] == 'auto':
-			self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-		else:
-			self.device = torch.device(self.config['device'])
+_DATASETS = {}
 
-		self.config['device'] = str(self.device)
-
-		self.model = Net().to(self.config['device'])
-		self.is_server = self.config['is_server']
-		self.server = self.config['server'] if self.is_server else None
-
-		# chargement des données
-		self.train_loader, self.val_loader = self.load_data()      #    à passer pour le client
+def load_mnist(root = None):
+	""" Charge une seule fois par processus les splits MNIST (train, test) normalisés """
+	root = root or paths.DATA_DIR
+	if root not in _DATASETS:
+		from torchvision import datasets, transforms
 
-		logger.info(f"Pair {self.config['peer_id']} initailisé en tant que {'SERVER' if self.is_server else 'CLIENT'}")
-
-	def load_data(self) -> Tuple[DataLoader, DataLoader]:
-		""" Charge les données MNIST avec un sous ensemble différent pour chaque pair """
-
-		# Si c'est le serveur, il ne charge aucune donnée
-		if self.is_server:
-			logger.info("Serveur : aucune donnée à charger.")
-			return None, None
-		
-		# Si c'est un client, charger les données MNIST
 		transform = transforms.Compose([
 			transforms.ToTensor(),
 			transforms.Normalize((0.1307),(0.3081))
 		])
 
 		full_train = datasets.MNIST(
-			"./data",
+			root,
 			train = True,
 			download = True,   
 			transform = transform
 		)
 
 		test_data = datasets.MNIST(
-			"./data",
+			root,
 			train = False,
 			download = True,  
 			transform = transform
 		)
+		_DATASETS[root] = (full_train, test_data)
+	return _DATASETS[root]
+
+
+class FLPeer:
+	"""
+	Imports selon le rôle : le serveur ne charge ni torch/torchvision ni les données
+	(sauf évaluation centralisée server_eval, chargée en arrière-plan à la première évaluation),
+	le client ne charge ni la stratégie, ni le code ZKP (sauf worker de preuve si ZKP_DISTRIBUTED=1),
+	ni le tracé (matplotlib, dans un processus séparé).
+	"""
+	def __init__(self, config: Dict):
+		self.config = config
+		self._device_spec = config['device']
+		self.device = None
+		self.model = None
+		self.configure_session(config)
+
+	def _ensure_model(self):
+		""" torch + modèle, créés au premier passage en client puis conservés """
+		if self.model is None:
+			import torch
+			from model import Net
+
+			if self._device_spec == 'auto':
+				self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+			else:
+				self.device = torch.device(self._device_spec)
+			self.model = Net().to(str(self.device))
+
+	def configure_session(self, config: Dict):
+		""" (Re)configure le rôle du pair pour une session, sans recharger torch, MNIST ni le modèle """
+		self.config = config
+		self.is_server = self.config['is_server']
+		self.is_edge = self.config.get('role') == 'edge'   # mode hiérarchique : agrégateur de bord (edge.py)
+		self.server = self.config['server'] if self.is_server else None
+		if not (self.is_server or self.is_edge):
+			self._ensure_model()
+			self.config['device'] = str(self.device)
+			if os.environ.get("ZKP_DISTRIBUTED", "0") == "1":
+				# client inactif pendant la preuve du serveur : il prend des chunks dans la file partagée
+				from utils.prove_queue import start_background_worker
+				start_background_worker(self.config['peer_id'])
+
+		# chargement des données (datasets en cache : seul le découpage est recalculé)
+		self.train_loader, self.val_loader = self.load_data()      #    à passer pour le client
+
+		logger.info(f"Pair {self.config['peer_id']} initailisé en tant que {self.config.get('role', 'server' if self.is_server else 'client').upper()}")
+
+	def load_data(self) -> Tuple["DataLoader", "DataLoader"]:
+		""" Charge les données MNIST avec un sous ensemble différent pour chaque pair """
+
+		# Si c'est le serveur (ou un agrégateur de bord), il ne charge aucune donnée
+		if self.is_server or self.is_edge:
+			logger.info("Serveur : aucune donnée à charger.")
+			return None, None
 
-		# Créer une liste de clients (exclut le serveur)
-		client_peers = [pid for pid in self.config['all_peers'] if pid != self.config["server"]]
+		import torch
+		from torch.utils.data import DataLoader, Subset
+
+		# Si c'est un client, charger les données MNIST (mises en cache par processus)
+		full_train, test_data = load_mnist()
+
+		# Créer une liste de clients (exclut le serveur ; en mode hiérarchique, les agrégateurs de bord)
+		client_peers = self.config.get('trainers') or [pid for pid in self.config['all_peers'] if pid != self.config["server"]]
 		
 		if self.config['peer_id'] not in client_peers:
 			raise ValueError(f"{self.config['peer_id']} n’est pas un client valide")
@@ -105,59 +140,221 @@ class FLPeer:
 		)
 
 
-	def run(self):
+	def run(self, on_ready = None, wait = True):
+		"""
+		on_ready : (serveur) appelé dès que le port Flower accepte les connexions
+		wait     : (client) sonder le serveur avant de se connecter (inutile si un signal 'ready' a été reçu)
+		"""
 		if self.is_server:
+			from utils.logging_utils import create_log
 			log_file = create_log()
-			self.run_server(log_file)
+			self.run_server(log_file, on_ready = on_ready)
+		elif self.is_edge:
+			self.run_edge(wait = wait)
 		else:
-			self.run_client()
+			# sous un agrégateur de bord, aucun signal 'ready' : on sonde toujours son port
+			self.run_client(wait = wait or 'edge' in self.config)
 
-	def run_server(self, log_file):
-		strategy = MyCustomFedAvg(
+	def build_strategy(self, log_file):
+		""" Stratégie synchrone (MyCustomFedAvg) ou asynchrone bufferisée (FedBuff) selon la config """
+		from flwr.server import SimpleClientManager
+		from strategy import MyCustomFedAvg
+
+		common = dict(
 			log_file = log_file,
+			update_codec = self.config.get('update_codec', 'none'),
+			topk_ratio = self.config.get('topk_ratio', 0.01),
+			session_id = self.config.get('session'),
+			federated_eval_every = self.config.get('federated_eval_every', 1),
+			checkpoint = self.config.get('checkpoint', True),
+			model_transfer = self.config.get('model_transfer', 'auto'),
+			scheduling = self.config.get('scheduling'),
 			min_fit_clients = self.config['min_clients'],
 			min_evaluate_clients = self.config['min_clients'],
 			min_available_clients = self.config['min_clients']
 		)
+		if self.config.get('server_eval', False):
+			# évaluation centralisée sur le test MNIST préchargé, en parallèle du fit suivant
+			from server_eval import ServerEvaluator
+			common['evaluate_fn'] = ServerEvaluator(
+				device = self._device_spec,
+				batch_size = self.config.get('server_eval_batch', 4096),
+			)
+		initial = self.warm_start_parameters()
+		if initial is not None:
+			common['initial_parameters'] = initial
+		if self.config.get('strategy', 'fedavg') == 'fedbuff':
+			from async_strategy import FedBuffStrategy, AsyncBufferedServer
+			fedbuff = self.config.get('fedbuff', {})
+			strategy = FedBuffStrategy(
+				buffer_size = fedbuff.get('buffer_size', 2),
+				staleness_alpha = fedbuff.get('staleness_alpha', 0.5),
+				server_lr = fedbuff.get('server_lr', 1.0),
+				max_staleness = fedbuff.get('max_staleness'),
+				**common
+			)
+			server = AsyncBufferedServer(client_manager = SimpleClientManager(), strategy = strategy)
+			return strategy, server
+		strategy = MyCustomFedAvg(**common)
+		if strategy.scheduler is not None:
+			# délai de fit par round = échéance de l'ordonnanceur (résultats tardifs abandonnés)
+			from strategy import DeadlineServer
+			return strategy, DeadlineServer(client_manager = SimpleClientManager(), strategy = strategy)
+		return strategy, None
+
+	def warm_start_parameters(self):
+		""" Dernier checkpoint vérifié du store partagé (session précédente), sinon None : FedAvg interroge un client """
+		mode = self.config.get('warm_start', 'latest')
+		if isinstance(mode, bool):      # yaml : on/off -> booléens
+			mode = 'latest' if mode else 'off'
+		if mode == 'off':
+			return None
+		from flwr.common import ndarrays_to_parameters
+		from utils.checkpoints import load_latest_checkpoint
+
+		try:
+			ckpt = load_latest_checkpoint(mode)
+		except Exception as e:
+			logger.warning(f"Warm start impossible, modèle initial d'un client : {e}")
+			return None
+		if ckpt is None:
+			logger.info("Aucun checkpoint disponible : modèle initial d'un client")
+			return None
+		digest, nds, row = ckpt
+		logger.info(f"Warm start depuis {row['name']} (checkpoint {digest[:12]}, preuve {row['proof_status']})")
+		return ndarrays_to_parameters(nds)
+
+	def run_server(self, log_file, on_ready = None):
+		import flwr as fl
+		from flwr.server import ServerConfig
+		from utils.ledger import get_ledger
+
+		strategy, server = self.build_strategy(log_file)
+		if self.config.get('session') is not None:
+			get_ledger().start_session(self.config['session'], self.config['peer_id'])
+
+		plotter = None
+		if self.config.get('plot', True):
+			# graphiques rendus au fil des rounds par un processus séparé (jamais attendu ici)
+			from utils.plot_metrics import start_background_plotter
+			try:
+				plotter = start_background_plotter(log_file)
+			except OSError as e:
+				logger.warning(f"Traceur en arrière-plan non démarré : {e}")
 
 		server_config = ServerConfig(num_rounds = self.config['num_rounds'])
 
 
 		# Charger les fichiers TLS en mémoire
-		with open("/app/certs/ca.crt", "rb") as f:
-			server_cert = f.read()
-		with open("/app/certs/server.pem", "rb") as f:
-			server_key = f.read()
-		with open("/app/certs/server.key", "rb") as f:
-			ca_cert = f.read()
-		
+		server_cert, server_key, ca_cert = self._certificates()
+
+		if on_ready is not None:
+			def _notify():
+				if wait_until_listening("127.0.0.1", self.config['port']):
+					on_ready()
+			threading.Thread(target = _notify, name = "server-ready", daemon = True).start()
+
 		try:
 			fl.server.start_server(
 				server_address = f"{self.config['host']}:{self.config['port']}",
 				config = server_config,
 				strategy = strategy,
+				server = server,
 				certificates = (server_cert, server_key, ca_cert),
 			)
 		except Exception as e:
 			logger.error(f"Erreur lors du démarrage du serveur : {e}", exc_info = True)
 			raise
 		finally:
-			logger.info("Entraînement terminé. Génération des graphiques...")
-			latest_log = find_latest_log()
-			if latest_log:
-				plot_metrics(latest_log)
-			else:
-				logger.warning("Aucun fichier de log trouvé, pas de graphique généré.")
+			strategy.finish_evaluations()
+			from utils.logging_utils import close_log
+			close_log(log_file)
+			if plotter is not None:
+				from utils.plot_metrics import finish_background_plotter
+				finish_background_plotter(plotter)
+				logger.info(f"Entraînement terminé. Graphiques finalisés en arrière-plan ({log_file})")
+
+
+
+	def _certificates(self):
+		with open(os.path.join(paths.CERTS_DIR, "ca.crt"), "rb") as f:
+			server_cert = f.read()
+		with open(os.path.join(paths.CERTS_DIR, "server.pem"), "rb") as f:
+			server_key = f.read()
+		with open(os.path.join(paths.CERTS_DIR, "server.key"), "rb") as f:
+			ca_cert = f.read()
+		return server_cert, server_key, ca_cert
+
+	def run_edge(self, wait = True):
+		"""
+		Agrégateur de bord : serveur Flower de son groupe (thread principal) et client unique du
+		serveur racine (thread 'edge-upstream') ; la fin de la session racine arrête le groupe.
+		"""
+		import flwr as fl
+		from flwr.server import ServerConfig, SimpleClientManager
+		from strategy import MyCustomFedAvg
+		from edge import EdgeServer, EdgeClient
 
+		n = len(self.config['edge_clients'])
+		strategy = MyCustomFedAvg(
+			log_file = None,
+			update_codec = self.config.get('update_codec', 'none'),
+			topk_ratio = self.config.get('topk_ratio', 0.01),
+			session_id = self.config.get('session'),
+			checkpoint = False,      # seul le modèle global de la racine sert au warm start
+			model_transfer = self.config.get('model_transfer', 'auto'),
+			scheduling = self.config.get('scheduling'),
+			round_prefix = f"{self.config['peer_id']}_",
+			min_fit_clients = n,
+			min_evaluate_clients = n,
+			min_available_clients = n,
+		)
+		edge_server = EdgeServer(
+			client_manager = SimpleClientManager(),
+			strategy = strategy,
+			local_rounds = (self.config.get('hierarchy') or {}).get('local_rounds', 1),
+			ready_timeout = self.config.get('ready_timeout', 600),
+		)
+		logger.info(f"[EDGE] {self.config['peer_id']} agrège {self.config['edge_clients']} pour {self.config['server']}")
+
+		def _upstream():
+			try:
+				if wait:
+					wait_for_server(self.config["host"], self.config["port"])
+				fl.client.start_numpy_client(
+					server_address = f"{self.config['host']}:{self.config['port']}",
+					client = EdgeClient(edge_server, peer_id = self.config["peer_id"]),
+					root_certificates = os.path.join(paths.CERTS_DIR, "ca.crt"),
+				)
+			except Exception as e:
+				logger.error(f"[EDGE] Lien vers la racine interrompu : {e}", exc_info = True)
+			finally:
+				edge_server.stop()
+
+		upstream = threading.Thread(target = _upstream, name = "edge-upstream", daemon = True)
+		upstream.start()
+		try:
+			fl.server.start_server(
+				server_address = f"0.0.0.0:{self.config['edge_port']}",
+				config = ServerConfig(num_rounds = self.config['num_rounds']),
+				server = edge_server,
+				certificates = self._certificates(),
+			)
+		finally:
+			edge_server.stop()
+			upstream.join()
 
+	def run_client(self, wait = True):
+		import flwr as fl
+		from client import FLClient
 
-	def run_client(self):
-		wait_for_server(self.config["host"], self.config["port"])
+		if wait:
+			wait_for_server(self.config["host"], self.config["port"])
 
 		# Démarrer le client Flower
 		fl.client.start_numpy_client(
 			server_address = f"{self.config['host']}:{self.config['port']}",
 			client = FLClient(self.model, self.train_loader, self.val_loader, self.device, peer_id = self.config["peer_id"]),
-			root_certificates = "/app/certs/ca.crt",
+			root_certificates = os.path.join(paths.CERTS_DIR, "ca.crt"),
 		)
 
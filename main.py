@@ -2,9 +2,6 @@ import sys
 import argparse
 import logging
 import socket
-from flpeer import FLPeer
-from utils.config import load_or_init_config, load_or_init_state
-from utils.federation import elect_next_server
 
 
 logging.basicConfig(level = logging.INFO)
@@ -14,30 +11,60 @@ if __name__ == "__main__":
 
 	parser = argparse.ArgumentParser()
 	parser.add_argument("--peer-id", help = "Identifiant du pair (ex: client1), facultatif si hostname=peer-id")
+	parser.add_argument("--daemon", action = "store_true", help = "Pair longue durée : enchaîne les sessions avec bascule de rôle à chaud")
+	parser.add_argument("--sessions", type = int, default = 0, help = "(--daemon) nombre de sessions avant arrêt, 0 = sans fin")
+	parser.add_argument("--profile-startup", action = "store_true", help = "Mesure imports + initialisation du rôle, affiche le rapport puis quitte")
+	parser.add_argument("--as-role", choices = ["server", "client"], help = "(--profile-startup) rôle à profiler (défaut: rôle de la session courante)")
+	parser.add_argument("--startup-budget", type = float, default = None, help = "Budget de démarrage en secondes (code retour 3 si dépassé en mode profil)")
 	args = parser.parse_args()
 
-	config = load_or_init_config("config.yaml")
-	state = load_or_init_state(config)
+	# imports différés : le profileur doit être installé avant les modules lourds
+	from utils.startup import make_profiler, check_budget
+	profiler = make_profiler(args.profile_startup)
 
-	peer_id = args.peer_id or socket.gethostname() 
+	with profiler.phase("config"):
+		from utils.config import load_or_init_config, load_or_init_state, session_config
+		config = load_or_init_config("config.yaml")
+		peer_id = args.peer_id or socket.gethostname()
 
-	config["peer_id"] = peer_id
-	config["is_server"] = (peer_id == state["current_server"])
+	if args.daemon and not args.profile_startup:
+		from peer_daemon import PeerDaemon
+		PeerDaemon(config, peer_id).run(max_sessions = args.sessions)
+		sys.exit(0)
 
-	config["server"] = state["current_server"]
+	with profiler.phase("state"):
+		state = load_or_init_state(config)
+		server_id = state["current_server"]
+		if args.as_role:
+			server_id = peer_id if args.as_role == "server" else next(p for p in config["all_peers"] if p != peer_id)
+		config = session_config(config, peer_id, server_id, state["session"])
 
-	if config['is_server']:
-		config["host"] = '0.0.0.0'
-	else:
-		config["host"] = state["current_server"]
 
-
-	logger.info(f"{peer_id} sera {'SERVER' if config['is_server'] else 'CLIENT'} pour cette session")
+	logger.info(f"{peer_id} sera {config['role'].upper()} pour cette session")
 
 	try:
-		peer = FLPeer(config)
+		with profiler.phase("import flpeer"):
+			from flpeer import FLPeer
+		with profiler.phase(f"init {'server' if config['is_server'] else 'client'}"):
+			peer = FLPeer(config)
+			if args.profile_startup:
+				# modules que run() chargera pour ce rôle avant d'ouvrir / rejoindre le serveur
+				import flwr   # noqa: F401
+				if config['is_server']:
+					import strategy   # noqa: F401
+					if config.get('strategy', 'fedavg') == 'fedbuff':
+						import async_strategy   # noqa: F401
+				else:
+					import client   # noqa: F401
+
+		within_budget = check_budget(profiler, args.startup_budget)
+		if args.profile_startup:
+			print(profiler.report())
+			sys.exit(0 if within_budget else 3)
+
 		peer.run()
 		if config['is_server']:
+			from utils.federation import elect_next_server
 			elect_next_server(state, config)
 
 	except Exception as e:
@@ -0,0 +1,117 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+from flpeer import FLPeer
+from utils.config import load_or_init_state, session_config
+from utils.federation import elect_next_server
+from utils.readiness import ReadinessListener, announce
+
+logger = logging.getLogger(__name__)
+
+
+class PeerDaemon:
+	"""
+	Pair longue durée : enchaîne les sessions et bascule serveur/client dans le même processus.
+	- torch, MNIST, le modèle, le circuit compilé, la zkey et les workers Poseidon/snarkjs restent chauds ;
+	- le serveur sortant élit le suivant et le notifie ('elected') ; le nouveau serveur annonce
+	  'ready' dès que son port Flower est ouvert : les clients n'interrogent plus le serveur en boucle.
+	"""
+
+	def __init__(self, config: Dict, peer_id: str):
+		self.config = config
+		self.peer_id = peer_id
+		self.control_port = int(config.get("control_port", 9100))
+		self.ready_timeout = float(config.get("ready_timeout", 600))
+		self.listener = ReadinessListener(self.control_port).start()
+		self.peer: Optional[FLPeer] = None
+		threading.Thread(target = self._warm_up, name = "zkp-warm-up", daemon = True).start()
+
+	def _warm_up(self):
+		""" N'importe quel pair peut devenir serveur : préchauffe Poseidon / circuit / zkey en arrière-plan """
+		try:
+			from utils.zkp_utils import warm_up
+			warm_up()
+			logger.info("[Daemon] Workers ZKP préchauffés")
+		except Exception as e:
+			logger.warning(f"[Daemon] Préchauffage ZKP impossible: {e}")
+
+	def _others(self):
+		return [p for p in self.config["all_peers"] if p != self.peer_id]
+
+	def _peer_for(self, server_id: str, session: int) -> FLPeer:
+		cfg = session_config(self.config, self.peer_id, server_id, session)
+		if self.peer is None:
+			self.peer = FLPeer(cfg)
+		else:
+			self.peer.configure_session(cfg)
+		return self.peer
+
+	def _serve_session(self, session: int, state: Dict) -> Dict:
+		logger.info(f"[Daemon] Session {session} : {self.peer_id} est SERVER")
+		peer = self._peer_for(self.peer_id, session)
+
+		def _on_ready():
+			announce(
+				self._others(),
+				self.control_port,
+				{"event": "ready", "session": session, "server": self.peer_id, "port": self.config["port"]},
+				timeout = self.ready_timeout,
+			)
+
+		peer.run(on_ready = _on_ready)
+		state = elect_next_server(state, self.config)
+		announce(
+			self._others(),
+			self.control_port,
+			{"event": "elected", "session": state["session"], "server": state["current_server"]},
+			timeout = self.ready_timeout,
+		)
+		return state
+
+	def run(self, max_sessions: int = 0):
+		""" Boucle de sessions (max_sessions=0 : sans fin) """
+		state = load_or_init_state(self.config)
+		session = state.get("session", 0)
+		server_id = state["current_server"]
+		done = 0
+
+		while not max_sessions or done < max_sessions:
+			if server_id == self.peer_id:
+				state = self._serve_session(session, state)
+				session, server_id = state["session"], state["current_server"]
+				done += 1
+				continue
+
+			msg = self.listener.wait(min_session = session, timeout = self.ready_timeout)
+			if msg is None:
+				# aucun signal (ex: démarrage après l'annonce) : on relit l'état partagé et on sonde
+				state = load_or_init_state(self.config)
+				session, server_id = state.get("session", 0), state["current_server"]
+				if server_id == self.peer_id:
+					continue
+				logger.warning(f"[Daemon] Pas de signal 'ready' : sondage de {server_id}")
+				try:
+					self._peer_for(server_id, session).run(wait = True)
+				except RuntimeError as e:
+					# serveur injoignable : on retourne attendre les annonces plutôt que d'arrêter le démon
+					logger.warning(f"[Daemon] Session {session} : {server_id} injoignable ({e})")
+					continue
+				session += 1
+				done += 1
+				continue
+
+			session, server_id = int(msg["session"]), msg["server"]
+			if msg["event"] == "elected":
+				logger.info(f"[Daemon] Session {session} : serveur élu {server_id}")
+				if server_id == self.peer_id:
+					state = load_or_init_state(self.config)
+				continue
+
+			# event == "ready" : serveur à l'écoute, connexion immédiate sans sondage
+			logger.info(f"[Daemon] Session {session} : {self.peer_id} est CLIENT de {server_id}")
+			self._peer_for(server_id, session).run(wait = False)
+			session += 1
+			done += 1
+
+		self.listener.close()
@@ -0,0 +1,94 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+# mêmes constantes que la normalisation des DataLoader clients (flpeer.load_mnist)
+MNIST_MEAN, MNIST_STD = 0.1307, 0.3081
+
+
+class ServerEvaluator:
+    """
+    Évaluation centralisée du modèle global sur le split de test MNIST (evaluate_fn de la stratégie).
+    Le jeu de test est normalisé une seule fois en un tenseur préchargé (sur le device),
+    puis évalué par grands lots sous torch.inference_mode() — pas de DataLoader, pas de transform par image.
+    torch, le modèle et les données sont chargés au premier appel (dans le thread d'évaluation).
+    """
+
+    def __init__(self, device: str = "auto", batch_size: int = 4096):
+        self.device_spec = device
+        self.batch_size = int(batch_size)
+        self._model = None
+        self._x = None
+        self._y = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._model is not None:
+            return
+        import torch
+        from model import Net
+        from flpeer import load_mnist
+
+        if self.device_spec == "auto":
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        else:
+            self.device = torch.device(self.device_spec)
+        _, test_data = load_mnist()
+        x = test_data.data.to(torch.float32).div_(255.0).sub_(MNIST_MEAN).div_(MNIST_STD)
+        self._x = x.unsqueeze(1).to(self.device)
+        self._y = test_data.targets.to(self.device)
+        self._model = Net().to(self.device).eval()
+
+    def __call__(self, server_round: int, parameters, config: Dict) -> Optional[Tuple[float, Dict]]:
+        import torch
+        import torch.nn.functional as F
+
+        with self._lock:
+            self._ensure_loaded()
+            t0 = time.perf_counter()
+            keys = list(self._model.state_dict().keys())
+            self._model.load_state_dict(
+                {k: torch.as_tensor(v, device=self.device) for k, v in zip(keys, parameters)}, strict=True
+            )
+            loss_sum, correct, n = 0.0, 0, self._y.numel()
+            with torch.inference_mode():
+                for a in range(0, n, self.batch_size):
+                    out = self._model(self._x[a:a + self.batch_size])
+                    y = self._y[a:a + self.batch_size]
+                    loss_sum += F.cross_entropy(out, y, reduction="sum").item()
+                    correct += (out.argmax(dim=1) == y).sum().item()
+            loss = loss_sum / n
+            return loss, {"loss": loss, "accuracy": correct / n, "eval_time": time.perf_counter() - t0}
+
+
+class BackgroundEvaluation:
+    """
+    Exécute evaluate_fn dans un thread dédié : l'évaluation du round r tourne pendant le fit du round r+1.
+    Un seul worker : les évaluations restent ordonnées et ne se disputent pas le modèle.
+    """
+
+    def __init__(self, evaluate_fn, on_result):
+        self.evaluate_fn = evaluate_fn
+        self.on_result = on_result
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="server-eval")
+        self._pending = []
+
+    def submit(self, server_round: int, parameters_to_ndarrays, parameters, config: Dict) -> None:
+        def _run():
+            try:
+                res = self.evaluate_fn(server_round, parameters_to_ndarrays(parameters), config)
+            except Exception as e:
+                print(f"[EVAL] Évaluation serveur du round {server_round} impossible: {e}")
+                return
+            if res is not None:
+                self.on_result(server_round, *res)
+
+        self._pending = [f for f in self._pending if not f.done()]
+        self._pending.append(self._pool.submit(_run))
+
+    def drain(self, timeout: Optional[float] = None) -> None:
+        """Attend les évaluations en cours (fin d'entraînement, avant les graphiques)."""
+        for f in self._pending:
+            f.result(timeout=timeout)
+        self._pending = []
@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import statistics
+import concurrent.futures
+from typing import Dict, List, Optional
+
+from utils import paths
+from utils.config import load_or_init_config
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Harnais de simulation en un seul processus (ou pool de processus locaux) :
+# vraie stratégie (MyCustomFedAvg / FedBuff, export ZKP inclus), vrais FLClient et
+# partitionnement FLPeer.load_data, sans gRPC, TLS ni Docker.
+#
+#   python simulate.py --clients 2,4,8,16 --rounds 3 --root ./sim_out [--workers 4]
+#
+# Scénarios indépendants et comparables : chacun est une session distincte (rounds s<i>_round<r>,
+# pas d'écrasement des dossiers / du ledger) sans warm start depuis le checkpoint du précédent,
+# en topologie à plat (pas d'agrégateurs de bord).
+
+
+# -------------------------------
+# Côté "client" : un FLClient par peer_id, mis en cache dans le processus qui l'exécute
+# -------------------------------
+_CLIENTS = {}
+
+def _init_worker(root, data_dir, torch_threads):
+	""" Initialiseur des processus du pool : mêmes chemins que le processus principal """
+	paths.configure(root = root, data_dir = data_dir)
+	if torch_threads:
+		import torch
+		torch.set_num_threads(torch_threads)
+
+def _get_client(cfg):
+	from flpeer import FLPeer
+	from client import FLClient
+
+	pid = cfg["peer_id"]
+	key = (pid, tuple(cfg["all_peers"]))    # la partition dépend de la liste des pairs
+	if key not in _CLIENTS:
+		peer = FLPeer(dict(cfg))
+		_CLIENTS[key] = FLClient(peer.model, peer.train_loader, peer.val_loader, peer.device, peer_id = pid)
+	return _CLIENTS[key]
+
+def _client_call(cfg, method, parameters, config):
+	""" Exécute get_parameters/fit/evaluate sur le client `cfg['peer_id']` ; retourne (résultat, durée) """
+	client = _get_client(cfg)
+	t0 = time.perf_counter()
+	if method == "get_parameters":
+		out = client.get_parameters(config)
+	elif method == "fit":
+		out = client.fit(parameters, config)
+	elif method == "evaluate":
+		out = client.evaluate(parameters, config)
+	else:
+		raise ValueError(f"Méthode inconnue: {method}")
+	return out, time.perf_counter() - t0
+
+
+def _make_proxy_class():
+	""" Construit la classe ClientProxy locale (import flwr différé) """
+	from flwr.server.client_proxy import ClientProxy
+	from flwr.common import (
+		Code, Status, FitRes, EvaluateRes, GetParametersRes, GetPropertiesRes, DisconnectRes,
+		parameters_to_ndarrays, ndarrays_to_parameters,
+	)
+
+	class SimClientProxy(ClientProxy):
+		""" ClientProxy en mémoire : appelle FLClient directement (ou via un processus dédié) """
+
+		def __init__(self, cfg, executor, stats):
+			super().__init__(cfg["peer_id"])
+			self.cfg = cfg
+			self.executor = executor
+			self.stats = stats
+
+		def _call(self, method, parameters, config):
+			nds = parameters_to_ndarrays(parameters) if parameters is not None else None
+			if self.executor is None:
+				return _client_call(self.cfg, method, nds, config)
+			return self.executor.submit(_client_call, self.cfg, method, nds, config).result()
+
+		def get_properties(self, ins, timeout, group_id):
+			return GetPropertiesRes(status = Status(code = Code.OK, message = ""), properties = {})
+
+		def get_parameters(self, ins, timeout, group_id):
+			out, _ = self._call("get_parameters", None, ins.config)
+			return GetParametersRes(status = Status(code = Code.OK, message = ""), parameters = ndarrays_to_parameters(out))
+
+		def fit(self, ins, timeout, group_id):
+			t0 = time.perf_counter()
+			(payload, n, metrics), compute = self._call("fit", ins.parameters, dict(ins.config))
+			self.stats.setdefault(self.cid, []).append({"wall": time.perf_counter() - t0, "compute": compute})
+			return FitRes(
+				status = Status(code = Code.OK, message = ""),
+				parameters = ndarrays_to_parameters(payload),
+				num_examples = n,
+				metrics = metrics,
+			)
+
+		def evaluate(self, ins, timeout, group_id):
+			(loss, n, metrics), _ = self._call("evaluate", ins.parameters, dict(ins.config))
+			return EvaluateRes(status = Status(code = Code.OK, message = ""), loss = loss, num_examples = n, metrics = metrics)
+
+		def reconnect(self, ins, timeout, group_id):
+			return DisconnectRes(reason = "")
+
+	return SimClientProxy
+
+
+# -------------------------------
+# Un scénario = N clients, `rounds` rounds
+# -------------------------------
+def run_scenario(config: Dict, n_clients: int, rounds: int, executors: Optional[List], session: Optional[int] = None) -> Dict:
+	from flwr.server import Server, SimpleClientManager
+	from flpeer import FLPeer
+	from utils.logging_utils import create_log, close_log
+
+	SimClientProxy = _make_proxy_class()
+
+	server_id = "sim_server"
+	peers = [server_id] + [f"sim{i:03d}" for i in range(n_clients)]
+	base_cfg = dict(
+		config,
+		all_peers = peers,
+		server = server_id,
+		num_rounds = rounds,
+		min_clients = min(config.get("min_clients", 2), n_clients),
+		host = "local",
+		session = session,
+		warm_start = "off",
+		hierarchy = dict(config.get("hierarchy") or {}, enabled = False),
+	)
+
+	server_peer = FLPeer(dict(base_cfg, peer_id = server_id, is_server = True, role = "server"))
+	log_file = create_log()
+	strategy, server = server_peer.build_strategy(log_file)
+	if server is None:
+		server = Server(client_manager = SimpleClientManager(), strategy = strategy)
+	# en synchrone, tous les clients participent à chaque round
+	strategy.min_fit_clients = strategy.min_evaluate_clients = strategy.min_available_clients = n_clients
+
+	stats = {}
+	for i, pid in enumerate(peers[1:]):
+		cfg = dict(base_cfg, peer_id = pid, is_server = False, role = "client", device = config.get("device", "auto"))
+		executor = executors[i % len(executors)] if executors else None
+		server.client_manager().register(SimClientProxy(cfg, executor, stats))
+
+	t0 = time.perf_counter()
+	try:
+		server.fit(num_rounds = rounds, timeout = None)
+		elapsed = time.perf_counter() - t0
+	finally:
+		strategy.finish_evaluations()    # évaluations serveur en arrière-plan journalisées avant fermeture
+		close_log(log_file)
+
+	fit_walls = [s["wall"] for runs in stats.values() for s in runs]
+	fit_computes = [s["compute"] for runs in stats.values() for s in runs]
+	timings = list(getattr(strategy, "timings", {}).values())
+	agg = [t["aggregation_time"] for t in timings]
+	zkp = [t["zkp_export_time"] for t in timings]
+	versions = getattr(strategy, "version", rounds)
+
+	def _p95(xs):
+		return sorted(xs)[max(0, int(round(0.95 * len(xs))) - 1)] if xs else 0.0
+
+	return {
+		"clients": n_clients,
+		"session": session,
+		"rounds": versions,
+		"elapsed_s": elapsed,
+		"rounds_per_sec": versions / elapsed if elapsed > 0 else 0.0,
+		"fit_time_mean_s": statistics.mean(fit_computes) if fit_computes else 0.0,
+		"fit_time_p95_s": _p95(fit_computes),
+		"fit_wall_mean_s": statistics.mean(fit_walls) if fit_walls else 0.0,
+		"aggregation_time_mean_s": statistics.mean(agg) if agg else 0.0,
+		"zkp_export_time_mean_s": statistics.mean(zkp) if zkp else 0.0,
+		"per_client_fit_s": {cid: [round(s["compute"], 4) for s in runs] for cid, runs in sorted(stats.items())},
+	}
+
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Simulation FL en processus local (mesure de montée en charge)")
+	parser.add_argument("--config", default = "config.yaml")
+	parser.add_argument("--clients", default = "2,4,8", help = "Liste de nombres de clients, ex: 2,4,8,16")
+	parser.add_argument("--rounds", type = int, default = None, help = "Rounds (défaut: num_rounds de la config)")
+	parser.add_argument("--root", default = "./sim_out", help = "Dossier racine remplaçant /app/{shared,commits,logs}")
+	parser.add_argument("--data-dir", default = None, help = "Dossier MNIST (défaut: FL_DATA_DIR ou ./data)")
+	parser.add_argument("--workers", type = int, default = 0, help = "0 = tout dans ce processus ; N = N processus locaux")
+	parser.add_argument("--torch-threads", type = int, default = 0, help = "torch.set_num_threads par processus (0 = défaut)")
+	parser.add_argument("--codec", default = None, help = "Surcharge update_codec (none|delta|fp16|int8|topk)")
+	parser.add_argument("--strategy", default = None, help = "Surcharge strategy (fedavg|fedbuff)")
+	parser.add_argument("--report", default = None, help = "Fichier JSON du rapport (défaut: <root>/sim_report.json)")
+	args = parser.parse_args(argv)
+
+	root = os.path.abspath(args.root)
+	paths.configure(root = root)
+	if args.data_dir:
+		paths.configure(data_dir = args.data_dir)
+	for d in (paths.SHARED_DIR, paths.COMMITS_DIR, paths.LOGS_DIR):
+		os.makedirs(d, exist_ok = True)
+
+	config = load_or_init_config(args.config)
+	if args.codec:
+		config["update_codec"] = args.codec
+	if args.strategy:
+		config["strategy"] = args.strategy
+	rounds = args.rounds or config["num_rounds"]
+	if args.torch_threads and args.workers == 0:
+		import torch
+		torch.set_num_threads(args.torch_threads)
+
+	executors = None
+	if args.workers > 0:
+		# un processus par "slot", clients affectés de façon fixe (état client cohérent : résidu du codec, etc.)
+		executors = [
+			concurrent.futures.ProcessPoolExecutor(
+				max_workers = 1,
+				initializer = _init_worker,
+				initargs = (root, paths.DATA_DIR, args.torch_threads),
+			)
+			for _ in range(args.workers)
+		]
+
+	report = []
+	try:
+		for i, n in enumerate(int(x) for x in args.clients.split(",") if x.strip()):
+			logger.info(f"[SIM] {n} clients, {rounds} rounds...")
+			res = run_scenario(config, n, rounds, executors, session = i)
+			report.append(res)
+			_CLIENTS.clear()
+			logger.info(
+				f"[SIM] {n:>4} clients | {res['rounds_per_sec']:.4f} rounds/s | "
+				f"fit {res['fit_time_mean_s']:.2f}s (p95 {res['fit_time_p95_s']:.2f}s) | "
+				f"agrégation {res['aggregation_time_mean_s'] * 1000:.1f} ms | "
+				f"export ZKP {res['zkp_export_time_mean_s']:.2f}s"
+			)
+	finally:
+		for ex in executors or []:
+			ex.shutdown()
+
+	print(f"\n{'clients':>8} {'rounds/s':>10} {'fit moy (s)':>12} {'fit p95 (s)':>12} {'agg (ms)':>10} {'zkp (s)':>9}")
+	for r in report:
+		print(
+			f"{r['clients']:>8} {r['rounds_per_sec']:>10.4f} {r['fit_time_mean_s']:>12.3f} "
+			f"{r['fit_time_p95_s']:>12.3f} {r['aggregation_time_mean_s'] * 1000:>10.1f} {r['zkp_export_time_mean_s']:>9.2f}"
+		)
+
+	report_path = args.report or os.path.join(root, "sim_report.json")
+	with open(report_path, "w") as f:
+		json.dump({"rounds": rounds, "workers": args.workers, "results": report}, f, indent = 2)
+	print(f"\nRapport : {report_path}")
+	return report
+
+
+if __name__ == "__main__":
+	sys.exit(0 if main() is not None else 1)
@@ -1,92 +1,488 @@
 # strategy.py
+from flwr.server import Server
 from flwr.server.strategy import FedAvg
-from flwr.common import parameters_to_ndarrays
+from flwr.common import parameters_to_ndarrays, ndarrays_to_parameters, Parameters, FitIns, EvaluateIns
 from utils.federation import weighted_average
 from utils.logging_utils import log_metrics
 from utils.zkp_utils import export_and_maybe_prove
-import numpy as np, os, json, shutil
+from utils.commitment import (
+    CLIENT_COMMIT, CLIENT_COMMIT_MODES, DEFAULT_SCALE as COMMIT_SCALE, DEFAULT_CHUNK as COMMIT_CHUNK, LEAF_HASH,
+    leaves_from_bytes,
+)
+from utils.chunk_stream import save_weights
+from utils.checkpoints import save_checkpoint, TRANSFER_MODES
+from utils.scheduling import ThroughputScheduler
+from server_eval import BackgroundEvaluation
+from utils.update_codec import decode_update, CODECS, DEFAULT_TOPK_RATIO
+from utils import paths
+from utils.ledger import get_ledger, round_name
+import numpy as np, os, json, shutil, time
+
+# clés de fit metrics propres au codec (non moyennées avec loss/accuracy)
+CODEC_METRIC_KEYS = ("codec", "codec_bytes", "raw_bytes")
+# clés de fit metrics de l'engagement client (racine / feuilles / temps de hachage)
+COMMIT_METRIC_KEYS = ("commit_root", "commit_leaves", "commit_time")
+# clés de fit/evaluate metrics sur le modèle détenu par le client (envoi par empreinte)
+MODEL_METRIC_KEYS = ("held_digest", "ckpt_store")
+# clés de fit metrics d'un agrégateur de bord (mode hiérarchique, edge.py)
+EDGE_METRIC_KEYS = ("edge_round", "edge_clients")
 
 class MyCustomFedAvg(FedAvg):
-    def __init__(self, log_file=None, **kwargs):
+    def __init__(self, log_file=None, update_codec="none", topk_ratio=DEFAULT_TOPK_RATIO, session_id=None,
+                 federated_eval_every=1, checkpoint=True, model_transfer="auto", scheduling=None, round_prefix="",
+                 **kwargs):
         super().__init__(**kwargs)
         self.log_file = log_file
+        self.session_id = session_id   # rounds nommés s<session>_round<r> dans le ledger
+        self.round_prefix = round_prefix   # agrégateur de bord : <edge>_s<session>_round<r>
+        if update_codec not in CODECS:
+            raise ValueError(f"[CODEC] Codec inconnu: {update_codec} (attendu: {', '.join(CODECS)})")
+        self.update_codec = update_codec
+        if CLIENT_COMMIT not in CLIENT_COMMIT_MODES:
+            raise ValueError(f"ZKP_CLIENT_COMMIT inconnu: {CLIENT_COMMIT} (attendu: {', '.join(CLIENT_COMMIT_MODES)})")
+        self.topk_ratio = float(topk_ratio)
+        self._global_nd = None   # modèle global envoyé au round courant (base des deltas)
+        self.timings = {}        # round -> {"aggregation_time", "checkpoint_time", "zkp_export_time"} (secondes)
+        # évaluation centralisée (evaluate_fn) en arrière-plan ; évaluation fédérée 1 round sur N
+        self.federated_eval_every = max(1, int(federated_eval_every or 1))
+        self.server_eval = {}    # round -> (loss, metrics) de l'évaluation serveur
+        self._background_eval = (
+            BackgroundEvaluation(self.evaluate_fn, self._log_server_eval) if self.evaluate_fn is not None else None
+        )
+        # checkpoints du modèle global (store partagé) et envoi du modèle par empreinte
+        if model_transfer not in TRANSFER_MODES:
+            raise ValueError(f"[CKPT] model_transfer inconnu: {model_transfer} (attendu: {', '.join(TRANSFER_MODES)})")
+        self.checkpoint = bool(checkpoint)
+        self.model_transfer = model_transfer
+        self._model_ref = None       # (Parameters, empreinte) du dernier modèle global connu
+        self._client_models = {}     # cid -> {"held": empreinte détenue, "store": lit le store partagé}
+        # ordonnancement selon le débit des clients (budget local par client, échéance de round)
+        scheduling = dict(scheduling or {})
+        self.scheduler = ThroughputScheduler(**scheduling) if scheduling.pop("enabled", False) else None
+        self._fit_cids = {}          # round -> cids configurés (détection des résultats abandonnés)
+
+    def configure_fit(self, server_round, parameters, client_manager):
+        instructions = super().configure_fit(server_round, parameters, client_manager)
+        if self.update_codec != "none":
+            self._global_nd = parameters_to_ndarrays(parameters)
+        for _, fit_ins in instructions:
+            self._fit_config(fit_ins.config)
+        instructions = self._schedule(server_round, instructions)
+        return self._skip_transfer(instructions, self._parameters_digest(parameters), FitIns)
+
+    def _fit_config(self, config):
+        """Clés de config de fit communes (synchrone / FedBuff) : codec et engagement client."""
+        config["codec"] = self.update_codec
+        config["topk_ratio"] = self.topk_ratio
+        if CLIENT_COMMIT != "off":
+            # le client s'engage sur les poids que le serveur reconstruira (même quantification / chunks)
+            config["zkp_commit"] = CLIENT_COMMIT
+            config["zkp_scale"] = COMMIT_SCALE
+            config["zkp_chunk"] = COMMIT_CHUNK
+            config["zkp_leaf_hash"] = LEAF_HASH
+        return config
+
+    # ---------------------------------------------------------------
+    # Ordonnancement selon le débit (budgets locaux, échéance du round)
+    # ---------------------------------------------------------------
+    def _schedule(self, server_round, instructions):
+        """
+        Écarte les clients trop lents pour l'échéance du round et donne à chacun son budget
+        (epochs / max_steps) : tous finissent vers l'échéance au lieu d'attendre le plus lent.
+        """
+        if self.scheduler is None or not instructions:
+            return instructions
+        deadline = self.scheduler.deadline(server_round)
+        by_cid = {proxy.cid: (proxy, ins) for proxy, ins in instructions}
+        kept = self.scheduler.select(list(by_cid), deadline, self.min_fit_clients)
+        out = []
+        for cid in kept:
+            proxy, ins = by_cid[cid]
+            out.append((proxy, FitIns(ins.parameters, dict(ins.config, **self.scheduler.budget(cid, deadline)))))
+        self._fit_cids[server_round] = set(kept)
+        if deadline is not None:
+            budgets = {
+                self.scheduler.stats.get(p.cid, {}).get("client_id", p.cid): ins.config.get("max_steps", "complet")
+                for p, ins in out
+            }
+            print(f"[SCHED] Round {server_round} : échéance {deadline:.1f}s, "
+                  f"{len(instructions) - len(out)} client(s) écarté(s), budgets {budgets}")
+        return out
+
+    def fit_timeout(self, server_round, timeout=None):
+        """Délai de fit du round : échéance du scheduler (résultats tardifs abandonnés), bornée par `timeout`."""
+        deadline = self.scheduler.deadline(server_round) if self.scheduler is not None else None
+        candidates = [t for t in (deadline, timeout) if t is not None]
+        return min(candidates) if candidates else None
+
+    def note_fit_stats(self, cid, fit_res):
+        if self.scheduler is not None:
+            self.scheduler.observe(cid, fit_res.metrics or {}, fit_res.num_examples)
+
+    def _note_late(self, server_round, results, failures):
+        """Clients configurés sans résultat ni échec identifié : abandonnés à l'échéance."""
+        configured = self._fit_cids.pop(server_round, None)
+        if self.scheduler is None or not configured:
+            return
+        answered = {proxy.cid for proxy, _ in results}
+        answered |= {f[0].cid for f in failures if isinstance(f, tuple)}
+        late = sorted(configured - answered)
+        for cid in late:
+            self.scheduler.missed(cid)
+        if late:
+            names = [self.scheduler.stats.get(c, {}).get("client_id", c) for c in late]
+            print(f"[SCHED] Round {server_round} : résultats abandonnés à l'échéance pour {names}")
+
+    def _round_name(self, server_round):
+        return self.round_prefix + round_name(server_round, self.session_id)
+
+    # ---------------------------------------------------------------
+    # Checkpoints et envoi du modèle par empreinte
+    # ---------------------------------------------------------------
+    def _save_checkpoint(self, server_round, nds):
+        """Checkpoint du modèle global du round (store partagé + ledger) ; None si désactivé ou en échec."""
+        if not self.checkpoint:
+            return None
+        try:
+            return save_checkpoint(
+                nds, self._round_name(server_round),
+                session_id=self.session_id, server_round=int(server_round),
+            )
+        except Exception as e:
+            print(f"[CKPT] Checkpoint du round {server_round} impossible: {e}")
+            return None
+
+    def _parameters_digest(self, parameters):
+        """
+        Empreinte du modèle envoyé (None en mode full). Un modèle sans checkpoint (initial tiré
+        d'un client...) est d'abord écrit dans le store pour que les clients puissent l'y lire.
+        """
+        if self.model_transfer == "full" or parameters is None:
+            return None
+        if self._model_ref is not None and self._model_ref[0] is parameters:
+            return self._model_ref[1]
+        try:
+            digest = save_checkpoint(parameters_to_ndarrays(parameters))
+        except Exception as e:
+            print(f"[CKPT] Modèle non écrit dans le store, envoi complet: {e}")
+            return None
+        self._model_ref = (parameters, digest)
+        return digest
+
+    def _skip_transfer(self, instructions, digest, ins_cls):
+        """
+        Remplace le modèle par son empreinte (config["model_digest"]) pour les clients qui le détiennent
+        déjà ou lisent le store partagé. Flower partage une même instruction entre clients :
+        chaque client reçoit ici sa propre instruction.
+        """
+        if digest is None or not instructions:
+            return instructions
+        out, skipped = [], 0
+        for proxy, ins in instructions:
+            config = dict(ins.config, model_digest=digest)
+            if self._client_has_model(proxy.cid, digest):
+                out.append((proxy, ins_cls(Parameters(tensors=[], tensor_type=ins.parameters.tensor_type), config)))
+                skipped += 1
+            else:
+                out.append((proxy, ins_cls(ins.parameters, config)))
+        if skipped:
+            print(f"[CKPT] Modèle {digest[:12]} envoyé par empreinte à {skipped}/{len(out)} clients")
+        return out
+
+    def _client_has_model(self, cid, digest):
+        if self.model_transfer == "store":
+            return True
+        info = self._client_models.get(cid)
+        return info is not None and (info["held"] == digest or info["store"])
+
+    def note_client_model(self, cid, metrics=None):
+        """Retient le modèle détenu par un client (metrics held_digest/ckpt_store) ; None l'oublie (échec)."""
+        if metrics is None:
+            self._client_models.pop(cid, None)
+        elif metrics.get("held_digest"):
+            self._client_models[cid] = {"held": metrics["held_digest"], "store": bool(metrics.get("ckpt_store"))}
+
+    def _note_results(self, results, failures):
+        for proxy, res in results:
+            self.note_client_model(proxy.cid, res.metrics or {})
+        for failure in failures:
+            if isinstance(failure, tuple):
+                self.note_client_model(failure[0].cid)
+
+    def _decode_fit_res(self, fit_res, base=None):
+        """
+        Décode UNE fois un FitRes en liste de ndarrays float32 (codec appliqué).
+        base : modèle de référence des deltas (par défaut le global du round courant).
+        Retourne (ndarrays, octets reçus, octets float32 équivalents).
+        """
+        base = self._global_nd if base is None else base
+        wire = sum(len(t) for t in fit_res.parameters.tensors)
+        nds = parameters_to_ndarrays(fit_res.parameters)
+        codec = (fit_res.metrics or {}).get("codec", "none")
+        if codec != "none":
+            if base is None:
+                raise RuntimeError(f"[CODEC] Mise à jour {codec} reçue sans modèle global de référence")
+            nds = decode_update(nds, base, codec)
+        return nds, wire, sum(w.nbytes for w in nds)
+
+    @staticmethod
+    def _client_commitment(metrics):
+        """Engagement annoncé dans les fit metrics : {"root", "leaves"|None}, ou None."""
+        if not metrics or "commit_root" not in metrics:
+            return None
+        try:
+            leaves = metrics.get("commit_leaves")
+            return {
+                "root": int(metrics["commit_root"]),
+                "leaves": leaves_from_bytes(leaves) if leaves else None,
+            }
+        except (TypeError, ValueError) as e:
+            print(f"[Commitments] Engagement client illisible ({metrics.get('client_id')}): {e}")
+            return None
+
+    @staticmethod
+    def _export_selection(results):
+        """Indices (dans results) des 2 clients exportés pour la preuve : tri stable par client_id."""
+        def _key(i):
+            m = results[i][1].metrics or {}
+            return m.get("client_id", "zz")
+        return sorted(range(len(results)), key=_key)[:2] if len(results) >= 2 else []
+
+    def _aggregate_streaming(self, server_round, results, export_idx):
+        """
+        Moyenne pondérée en flux : chaque FitRes est décodé une seule fois et accumulé
+        couche par couche dans un unique buffer float64 préalloué. Seuls les tenseurs
+        décodés des clients exportés sont conservés, sans copie (l'export ZKP les lit en flux).
+        Mémoire de pointe ~ taille du modèle (et non taille du modèle × clients).
+        """
+        shapes, acc, total = None, None, 0
+        kept = {}
+        wire_bytes, raw_bytes = 0, 0
+
+        for i, (_, fit_res) in enumerate(results):
+            nds, wire, raw = self._decode_fit_res(fit_res)
+            wire_bytes += wire
+            raw_bytes += raw
+            if acc is None:
+                shapes = [w.shape for w in nds]
+                acc = np.zeros(sum(w.size for w in nds), dtype=np.float64)
+            elif [w.shape for w in nds] != shapes:
+                raise RuntimeError(f"[AGG] Forme de modèle incohérente pour le client {i}")
+
+            n = int(fit_res.num_examples)
+            off = 0
+            for w in nds:
+                v = w.ravel()
+                acc[off:off + v.size] += v * np.float64(n)
+                off += v.size
+            if i in export_idx:
+                kept[i] = nds
+            total += n
+            del nds
+
+        if acc is None or total == 0:
+            return None, None, kept, wire_bytes, raw_bytes
+
+        acc /= total
+        avg_flat = acc.astype(np.float32)
+        del acc
+        aggregated, off = [], 0
+        for shape in shapes:
+            size = int(np.prod(shape))
+            aggregated.append(avg_flat[off:off + size].reshape(shape))
+            off += size
+
+        if self.update_codec != "none":
+            ratio = raw_bytes / wire_bytes if wire_bytes else 0.0
+            print(
+                f"[CODEC] Round {server_round} ({self.update_codec}) : "
+                f"{wire_bytes / 1e6:.3f} MB reçus vs {raw_bytes / 1e6:.3f} MB en float32 (x{ratio:.1f})"
+            )
+        return aggregated, avg_flat, kept, wire_bytes, raw_bytes
+
+    def _export_round(self, server_round, exported, avg_flat, sub_rounds=None):
+        """
+        Écrit les poids (w1.npy, w2.npy, avg.npy) et les métadonnées (clients.json/avg.json),
+        puis lance l'export des chunks (+ prove/verify si ZKP_AUTOPROVE=1).
+        exported : liste de (client_id, num_examples, tenseurs ou flat float32, engagement client|None) — 2 clients.
+        Les tenseurs sont transmis tels quels à l'export, qui les parcourt chunk par chunk.
+        Le round est enregistré dans le ledger sous un nom unique par session.
+        sub_rounds : {client_id: round de bord} quand les clients sont des agrégateurs de bord
+        (clients.json relie alors chaque poids au round, commité et prouvé, qui l'a produit).
+        """
+        name = self._round_name(server_round)
+        save_dir = os.path.join(paths.zkp_dir(), name)
+        if os.path.exists(save_dir):
+            shutil.rmtree(save_dir)
+        os.makedirs(save_dir, exist_ok=True)
+
+        ledger = get_ledger()
+        ledger.upsert_round(
+            name,
+            session_id=self.session_id,
+            server_round=int(server_round),
+            zkp_dir=os.path.abspath(save_dir),
+            proof_status="pending",
+        )
+        ledger.set_client_roots(name, [
+            (slot, cid, int(n), None) for slot, (cid, n, _, _) in zip(("w1", "w2"), exported)
+        ])
+
+        clients_payload = []
+        for slot, (cid, n, tensors, _) in zip(("w1", "w2"), exported):
+            save_weights(os.path.join(save_dir, f"{slot}.npy"), tensors if isinstance(tensors, list) else [tensors])
+            clients_payload.append({"client_id": cid, "num_examples": int(n), "weights_file": f"{slot}.npy"})
+            if sub_rounds and cid in sub_rounds:
+                clients_payload[-1]["edge_round"] = sub_rounds[cid]
+        with open(os.path.join(save_dir, "clients.json"), "w") as f:
+            json.dump({"clients": clients_payload}, f, indent=2)
+
+        save_weights(os.path.join(save_dir, "avg.npy"), [avg_flat])
+        with open(os.path.join(save_dir, "avg.json"), "w") as f:
+            json.dump({"weights_file": "avg.npy"}, f, indent=2)
+
+        #  Appel central : export des chunks (+ prove/verify si ZKP_AUTOPROVE=1)
+        export_and_maybe_prove(
+            save_dir,
+            weights=(exported[0][2], exported[1][2], avg_flat),
+            client_commitments=(exported[0][3], exported[1][3]),
+        )
+
+    @staticmethod
+    def _weighted_fit_metrics(metrics_list):
+        """Moyenne pondérée (num_examples) des métriques numériques, hors clés du codec."""
+        train_metrics = {}
+        total = sum(n for n, _ in metrics_list) or 0
+        if total > 0:
+            keys = set().union(*(m.keys() for _, m in metrics_list)) if metrics_list else set()
+            keys -= set(CODEC_METRIC_KEYS) | set(COMMIT_METRIC_KEYS) | set(MODEL_METRIC_KEYS) | set(EDGE_METRIC_KEYS)
+            for k in keys:
+                vals = [(n, m[k]) for n, m in metrics_list if k in m and isinstance(m[k], (int, float))]
+                if vals:
+                    s_num = sum(n * v for n, v in vals)
+                    s_den = sum(n for n, _ in vals)
+                    if s_den > 0:
+                        train_metrics[k] = s_num / s_den
+        return train_metrics
 
     def aggregate_fit(self, server_round, results, failures):
-        # 1) Agrégation standard FedAvg
-        parameters_aggregated, _ = super().aggregate_fit(server_round, results, failures)
+        # 1) Agrégation FedAvg en flux (décodage unique de chaque FitRes, codec inclus)
+        self._note_results(results, failures)
+        for proxy, res in results:
+            self.note_fit_stats(proxy.cid, res)
+        self._note_late(server_round, results, failures)
+        if not results or (failures and not self.accept_failures):
+            return None, {}
+        t0 = time.perf_counter()
+        export_idx = self._export_selection(results)
+        aggregated, avg_flat, kept, wire_bytes, raw_bytes = self._aggregate_streaming(
+            server_round, results, export_idx
+        )
+        parameters_aggregated = ndarrays_to_parameters(aggregated) if aggregated is not None else None
+        t_agg = time.perf_counter() - t0
 
-        # 2) Export ZKP (2 clients + moyenne), puis (optionnel) preuve/verify
+        # 2) Checkpoint du modèle global (warm start de la session suivante, envoi par empreinte)
+        if aggregated is not None:
+            digest = self._save_checkpoint(server_round, aggregated)
+            if digest is not None:
+                self._model_ref = (parameters_aggregated, digest)
+        t_ckpt = time.perf_counter() - t0 - t_agg
+
+        # 3) Export ZKP (2 clients + moyenne), puis (optionnel) preuve/verify
         try:
-            save_dir = f"/app/shared/zkp/round{server_round}"
-            if os.path.exists(save_dir):
-                shutil.rmtree(save_dir)
-            os.makedirs(save_dir, exist_ok=True)
-
-            if len(results) >= 2:  # si <2, on skip l'export proprement
-                # Tri stable par client_id si dispo
-                def _key(res):
-                    m = res[1].metrics or {}
-                    return m.get("client_id", "zz")
-                sorted_results = sorted(results, key=_key)[:2]
-
-                # clients.json
-                clients_payload = []
-                for _, fit_res in sorted_results:
-                    w_nd = parameters_to_ndarrays(fit_res.parameters)
-                    flat = np.concatenate([w.ravel() for w in w_nd]).astype(float).tolist()
-                    clients_payload.append({
-                        "client_id": (fit_res.metrics or {}).get("client_id", "unknown"),
-                        "num_examples": int(fit_res.num_examples),
-                        "flat_weights": flat,
-                    })
-                with open(os.path.join(save_dir, "clients.json"), "w") as f:
-                    json.dump({"clients": clients_payload}, f, indent=2)
-
-                # avg.json
-                if parameters_aggregated is not None:
-                    w_avg_nd = parameters_to_ndarrays(parameters_aggregated)
-                    w_avg_flat = np.concatenate([w.ravel() for w in w_avg_nd]).astype(float).tolist()
-                    with open(os.path.join(save_dir, "avg.json"), "w") as f:
-                        json.dump({"avg": w_avg_flat}, f, indent=2)
-
-                #  Appel central : export des chunks (+ prove/verify si ZKP_AUTOPROVE=1)
-                export_and_maybe_prove(save_dir)
+            if len(export_idx) == 2 and avg_flat is not None:  # si <2, on skip l'export proprement
+                exported = [
+                    (
+                        (results[i][1].metrics or {}).get("client_id", "unknown"),
+                        results[i][1].num_examples,
+                        kept[i],
+                        self._client_commitment(results[i][1].metrics),
+                    )
+                    for i in export_idx
+                ]
+                sub_rounds = {
+                    m["client_id"]: m["edge_round"]
+                    for m in (results[i][1].metrics or {} for i in export_idx) if "edge_round" in m
+                }
+                self._export_round(server_round, exported, avg_flat, sub_rounds)
 
         except Exception as e:
             print(f"[ZKP] Erreur sauvegarde/export/prove round {server_round}: {e}")
+        self.timings[server_round] = {
+            "aggregation_time": t_agg,
+            "checkpoint_time": t_ckpt,
+            "zkp_export_time": time.perf_counter() - t0 - t_agg - t_ckpt,
+        }
 
-        # 3) Agrégation de métriques
+        # 4) Agrégation de métriques (sur les résultats reçus, même si des clients ont échoué / dépassé l'échéance)
         train_metrics = {}
         try:
-            if results and not failures:
+            if results:
                 metrics_list = [(r.num_examples, r.metrics or {}) for _, r in results]
-                total = sum(n for n, _ in metrics_list) or 0
-                if total > 0:
-                    keys = set().union(*(m.keys() for _, m in metrics_list)) if metrics_list else set()
-                    for k in keys:
-                        vals = [(n, m[k]) for n, m in metrics_list if k in m and isinstance(m[k], (int, float))]
-                        if vals:
-                            s_num = sum(n * v for n, v in vals)
-                            s_den = sum(n for n, _ in vals)
-                            if s_den > 0:
-                                train_metrics[k] = s_num / s_den
+                train_metrics = self._weighted_fit_metrics(metrics_list)
+                train_metrics["fit_failures"] = len(failures)
+                train_metrics["update_bytes"] = wire_bytes
+                train_metrics["update_bytes_raw"] = raw_bytes
+                train_metrics.update(self.timings[server_round])
                 log_metrics(self.log_file, server_round, train_metrics or None, None)
         except Exception as e:
             print(f"[METRICS] Erreur agrégation métriques round {server_round}: {e}")
             train_metrics = {}
 
-        # 4) Retour Flower
+        # 5) Retour Flower
         return parameters_aggregated, train_metrics
 
 
+    def evaluate(self, server_round, parameters):
+        """
+        evaluate_fn lancé en arrière-plan : l'évaluation du modèle global du round r
+        tourne pendant le fit du round r+1 (résultat journalisé dès qu'il est prêt).
+        """
+        if self._background_eval is None:
+            return None
+        config = self.on_evaluate_config_fn(server_round) if self.on_evaluate_config_fn is not None else {}
+        self._background_eval.submit(server_round, parameters_to_ndarrays, parameters, config)
+        return None
+
+    def _log_server_eval(self, server_round, loss, metrics):
+        self.server_eval[server_round] = (loss, metrics)
+        print(
+            f"[EVAL] Round {server_round} (serveur) : loss={loss:.4f} "
+            f"accuracy={metrics.get('accuracy', float('nan')):.4f} ({metrics.get('eval_time', 0.0):.2f}s)"
+        )
+        log_metrics(self.log_file, server_round, None, metrics, eval_phase="SERVER_EVAL")
+
+    def finish_evaluations(self, timeout=None):
+        """Attend les évaluations serveur en cours (fin d'entraînement)."""
+        if self._background_eval is not None:
+            self._background_eval.drain(timeout)
+
+    def configure_evaluate(self, server_round, parameters, client_manager):
+        """Évaluation fédérée (val_loader des clients) seulement tous les `federated_eval_every` rounds."""
+        if server_round % self.federated_eval_every != 0:
+            return []
+        instructions = super().configure_evaluate(server_round, parameters, client_manager)
+        return self._skip_transfer(instructions, self._parameters_digest(parameters), EvaluateIns)
+
     def aggregate_evaluate(self, server_round, results, failures):
+        self._note_results(results, failures)
         aggregated_loss, _ = super().aggregate_evaluate(server_round, results, failures)
-        if results and not failures:
+        if results:
             metrics_list = [
                 (r.num_examples, r.metrics)
                 for _, r in results if r.metrics is not None 
             ]
             eval_metrics = weighted_average(metrics_list)
+            eval_metrics["eval_failures"] = len(failures)
             log_metrics(self.log_file, server_round, None, eval_metrics)
             return aggregated_loss, eval_metrics
-        return aggregated_loss, {}
\ No newline at end of file
+        return aggregated_loss, {}
+
+class DeadlineServer(Server):
+    """
+    Serveur Flower synchrone dont le délai de fit suit l'échéance calculée par la stratégie
+    pour chaque round : les résultats arrivés après l'échéance sont abandonnés (échecs).
+    """
+
+    def fit_round(self, server_round, timeout):
+        return super().fit_round(server_round, self.strategy.fit_timeout(server_round, timeout))
@@ -0,0 +1,94 @@
+# tests/test_mmr.py
+"""Merkle Mountain Range des racines de rounds : racine, preuves d'appartenance et de consistance."""
+import pytest
+
+from utils.ledger import Ledger
+from utils.mmr import RoundMMR, bag, leaf_hash, merge, peaks, verify_consistency, verify_membership
+
+N = 13
+
+
+def _roots(i, salt=0):
+    return {"root_w1": str(1000 + i + salt), "root_w2": str(2000 + i), "root_avg": str(3000 + i)}
+
+
+def _naive_root(leaves):
+    """Racine recalculée sans le ledger : arbres parfaits successifs de la décomposition binaire."""
+    out, offset = [], 0
+    for h, _ in peaks(len(leaves)):
+        level = leaves[offset:offset + (1 << h)]
+        while len(level) > 1:
+            level = [merge(level[j], level[j + 1]) for j in range(0, len(level), 2)]
+        out.append(level[0])
+        offset += 1 << h
+    return bag(len(leaves), out)
+
+
+@pytest.fixture
+def mmr(tmp_path):
+    ledger = Ledger(str(tmp_path / "ledger.sqlite"))
+    mmr = RoundMMR(ledger)
+    for i in range(N):
+        ledger.upsert_round(f"s1_round{i + 1}", session_id=1, server_round=i + 1)
+        assert mmr.append_round(f"s1_round{i + 1}", _roots(i)) == i
+    return mmr
+
+
+def test_peaks_follow_binary_decomposition():
+    assert peaks(13) == [(3, 0), (2, 2), (0, 12)]
+    assert peaks(8) == [(3, 0)]
+    assert peaks(0) == []
+
+
+def test_root_matches_naive_construction(mmr):
+    leaves = [bytes.fromhex(mmr.ledger.mmr_leaf(index=i)["leaf"]) for i in range(N)]
+    for size in range(1, N + 1):
+        assert mmr.root(size) == _naive_root(leaves[:size])
+
+
+def test_leaf_binds_round_and_roots(mmr):
+    row = mmr.ledger.mmr_leaf(name="s1_round1")
+    assert bytes.fromhex(row["leaf"]) == leaf_hash(int(row["chain_round_id"]), 1000, 2000, 3000)
+
+
+def test_recommit_with_same_roots_adds_no_leaf(mmr):
+    assert mmr.append_round("s1_round3", _roots(2)) is None
+    assert mmr.size == N
+    assert mmr.append_round("s1_round3", _roots(2, salt=7)) == N
+
+
+def test_membership_proofs(mmr):
+    for size in range(1, N + 1):
+        root = mmr.root(size)
+        for i in range(size):
+            proof = mmr.membership_proof(index=i, size=size)
+            assert len(proof["siblings"]) <= size.bit_length()
+            assert verify_membership(proof, root)
+
+
+def test_membership_rejects_tampering(mmr):
+    proof = mmr.membership_proof(name="s1_round5")
+    root = mmr.root()
+    assert not verify_membership(dict(proof, leaf_index=proof["leaf_index"] + 1), root)
+    assert not verify_membership(dict(proof, leaf=mmr.membership_proof(name="s1_round6")["leaf"]), root)
+    assert not verify_membership(dict(proof, siblings=proof["siblings"][:-1]), root)
+    assert not verify_membership(proof, mmr.root(N - 1))
+
+
+def test_consistency_proofs(mmr):
+    for new in range(1, N + 1):
+        for old in range(1, new + 1):
+            proof = mmr.consistency_proof(old, new)
+            assert verify_consistency(proof, mmr.root(old), mmr.root(new))
+    proof = mmr.consistency_proof(5, N)
+    assert not verify_consistency(proof, mmr.root(6), mmr.root(N))
+    assert not verify_consistency(proof, mmr.root(5), mmr.root(N - 1))
+
+
+def test_proof_sizes_are_validated(mmr):
+    with pytest.raises(ValueError):
+        mmr.membership_proof(index=0, size=N + 1)
+    with pytest.raises(ValueError):
+        mmr.membership_proof(index=N - 1, size=N - 1)
+    with pytest.raises(KeyError):
+        mmr.membership_proof(name="s9_round1")
@@ -0,0 +1,77 @@
+# tests/test_proof_queue.py
+"""File de preuves du ledger (claim / finish / baux expirés) sur un ledger SQLite temporaire."""
+import time
+
+import pytest
+
+from utils.ledger import Ledger
+
+ROUND = "s1_round1"
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = Ledger(str(tmp_path / "ledger.sqlite"))
+    ledger.upsert_round(ROUND, zkp_dir=str(tmp_path / ROUND))
+    return ledger
+
+
+def _expire(ledger, chunk=0):
+    ledger._conn().execute("UPDATE proof_jobs SET lease_until = ? WHERE chunk = ?", (time.time() - 1, chunk))
+
+
+def test_lease_expired_on_last_attempt_fails_job(ledger):
+    ledger.enqueue_proof_jobs(ROUND, 1, "groth16")
+    for attempt in range(1, 4):
+        job = ledger.claim_proof_job(f"w{attempt}", lease=60, name=ROUND, max_attempts=3)
+        assert job is not None and job["attempts"] == attempt
+        _expire(ledger)    # le worker meurt sans finish_proof_job
+
+    assert ledger.claim_proof_job("w4", lease=60, name=ROUND, max_attempts=3) is None
+    assert ledger.proof_job_counts(ROUND) == {"failed": 1}
+    job = ledger.proof_jobs(ROUND)[0]
+    assert "w3" in job["error"] and job["lease_until"] is None
+
+
+def test_claims_oldest_free_chunk_once(ledger):
+    ledger.enqueue_proof_jobs(ROUND, 3, "groth16", rejected={1: "preflight"})
+    first = ledger.claim_proof_job("w1", lease=60, name=ROUND)
+    second = ledger.claim_proof_job("w2", lease=60, name=ROUND)
+    assert (first["chunk"], second["chunk"]) == (0, 2)
+    assert ledger.claim_proof_job("w3", lease=60, name=ROUND) is None
+    assert ledger.proof_job_counts(ROUND) == {"leased": 2, "failed": 1}
+
+
+def test_expired_lease_is_reclaimed_and_old_worker_loses_it(ledger):
+    ledger.enqueue_proof_jobs(ROUND, 1, "groth16")
+    ledger.claim_proof_job("w1", lease=60, name=ROUND)
+    assert ledger.claim_proof_job("w2", lease=60, name=ROUND) is None
+    _expire(ledger)
+    job = ledger.claim_proof_job("w2", lease=60, name=ROUND)
+    assert job["attempts"] == 2
+    assert not ledger.renew_proof_lease(ROUND, 0, "w1", lease=60)
+    assert ledger.renew_proof_lease(ROUND, 0, "w2", lease=60)
+
+    # le résultat tardif de w1 n'écrase pas le bail de w2
+    ledger.finish_proof_job(ROUND, 0, "w1", ok=False, error="tardif")
+    assert ledger.proof_job_counts(ROUND) == {"leased": 1}
+    ledger.finish_proof_job(ROUND, 0, "w2", ok=True, seconds=1.5)
+    assert ledger.proof_job_counts(ROUND) == {"done": 1}
+
+
+def test_failed_attempts_requeue_then_fail(ledger):
+    ledger.enqueue_proof_jobs(ROUND, 1, "groth16")
+    for attempt in range(1, 3):
+        ledger.claim_proof_job("w", lease=60, name=ROUND, max_attempts=2)
+        ledger.finish_proof_job(ROUND, 0, "w", ok=False, error=f"essai {attempt}", max_attempts=2)
+    assert ledger.proof_job_counts(ROUND) == {"failed": 1}
+    assert ledger.proof_jobs(ROUND)[0]["error"] == "essai 2"
+    assert ledger.claim_proof_job("w", lease=60, name=ROUND, max_attempts=2) is None
+
+
+def test_enqueue_resets_round_jobs(ledger):
+    ledger.enqueue_proof_jobs(ROUND, 2, "groth16")
+    ledger.claim_proof_job("w", lease=60, name=ROUND)
+    ledger.enqueue_proof_jobs(ROUND, 2, "groth16")
+    assert ledger.proof_job_counts(ROUND) == {"queued": 2}
+    assert all(j["attempts"] == 0 for j in ledger.proof_jobs(ROUND))
@@ -0,0 +1,57 @@
+# tests/test_scheduling.py
+"""ThroughputScheduler : échéance par quantile, sélection et budgets de pas."""
+import pytest
+
+from utils.scheduling import ThroughputScheduler
+
+
+def _scheduler(**kwargs):
+    sched = ThroughputScheduler(epochs=2, deadline_quantile=0.5, margin=0.2, min_steps=10, **kwargs)
+    # full_time = 2 époques × 1000 exemples / débit
+    for cid, sps in (("fast", 1000.0), ("mid", 500.0), ("slow", 100.0)):
+        sched.observe(cid, {"samples_per_sec": sps, "batch_size": 10}, 1000)
+    return sched
+
+
+def test_no_deadline_before_calibration():
+    sched = ThroughputScheduler()
+    assert sched.deadline(1) is None
+    assert sched.budget("c", None) == {"epochs": 3}
+    assert sched.select(["a", "b"], None, 2) == ["a", "b"]
+
+
+def test_deadline_is_quantile_plus_margin_and_frozen_per_round():
+    sched = _scheduler()
+    assert sched.deadline(1) == pytest.approx(4.0 / 0.8)     # médiane des durées (2, 4, 20 s)
+    sched.observe("fast", {"samples_per_sec": 1.0}, 1000)
+    assert sched.deadline(1) == pytest.approx(5.0)
+    assert _scheduler(round_timeout=3.0).deadline(1) == 3.0
+
+
+def test_budget_caps_slow_clients_only():
+    sched = _scheduler()
+    deadline = sched.deadline(1)
+    assert sched.budget("fast", deadline) == {"epochs": 2}
+    assert sched.budget("mid", deadline) == {"epochs": 2}
+    assert sched.budget("slow", deadline) == {"epochs": 1, "max_steps": 40}   # 100 ex/s × 4 s / 10
+    assert sched.budget("unknown", deadline) == {"epochs": 2}
+
+
+def test_select_drops_clients_below_min_steps_unless_needed():
+    sched = _scheduler(deadline=0.5)
+    # min_time = 10 pas × 10 / débit : fast 0.1 s, mid 0.2 s, slow 1 s
+    assert sched.select(["fast", "mid", "slow", "new"], 0.5, 2) == ["fast", "mid", "new"]
+    assert sched.select(["fast", "slow"], 0.5, 2) == ["fast", "slow"]
+
+
+def test_missed_deadline_halves_throughput():
+    sched = _scheduler()
+    sched.missed("mid")
+    assert sched.stats["mid"]["sps"] == 250.0 and sched.stats["mid"]["missed"] == 1
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        ThroughputScheduler(deadline_quantile=0.0)
+    with pytest.raises(ValueError):
+        ThroughputScheduler(margin=1.0)
@@ -0,0 +1,65 @@
+# tests/test_startup.py
+"""Démarrage des pairs : imports paresseux (pas de torch / flwr / numpy à l'import) et budget --startup-budget."""
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from utils.startup import StartupProfiler, check_budget
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("torch", "torchvision", "flwr", "numpy")
+
+
+def _run(code, tmp_path, *args):
+    env = dict(os.environ, FL_SHARED_DIR=str(tmp_path / "shared"), FL_COMMITS_DIR=str(tmp_path / "commits"),
+               FL_LOGS_DIR=str(tmp_path / "logs"))
+    return subprocess.run([sys.executable, *(["-c", code] if code else []), *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=300)
+
+
+def _heavy_modules(tmp_path, body):
+    code = (
+        "import sys, json\n"
+        "from utils.startup import StartupProfiler\n"
+        "profiler = StartupProfiler().install()\n"
+        f"{body}\n"
+        f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))\n"
+    )
+    proc = _run(code, tmp_path)
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_flpeer_import_is_lazy(tmp_path):
+    assert _heavy_modules(tmp_path, "import flpeer") == []
+
+
+def test_server_init_is_lazy(tmp_path):
+    body = (
+        "from utils.config import load_or_init_config, session_config\n"
+        "from flpeer import FLPeer\n"
+        "config = load_or_init_config('config.yaml')\n"
+        "server = config['all_peers'][0]\n"
+        "FLPeer(session_config(config, server, server, 0))"
+    )
+    assert _heavy_modules(tmp_path, body) == []
+
+
+def test_check_budget():
+    profiler = StartupProfiler()
+    assert check_budget(profiler, None)
+    assert check_budget(profiler, 60.0)
+    time.sleep(0.01)
+    assert not check_budget(profiler, 0.001)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("flwr") is None, reason="flwr non installé")
+def test_exceeded_startup_budget_exits_3(tmp_path):
+    proc = _run(None, tmp_path, "main.py", "--profile-startup", "--as-role", "server", "--startup-budget", "0.000001")
+    assert proc.returncode == 3, proc.stdout + proc.stderr
+    assert "DÉPASSÉ" in proc.stdout
@@ -0,0 +1,43 @@
+# tests/test_update_codec.py
+"""Codecs des mises à jour : reconstruction serveur et rétroaction d'erreur côté client."""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils.update_codec import CODECS, LOSSY_CODECS, decode_update, encode_update, payload_nbytes
+
+
+def _model(seed):
+    rng = np.random.default_rng(seed)
+    return [rng.standard_normal((8, 16)).astype(np.float32), rng.standard_normal(16).astype(np.float32)]
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_residual_accounts_for_what_was_not_sent(codec):
+    base, weights = _model(0), _model(1)
+    payload, residual = encode_update(weights, base, codec, rng=np.random.default_rng(2), topk_ratio=0.1)
+    decoded = decode_update(payload, base, codec)
+    if codec in LOSSY_CODECS:
+        for w, b, d, r in zip(weights, base, decoded, residual):
+            np.testing.assert_allclose(d - b + r, w - b, atol=1e-5)
+    else:
+        assert residual is None
+        for w, d in zip(weights, decoded):
+            np.testing.assert_allclose(d, w, atol=1e-6)
+
+
+def test_lossy_codecs_shrink_payload():
+    base, weights = _model(0), _model(1)
+    raw = payload_nbytes(weights)
+    for codec in ("fp16", "int8", "topk"):
+        payload, _ = encode_update(weights, base, codec, topk_ratio=0.1)
+        assert payload_nbytes(payload) < raw
+
+
+def test_rejects_unknown_codec_and_mismatched_payload():
+    base = _model(0)
+    with pytest.raises(ValueError):
+        encode_update(base, base, "zip")
+    payload, _ = encode_update(_model(1), base, "int8")
+    with pytest.raises(ValueError):
+        decode_update(payload[:-1], base, "int8")
@@ -0,0 +1,129 @@
+# tools/anchor_rounds.py
+"""
+Ancre on-chain les rounds prouvés du ledger, par lots (FLAnchors.anchorBatch).
+
+Usage:
+  python3 tools/anchor_rounds.py [--batch-size 16] [--backend memory|rpc --rpc-url URL --contract 0x..]
+  python3 tools/anchor_rounds.py --bench 1,4,16,64 [--bench-rounds 64]   # gaz / latence par taille de lot
+  python3 tools/anchor_rounds.py --mmr [--backend ...]   # une seule ancre : racine de la MMR des rounds (utils/mmr.py)
+"""
+import sys, os, time, argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.anchoring import (
+    InProcessChain, JsonRpcChain, RoundAnchor, anchor_for_round, anchor_in_batches, batch_proof, keccak256,
+)
+from utils.ledger import get_ledger
+from utils.mmr import RoundMMR
+
+
+def make_chain(args):
+    if args.backend == "rpc":
+        if not args.contract:
+            raise SystemExit("--contract est requis avec --backend rpc")
+        return JsonRpcChain(args.rpc_url, args.contract, sender=args.sender)
+    return InProcessChain(block_time=args.block_time)
+
+def collect_anchors(status: str):
+    """Ancres des rounds du ledger au statut `status` non encore ancrés (empreintes en flux)."""
+    anchors = []
+    for r in get_ledger().unanchored_rounds(status):
+        if not r.get("zkp_dir"):
+            continue
+        t0 = time.perf_counter()
+        a = anchor_for_round(r["zkp_dir"], r["server_round"] or 0, r["session_id"])
+        print(f"   {a.name}: H_model={a.h_model.hex()[:16]}.. H_artifacts={a.h_artifacts.hex()[:16]}.. "
+              f"({time.perf_counter() - t0:.2f}s)")
+        anchors.append(a)
+    return anchors
+
+def anchor(chain, anchors, batch_size: int):
+    """Soumet par lots et enregistre chaque ancre (racine du lot, tx, gaz) dans le ledger."""
+    ledger = get_ledger()
+    receipts = []
+    for i in range(0, len(anchors), max(1, batch_size)):
+        batch = anchors[i:i + max(1, batch_size)]
+        rcpt = chain.anchor_round(batch[0]) if batch_size <= 1 else chain.anchor_batch(batch)
+        receipts.append(rcpt)
+        ledger.record_anchors([
+            (a.name, a.round_id, a.h_model.hex(), a.h_artifacts.hex(), rcpt.batch_root, rcpt.tx_hash, rcpt.gas_used // len(batch))
+            for a in batch
+        ])
+        print(f"   lot {len(receipts)}: {len(batch)} rounds, gaz {rcpt.gas_used}, {rcpt.latency_s * 1000:.1f} ms, tx {rcpt.tx_hash[:18]}..")
+    return receipts
+
+def anchor_history(chain):
+    """Ancre la racine courante de la MMR (tous les rounds commités) en une transaction."""
+    ledger = get_ledger()
+    mmr = RoundMMR(ledger)
+    mmr.backfill()    # rounds commités avant l'historique
+    size = mmr.size
+    if size == 0:
+        print("Historique vide : aucun round commité.")
+        return None
+    last = ledger.mmr_anchor()
+    if last is not None and last["size"] == size:
+        print(f"Historique déjà ancré ({size} rounds, racine {last['root'][:18]}..)")
+        return None
+    root = mmr.root(size)
+    first, end = ledger.mmr_leaf(index=0), ledger.mmr_leaf(index=size - 1)
+    rcpt = chain.anchor_root(root, size, int(first["chain_round_id"]), int(end["chain_round_id"]))
+    ledger.record_mmr_anchor(size, "0x" + root.hex(), rcpt.tx_hash, rcpt.gas_used)
+    print(f"Historique ancré : {size} rounds, racine 0x{root.hex()[:16]}.., gaz {rcpt.gas_used}, tx {rcpt.tx_hash[:18]}..")
+    return rcpt
+
+def bench(args, sizes, n_rounds: int):
+    """Gaz et latence par taille de lot, sur des ancres synthétiques (nouvelle chaîne par taille)."""
+    anchors = [
+        RoundAnchor(f"bench{i}", i + 1, keccak256(b"m%d" % i), keccak256(b"a%d" % i))
+        for i in range(n_rounds)
+    ]
+    print(f"{'lot':>5} {'tx':>5} {'gaz total':>12} {'gaz/round':>10} {'ms/lot':>8} {'rounds/s':>9}")
+    for size in sizes:
+        chain = make_chain(args)
+        t0 = time.perf_counter()
+        receipts = anchor_in_batches(chain, anchors, size)
+        elapsed = time.perf_counter() - t0
+        gas = sum(r.gas_used for r in receipts)
+        if size > 1 and isinstance(chain, InProcessChain):
+            # contrôle : preuve d'inclusion de la première ancre du premier lot
+            leaves = [a.leaf for a in anchors[:size]]
+            assert chain.verify_round(bytes.fromhex(receipts[0].batch_root[2:]), anchors[0], batch_proof(leaves, 0))
+        print(f"{size:>5} {len(receipts):>5} {gas:>12} {gas / n_rounds:>10.0f} "
+              f"{1000 * elapsed / len(receipts):>8.2f} {n_rounds / max(elapsed, 1e-9):>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ancrage on-chain des rounds par lots (FLAnchors)")
+    parser.add_argument("--backend", choices=["memory", "rpc"], default="memory")
+    parser.add_argument("--rpc-url", default=os.environ.get("FL_CHAIN_RPC", "http://127.0.0.1:8545"))
+    parser.add_argument("--contract", default=os.environ.get("FL_ANCHORS_ADDRESS"))
+    parser.add_argument("--sender", default=None, help="Compte déverrouillé (défaut: eth_accounts[0])")
+    parser.add_argument("--block-time", type=float, default=0.0, help="Backend memory : délai simulé par tx (s)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--status", default="proved", help="Statut de preuve des rounds à ancrer")
+    parser.add_argument("--bench", default=None, help="Tailles de lot à comparer, ex: 1,4,16,64")
+    parser.add_argument("--bench-rounds", type=int, default=64)
+    parser.add_argument("--mmr", action="store_true", help="Ancre la racine de l'historique (MMR) au lieu des rounds")
+    args = parser.parse_args()
+
+    if args.mmr:
+        anchor_history(make_chain(args))
+        return
+
+    if args.bench:
+        bench(args, [int(x) for x in args.bench.split(",")], args.bench_rounds)
+        return
+
+    anchors = collect_anchors(args.status)
+    if not anchors:
+        print("Aucun round à ancrer.")
+        return
+    chain = make_chain(args)
+    t0 = time.perf_counter()
+    receipts = anchor(chain, anchors, args.batch_size)
+    elapsed = time.perf_counter() - t0
+    gas = sum(r.gas_used for r in receipts)
+    print(f"\n{len(anchors)} rounds ancrés en {len(receipts)} transactions, gaz {gas} "
+          f"({gas / len(anchors):.0f}/round), {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
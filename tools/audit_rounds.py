@@ -0,0 +1,63 @@
+# tools/audit_rounds.py
+"""
+Audit de tout l'historique : racines recalculées depuis les poids (= roots.json), puis chaque proof_k.json vérifié.
+Incrémental : un round dont aucun artefact n'a changé depuis le dernier audit est repris du ledger sans relecture ;
+sinon seules les racines / preuves dont l'empreinte a changé sont revérifiées (utils/audit.py).
+
+Usage:
+  python3 tools/audit_rounds.py [round ...] [--jobs 4] [--chunk-jobs 4] [--backend groth16]
+                                [--out audit.json] [--force]
+Rapport JSON (stdout ou --out) : {summary, rounds: {nom: {status, roots, chunks: {verified, failed, missing}}}}.
+Code de sortie 1 si un round a échoué.
+"""
+import sys, os, json, argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import zkp_utils as z
+from utils.audit import audit_rounds, find_committed_rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit incrémental des rounds commités (racines + preuves)")
+    parser.add_argument("rounds", nargs="*", help="Rounds à auditer (défaut: tous les rounds commités)")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1), help="Rounds audités en parallèle")
+    parser.add_argument("--chunk-jobs", type=int, default=os.cpu_count() or 1, help="Vérifications de chunks en parallèle")
+    parser.add_argument("--backend", default=z.BACKEND, choices=z.BACKENDS)
+    parser.add_argument("--circuit-dir", default=z.CIRCUIT_DIR)
+    parser.add_argument("--out", default=None, help="Fichier du rapport JSON (défaut: stdout)")
+    parser.add_argument("--force", action="store_true", help="Ignore le cache et revérifie tout")
+    args = parser.parse_args()
+
+    names = args.rounds or find_committed_rounds()
+    print(f"[AUDIT] {len(names)} rounds", file=sys.stderr)
+    done = [0]
+
+    def _progress(name, rep):
+        done[0] += 1
+        chunks = rep.get("chunks", {})
+        detail = rep.get("error") or (
+            f"{len(chunks.get('verified', []))} vérifiés, {len(chunks.get('failed', {}))} échoués, "
+            f"{len(chunks.get('missing', []))} manquants"
+        )
+        cached = " (cache)" if rep.get("cached") else ""
+        print(f"[{done[0]}/{len(names)}] {name}: {rep['status']}{cached} | {detail}", file=sys.stderr)
+
+    report = audit_rounds(names, args.jobs, args.chunk_jobs, args.backend, args.circuit_dir, args.force, _progress)
+    summary = report["summary"]
+    print(
+        f"[AUDIT] {summary['verified']} vérifiés, {summary['incomplete']} incomplets, {summary['failed']} échoués, "
+        f"{summary['uncommitted']} non commités, {summary['error']} erreurs ({summary['cached']} repris du cache) "
+        f"en {report['seconds']:.1f}s",
+        file=sys.stderr,
+    )
+    if args.out:
+        tmp = args.out + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp, args.out)
+    else:
+        print(json.dumps(report, indent=2))
+    if summary["failed"] or summary["error"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# tools/bench_backends.py
+"""
+Compare groth16 / plonk / fflonk sur notre circuit : setup, prove, verify, tailles.
+
+Le witness (indépendant du backend) est calculé une fois par chunk ; chaque backend
+prouve puis vérifie les mêmes witness. Le ptau doit être assez grand pour plonk/fflonk.
+
+Usage:
+  python3 tools/bench_backends.py <round_name> [--chunks 2] [--backends groth16,plonk,fflonk]
+                                  [--fresh-setup] [--out ./bench_backends] [--report report.json]
+"""
+import sys, os, json, time, shutil, argparse, statistics
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import zkp_utils as z
+
+
+def _ms(t0: float) -> float:
+    return 1000.0 * (time.perf_counter() - t0)
+
+def _size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def bench_backend(backend: str, witnesses, out_dir: str, args) -> dict:
+    files = z.circuit_files(args.circuit_dir, backend=backend)
+    if args.fresh_setup:
+        for key in ("zkey", "vkey"):
+            if os.path.exists(files[key]):
+                os.remove(files[key])
+
+    t0 = time.perf_counter()
+    cached = os.path.exists(files["zkey"])
+    if not cached:
+        z._setup(files["r1cs"], args.ptau, files["zkey"], backend)
+    setup_ms = _ms(t0)
+    if not os.path.exists(files["vkey"]):
+        z._run(f"snarkjs zkey export verificationkey {files['zkey']} {files['vkey']}")
+
+    prove_ms, verify_ms, proof_b, public_b = [], [], [], []
+    for k, wtns in witnesses:
+        proof = os.path.join(out_dir, f"{backend}_proof_{k}.json")
+        publ = os.path.join(out_dir, f"{backend}_public_{k}.json")
+        t0 = time.perf_counter()
+        z._prove(files["zkey"], wtns, proof, publ, backend)
+        prove_ms.append(_ms(t0))
+        t0 = time.perf_counter()
+        z._verify(files["vkey"], publ, proof, backend)
+        verify_ms.append(_ms(t0))
+        proof_b.append(_size(proof))
+        public_b.append(_size(publ))
+
+    return {
+        "backend": backend,
+        "setup_ms": None if cached else setup_ms,
+        "zkey_bytes": _size(files["zkey"]),
+        "prove_ms": statistics.mean(prove_ms),
+        "verify_ms": statistics.mean(verify_ms),
+        "proof_bytes": statistics.mean(proof_b),
+        "public_bytes": statistics.mean(public_b),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des backends snarkjs sur avg2_chunk")
+    parser.add_argument("round_name", help="Round commité (ex: s0_round1)")
+    parser.add_argument("--chunks", type=int, default=2, help="Nombre de chunks prouvés par backend")
+    parser.add_argument("--backends", default=",".join(z.BACKENDS))
+    parser.add_argument("--fresh-setup", action="store_true", help="Refait le setup (mesure son temps)")
+    parser.add_argument("--circuit-dir", default=z.CIRCUIT_DIR)
+    parser.add_argument("--ptau", default=z.PTAU_PATH)
+    parser.add_argument("--out", default="./bench_backends")
+    parser.add_argument("--report", default=None, help="Écrit les résultats en JSON")
+    args = parser.parse_args()
+
+    backends = [b for b in args.backends.split(",") if b]
+    unknown = set(backends) - set(z.BACKENDS)
+    if unknown:
+        raise SystemExit(f"Backends inconnus: {sorted(unknown)}")
+
+    if os.path.exists(args.out):
+        shutil.rmtree(args.out)
+    os.makedirs(args.out)
+
+    z._ensure_ptau(args.ptau)
+    files = z.circuit_files(args.circuit_dir)
+    z._ensure_compiled(files, args.circuit_dir)
+
+    # Witness communs à tous les backends
+    input_files, publics = z.round_circuit_inputs(args.round_name)
+    witnesses = []
+    t0 = time.perf_counter()
+    for k, inp in enumerate(input_files[:args.chunks]):
+        tmp = z.write_circuit_input(inp, publics, os.path.join(args.out, f"_inp_{k}.json"))
+        wtns = os.path.join(args.out, f"witness_{k}.wtns")
+        z._witness_for(files, tmp, wtns)
+        witnesses.append((k, wtns))
+    print(f"Witness: {len(witnesses)} chunks en {_ms(t0):.0f} ms (mode {z.PUBLIC_MODE})")
+
+    results = []
+    for backend in backends:
+        try:
+            results.append(bench_backend(backend, witnesses, args.out, args))
+        except Exception as e:
+            print(f"[{backend}] échec: {e}")
+
+    print(f"\n{'backend':>8} {'setup ms':>10} {'zkey MB':>8} {'prove ms':>10} {'verify ms':>10} {'proof B':>8} {'public B':>9}")
+    for r in results:
+        setup = "cache" if r["setup_ms"] is None else f"{r['setup_ms']:.0f}"
+        print(f"{r['backend']:>8} {setup:>10} {r['zkey_bytes'] / 1e6:>8.1f} {r['prove_ms']:>10.0f} "
+              f"{r['verify_ms']:>10.1f} {r['proof_bytes']:>8.0f} {r['public_bytes']:>9.0f}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"round": args.round_name, "mode": z.PUBLIC_MODE, "chunks": len(witnesses), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# tools/bench_witness.py
+"""
+Witness wasm (node generate_witness.js) vs natif C++ (circom --c) sur les chunks d'un round :
+temps par chunk, accélération, et contrôle que les deux witness sont identiques.
+Compile le générateur natif s'il manque (make, g++, gmp, nlohmann-json, nasm).
+
+Usage:
+  python3 tools/bench_witness.py <round_name> [--chunks 4] [--out ./bench_witness]
+"""
+import sys, os, time, shutil, argparse, statistics
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import zkp_utils as z
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark witness wasm vs natif sur avg2_chunk")
+    parser.add_argument("round_name", help="Round commité (ex: s0_round1)")
+    parser.add_argument("--chunks", type=int, default=4)
+    parser.add_argument("--circuit-dir", default=z.CIRCUIT_DIR)
+    parser.add_argument("--out", default="./bench_witness")
+    args = parser.parse_args()
+
+    files = z.circuit_files(args.circuit_dir)
+    z._ensure_compiled(files, args.circuit_dir)
+    t0 = time.perf_counter()
+    built = os.path.exists(files["native"])
+    if not z._ensure_native_built(files, args.circuit_dir):
+        raise SystemExit("Générateur natif indisponible sur cette machine")
+    if not built:
+        print(f"Compilation native: {time.perf_counter() - t0:.1f}s")
+
+    if os.path.exists(args.out):
+        shutil.rmtree(args.out)
+    os.makedirs(args.out)
+
+    input_files, publics = z.round_circuit_inputs(args.round_name)
+    wasm_ms, native_ms, diff = [], [], []
+    print(f"{'chunk':>5} {'wasm ms':>9} {'natif ms':>9} {'x':>6} {'identique':>9}")
+    for k, inp in enumerate(input_files[:args.chunks]):
+        tmp = z.write_circuit_input(inp, publics, os.path.join(args.out, f"_inp_{k}.json"))
+        same, ms_w, ms_n = z.compare_witness(files, tmp, os.path.join(args.out, f"witness_{k}.wtns"))
+        wasm_ms.append(ms_w)
+        native_ms.append(ms_n)
+        if not same:
+            diff.append(k)
+        print(f"{k:>5} {ms_w:>9.0f} {ms_n:>9.0f} {ms_w / max(ms_n, 1e-9):>6.1f} {'oui' if same else 'NON':>9}")
+
+    if wasm_ms:
+        w, n = statistics.mean(wasm_ms), statistics.mean(native_ms)
+        print(f"\nMoyenne: wasm {w:.0f} ms, natif {n:.0f} ms -> accélération x{w / max(n, 1e-9):.1f}")
+    if diff:
+        raise SystemExit(f"Witness différents sur les chunks {diff}")
+
+if __name__ == "__main__":
+    main()
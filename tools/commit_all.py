@@ -1,26 +1,136 @@
 # tools/commit_all.py
-import sys, os, shutil, json
+"""
+Engagements (Poseidon + Merkle) de tous les rounds historiques, en parallèle et en incrémental.
+
+- un pool de threads dans ce processus ; les workers Poseidon (node --serve) sont partagés ;
+- un round n'est reconstruit que si l'empreinte de ses entrées a changé depuis le dernier commit ;
+- progression + débit, puis index récapitulatif <commits_root>/index.json de toutes les racines ;
+- feuilles de l'historique (MMR) ajoutées après le pool, dans l'ordre des rounds (pas dans l'ordre
+  de fin des threads) : la racine de l'historique ne dépend pas de l'ordonnancement.
+
+Usage:
+  python3 tools/commit_all.py [zkp_root] [commits_root] [--jobs 4] [--poseidon-workers 4] [--force]
+"""
+import sys, os, re, json, time, argparse, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.commitment import build_commitments_for_round, DEFAULT_SCALE, DEFAULT_CHUNK
+from utils import paths
+from utils.commit_integration import integrate_commitments_for_round, round_inputs_digest, committed_digest
+from utils.mmr import append_committed_round
+from utils.poseidon_wrapper import get_pool, POSEIDON_WORKERS
+
+# round<r>, s<session>_round<r>, et sous-rounds des agrégateurs de bord <edge>_s<session>_round<r>
+ROUND_RE = re.compile(r"^(?:(?P<edge>.+?)_)??(?:s(?P<session>\d+)_)?round(?P<round>\d+)$")
+
+
+def _round_key(name: str):
+    m = ROUND_RE.match(name)
+    if not m:
+        return (float("inf"), 0, "")
+    return (int(m.group("session") or -1), int(m.group("round")), m.group("edge") or "")
+
+def find_rounds(zkp_root: str):
+    """Dossiers de round exportés (racine et bords) triés par session, round, puis agrégateur."""
+    names = [
+        n for n in os.listdir(zkp_root)
+        if ROUND_RE.match(n) and os.path.exists(os.path.join(zkp_root, n, "clients.json"))
+    ]
+    return [os.path.join(zkp_root, n) for n in sorted(names, key=_round_key)]
 
+def commit_one(round_dir: str, commits_root: str, force: bool = False) -> dict:
+    name = os.path.basename(os.path.normpath(round_dir))
+    t0 = time.perf_counter()
+    digest = round_inputs_digest(round_dir)
+    if not force and digest == committed_digest(name, commits_root):
+        return {"name": name, "skipped": True, "seconds": time.perf_counter() - t0}
+    integrate_commitments_for_round(round_dir, commits_root=commits_root, inputs_digest=digest, history=False)
+    return {"name": name, "skipped": False, "seconds": time.perf_counter() - t0}
+
+def write_index(commits_root: str, names) -> str:
+    """index.json : racines et paramètres de chaque round commité (écrit atomiquement)."""
+    rounds = []
+    for name in names:
+        roots_path = os.path.join(commits_root, name, "roots.json")
+        status_path = os.path.join(commits_root, name, "status.json")
+        if not os.path.exists(roots_path):
+            continue
+        with open(roots_path) as f:
+            entry = {"name": name, **json.load(f)}
+        if os.path.exists(status_path):
+            with open(status_path) as f:
+                entry["inputs_digest"] = json.load(f).get("inputs_digest")
+        rounds.append(entry)
+    index_path = os.path.join(commits_root, "index.json")
+    tmp = index_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"generated_at": time.time(), "n_rounds": len(rounds), "rounds": rounds}, f, indent=2)
+    os.replace(tmp, index_path)
+    return index_path
 
 def main():
-    # Usage: python3 tools/commit_all.py /path/to/zkp_root /path/to/commits_root [--skip-if-exists]
-    if len(sys.argv) < 3:
-        print("Usage: python3 tools/commit_all.py /path/to/zkp_root /path/to/commits_root [--skip-if-exists]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Commit Poseidon/Merkle de tous les rounds (parallèle, incrémental)")
+    parser.add_argument("zkp_root", nargs="?", default=None, help="Dossier des rounds (défaut: <SHARED>/zkp)")
+    parser.add_argument("commits_root", nargs="?", default=None, help="Dossier des commits (défaut: paths.COMMITS_DIR)")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1), help="Rounds traités en parallèle")
+    parser.add_argument("--poseidon-workers", type=int, default=None, help="Workers Poseidon partagés (défaut: --jobs)")
+    parser.add_argument("--force", action="store_true", help="Reconstruit même si les entrées n'ont pas changé")
+    parser.add_argument("--skip-if-exists", action="store_true", help=argparse.SUPPRESS)  # ancien flag : désormais le défaut
+    args = parser.parse_args()
+
+    zkp_root = args.zkp_root or paths.zkp_dir()
+    commits_root = args.commits_root or paths.COMMITS_DIR
+    os.makedirs(commits_root, exist_ok=True)
 
-    zkp_root = sys.argv[1]
-    commits_root = sys.argv[2]
-    skip_flag = ["--skip-if-exists"] if (len(sys.argv) > 3 and sys.argv[3] == "--skip-if-exists") else []
+    rounds = find_rounds(zkp_root)
+    print("Rounds détectés :", ", ".join(os.path.basename(r) for r in rounds) or "aucun")
+    if not rounds:
+        return
 
-    rounds = sorted([d for d in glob.glob(os.path.join(zkp_root, "round*")) if os.path.isdir(d)])
-    print("Rounds détectés :", ", ".join(os.path.basename(r) for r in rounds))
+    jobs = max(1, args.jobs)
+    if POSEIDON_WORKERS > 0:
+        get_pool(args.poseidon_workers or jobs).warm_up()
 
+    lock = threading.Lock()
+    done = built = skipped = failed = 0
+    failed_names = set()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="commit") as ex:
+        futures = {ex.submit(commit_one, rd, commits_root, args.force): rd for rd in rounds}
+        for fut in as_completed(futures):
+            name = os.path.basename(futures[fut])
+            with lock:
+                done += 1
+                try:
+                    res = fut.result()
+                    if res["skipped"]:
+                        skipped += 1
+                        state = "inchangé"
+                    else:
+                        built += 1
+                        state = f"OK {res['seconds']:.2f}s"
+                except Exception as e:
+                    failed += 1
+                    failed_names.add(name)
+                    state = f"ÉCHEC: {e}"
+                elapsed = time.perf_counter() - t0
+                print(f"[{done}/{len(rounds)}] {name}: {state} | {built / max(elapsed, 1e-9):.2f} rounds/s construits")
+
+    # historique : rounds commités (construits ou inchangés) ajoutés dans l'ordre de find_rounds ;
+    # un round déjà présent avec les mêmes racines n'ajoute pas de feuille
     for rd in rounds:
         name = os.path.basename(rd)
-        print(f"\n==> Commit {rd}  ->  {os.path.join(commits_root, name)}")
-        subprocess.check_call([sys.executable, os.path.join(os.path.dirname(__file__), "commit_round.py"), rd, commits_root, *skip_flag])
+        roots_path = os.path.join(commits_root, name, "roots.json")
+        if name not in failed_names and os.path.exists(roots_path):
+            append_committed_round(name, roots_path, rd)
+
+    elapsed = time.perf_counter() - t0
+    index_path = write_index(commits_root, [os.path.basename(r) for r in rounds])
+    print(
+        f"\n{built} construits, {skipped} inchangés, {failed} échecs en {elapsed:.1f}s "
+        f"({len(rounds) / max(elapsed, 1e-9):.2f} rounds/s) -> {index_path}"
+    )
+    if failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -2,6 +2,7 @@
 import sys, os, shutil, json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.commitment import build_commitments_for_round, DEFAULT_SCALE, DEFAULT_CHUNK
+from utils.ledger import record_roots
 
 
 def _ensure_clean_dir(p: str):
@@ -71,6 +72,7 @@ def main():
 
     # 4) Échange atomique tmp -> final
     _atomic_replace(tmp_out, final_out)
+    record_roots(round_name, os.path.join(final_out, "roots.json"))
     print(f"   OK: {final_out} (écrit atomiquement)")
 
 if __name__ == "__main__":
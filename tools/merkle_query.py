@@ -0,0 +1,103 @@
+# tools/merkle_query.py
+"""
+Preuves d'inclusion Merkle des rounds commités : (round, client, chunk) -> leaf, siblings, pathBits, root.
+Arbres lus depuis commits/<round>/trees.bin (reconstruit une fois pour les anciens rounds), gardés en cache LRU.
+`client` = client_id (ex: client1) ou slot (w1 / w2 / avg).
+
+Usage:
+  python3 tools/merkle_query.py query s0_round3 client1 5 [--verify]
+  python3 tools/merkle_query.py batch requetes.json [--verify]      # [[round, client, chunk], ...]
+  python3 tools/merkle_query.py serve [--host 127.0.0.1] [--port 9300]
+    GET  /proof?round=s0_round3&client=client1&chunk=5
+    POST /proofs  {"queries": [[round, client, chunk], ...]}
+    POST /verify  {"proofs": [preuve, ...]}  -> {"valid": [true, ...]}
+"""
+import sys, os, json, time, argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.merkle_store import get_tree_cache, verify_proofs
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send(self, code: int, payload) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/proof":
+            return self._send(404, {"error": f"route inconnue: {url.path}"})
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            self._send(200, get_tree_cache().query(q["round"], q["client"], int(q["chunk"])))
+        except (KeyError, IndexError, ValueError) as e:
+            self._send(404, {"error": str(e)})
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError as e:
+            return self._send(400, {"error": f"JSON invalide: {e}"})
+        if self.path == "/proofs":
+            return self._send(200, {"proofs": get_tree_cache().query_many(body.get("queries", []))})
+        if self.path == "/verify":
+            return self._send(200, {"valid": verify_proofs(body.get("proofs", []))})
+        self._send(404, {"error": f"route inconnue: {self.path}"})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def _print(proofs, verify: bool) -> None:
+    if verify:
+        valid = verify_proofs([p for p in proofs if "error" not in p])
+        it = iter(valid)
+        for p in proofs:
+            if "error" not in p:
+                p["valid"] = next(it)
+    print(json.dumps(proofs if len(proofs) != 1 else proofs[0], indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preuves d'inclusion Merkle des rounds commités")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    q = sub.add_parser("query")
+    q.add_argument("round")
+    q.add_argument("client", help="client_id ou slot (w1 / w2 / avg)")
+    q.add_argument("chunk", type=int)
+    q.add_argument("--verify", action="store_true", help="Recalcule la racine (Poseidon, comme MerkleVerify)")
+    b = sub.add_parser("batch")
+    b.add_argument("file", help="JSON: [[round, client, chunk], ...]")
+    b.add_argument("--verify", action="store_true")
+    s = sub.add_parser("serve")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=9300)
+    args = parser.parse_args()
+
+    cache = get_tree_cache()
+    if args.cmd == "query":
+        t0 = time.perf_counter()
+        proof = cache.query(args.round, args.client, args.chunk)
+        print(f"[MERKLE] {args.round}: requête en {(time.perf_counter() - t0) * 1e3:.2f} ms (chargement inclus)", file=sys.stderr)
+        _print([proof], args.verify)
+    elif args.cmd == "batch":
+        with open(args.file) as f:
+            queries = json.load(f)
+        _print(cache.query_many(queries), args.verify)
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), Handler)
+        print(f"[MERKLE] Service de preuves sur http://{args.host}:{args.port} (Ctrl-C pour arrêter)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("[MERKLE] arrêt")
+        finally:
+            server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# tools/mmr_history.py
+"""
+Historique des rounds (MMR des racines commitées, utils/mmr.py) : rattrapage, racine, preuves.
+
+Usage:
+  python3 tools/mmr_history.py build                          # ajoute les rounds commités absents (anciens rounds)
+  python3 tools/mmr_history.py root [--size N]
+  python3 tools/mmr_history.py prove s0_round3 [--size N]     # appartenance (O(log n) empreintes)
+  python3 tools/mmr_history.py consistency M [--size N]       # la MMR de taille N prolonge celle de taille M
+  python3 tools/mmr_history.py verify preuve.json [--root 0x..] [--old-root 0x..]
+Sans --root, la racine de confiance est celle ancrée pour la taille de la preuve (ledger).
+"""
+import sys, os, json, argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.ledger import get_ledger
+from utils.mmr import RoundMMR, verify_consistency, verify_membership
+
+
+def _hex(value: str) -> bytes:
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+def _anchored_root(size: int) -> bytes:
+    row = get_ledger().mmr_anchor(size)
+    if row is None:
+        raise SystemExit(f"Aucune racine ancrée pour la taille {size} : préciser --root / --old-root")
+    return _hex(row["root"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Historique des rounds (Merkle Mountain Range des racines)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build")
+    r = sub.add_parser("root")
+    r.add_argument("--size", type=int, default=None)
+    p = sub.add_parser("prove")
+    p.add_argument("round")
+    p.add_argument("--size", type=int, default=None)
+    c = sub.add_parser("consistency")
+    c.add_argument("old_size", type=int)
+    c.add_argument("--size", type=int, default=None)
+    v = sub.add_parser("verify")
+    v.add_argument("file")
+    v.add_argument("--root", default=None, help="Racine de confiance (appartenance) ou nouvelle racine (consistance)")
+    v.add_argument("--old-root", default=None, help="Ancienne racine de confiance (consistance)")
+    args = parser.parse_args()
+
+    ledger = get_ledger()
+    mmr = RoundMMR(ledger)
+    if args.cmd == "build":
+        added = mmr.backfill()
+        print(f"[MMR] {len(added)} rounds ajoutés, taille {mmr.size}" + (f" ({', '.join(added)})" if added else ""))
+    elif args.cmd == "root":
+        size = args.size or mmr.size
+        print(json.dumps({"size": size, "root": "0x" + mmr.root(size).hex()}, indent=2))
+    elif args.cmd == "prove":
+        print(json.dumps(mmr.membership_proof(name=args.round, size=args.size), indent=2))
+    elif args.cmd == "consistency":
+        print(json.dumps(mmr.consistency_proof(args.old_size, args.size), indent=2))
+    else:
+        with open(args.file) as f:
+            proof = json.load(f)
+        if "leaf_index" in proof:
+            root = _hex(args.root) if args.root else _anchored_root(int(proof["size"]))
+            ok = verify_membership(proof, root)
+        else:
+            old_root = _hex(args.old_root) if args.old_root else _anchored_root(int(proof["old_size"]))
+            new_root = _hex(args.root) if args.root else _anchored_root(int(proof["new_size"]))
+            ok = verify_consistency(proof, old_root, new_root)
+        print(json.dumps({"valid": ok}))
+        if not ok:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
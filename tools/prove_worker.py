@@ -0,0 +1,60 @@
+# tools/prove_worker.py
+"""
+Worker de preuve autonome : prend les jobs de la file partagée (ledger) et prouve les chunks.
+Permet d'ajouter de la capacité de preuve hors des pairs (même volume partagé + cache circuit).
+
+Usage:
+  python3 tools/prove_worker.py [--id NOM] [--drain]      # --drain : s'arrête quand la file est vide
+  python3 tools/prove_worker.py --status s0_round3        # état des jobs d'un round
+"""
+import sys, os, time, argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import prove_queue as q
+from utils.ledger import get_ledger
+
+
+def status(name: str) -> None:
+    jobs = get_ledger().proof_jobs(name)
+    if not jobs:
+        print(f"Aucun job pour {name}")
+        return
+    counts = get_ledger().proof_job_counts(name)
+    print(f"{name}: {len(jobs)} jobs {counts}")
+    for j in jobs:
+        lease = f"bail {j['lease_until'] - time.time():.0f}s" if j["status"] == "leased" and j["lease_until"] else ""
+        took = f"{j['seconds']:.1f}s" if j["seconds"] else ""
+        print(f"  chunk {j['chunk']:>4} {j['status']:<7} {j['worker'] or '-':<24} essais={j['attempts']} {took} {lease} "
+              f"{(j['error'] or '')[:60]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de la file de preuves partagée")
+    parser.add_argument("--id", default=None, help="Identifiant du worker (défaut: hostname-pid)")
+    parser.add_argument("--drain", action="store_true", help="Quitte dès que la file est vide")
+    parser.add_argument("--status", default=None, help="Affiche les jobs d'un round et quitte")
+    args = parser.parse_args()
+
+    if args.status:
+        status(args.status)
+        return
+
+    wid = args.id or q.worker_id()
+    t0 = time.perf_counter()
+    if args.drain:
+        proved = 0
+        while True:
+            r = q.work_once(wid)
+            if r is None:
+                break
+            proved += int(r)
+    else:
+        print(f"[ZKP] Worker {wid} en attente de jobs (Ctrl-C pour arrêter)")
+        try:
+            proved = q.run_worker(wid)
+        except KeyboardInterrupt:
+            print(f"[ZKP] {wid} interrompu")
+            return
+    elapsed = time.perf_counter() - t0
+    print(f"[ZKP] {wid} : {proved} chunks prouvés en {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+# utils/anchoring.py
+"""
+Ancrage on-chain des rounds (contrat contracts/FLAnchors.sol).
+
+- H_model     = keccak256(abi.encodePacked(int256[] w_avg_pub)) sur les chunks exportés
+                (modèle agrégé quantifié, padding du dernier chunk compris) ;
+- H_artifacts = keccak256(proof_0 || public_0 || proof_1 || public_1 || ...) (octets des fichiers) ;
+- feuille     = keccak256(abi.encode(roundId, H_model, H_artifacts)) ;
+- lot         = racine Merkle (paires triées, style OpenZeppelin) des feuilles -> anchorBatch() ;
+- historique  = racine de la MMR des racines de rounds (utils/mmr.py) -> anchorBatch(racine, n, premier, dernier) :
+                une seule ancre couvre tous les rounds commités.
+
+Les deux empreintes sont calculées en flux (un chunk / un bloc de fichier à la fois).
+Deux backends : InProcessChain (EVM simulé + modèle de gaz, pour tests et benchmarks) et
+JsonRpcChain (nœud de dev geth, compte déverrouillé, contrat déjà déployé).
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# -------------------------------
+# keccak256 (pycryptodome si présent, sinon implémentation Python pure)
+# -------------------------------
+_RC = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+_ROT = [
+    [0, 36, 3, 41, 18], [1, 44, 10, 45, 2], [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56], [27, 20, 39, 8, 14],
+]
+_MASK = (1 << 64) - 1
+
+
+def _keccak_f(A: List[int]) -> None:
+    """Permutation keccak-f[1600] en place ; A[x + 5*y] = lane 64 bits."""
+    for rc in _RC:
+        C = [A[x] ^ A[x + 5] ^ A[x + 10] ^ A[x + 15] ^ A[x + 20] for x in range(5)]
+        D = [C[(x - 1) % 5] ^ (((C[(x + 1) % 5] << 1) | (C[(x + 1) % 5] >> 63)) & _MASK) for x in range(5)]
+        B = [0] * 25
+        for x in range(5):
+            dx = D[x]
+            for y in range(5):
+                v = A[x + 5 * y] ^ dx
+                r = _ROT[x][y]
+                B[y + 5 * ((2 * x + 3 * y) % 5)] = ((v << r) | (v >> (64 - r))) & _MASK if r else v
+        for y in range(5):
+            row = B[5 * y:5 * y + 5]
+            for x in range(5):
+                A[x + 5 * y] = row[x] ^ (~row[(x + 1) % 5] & row[(x + 2) % 5])
+        A[0] ^= rc
+
+
+class _PyKeccak256:
+    rate = 136
+
+    def __init__(self, data: bytes = b""):
+        self._state = [0] * 25
+        self._buf = bytearray()
+        if data:
+            self.update(data)
+
+    def _absorb(self, block) -> None:
+        A = self._state
+        for i in range(self.rate // 8):
+            A[i] ^= int.from_bytes(block[8 * i:8 * i + 8], "little")
+        _keccak_f(A)
+
+    def update(self, data: bytes) -> "_PyKeccak256":
+        self._buf += data
+        n = len(self._buf) - len(self._buf) % self.rate
+        for off in range(0, n, self.rate):
+            self._absorb(self._buf[off:off + self.rate])
+        del self._buf[:n]
+        return self
+
+    def digest(self) -> bytes:
+        A = list(self._state)
+        block = bytearray(self._buf) + bytearray(self.rate - len(self._buf))
+        block[len(self._buf)] ^= 0x01          # padding keccak (≠ SHA3-256 : 0x06)
+        block[-1] ^= 0x80
+        saved, self._state = self._state, A
+        self._absorb(block)
+        self._state = saved
+        return b"".join(A[i].to_bytes(8, "little") for i in range(4))
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+
+try:
+    from Crypto.Hash import keccak as _crypto_keccak
+
+    def keccak256_hasher(data: bytes = b""):
+        return _crypto_keccak.new(data=data, digest_bits=256)
+except ImportError:  # pycryptodome absent
+    def keccak256_hasher(data: bytes = b""):
+        return _PyKeccak256(data)
+
+
+def keccak256(data: bytes) -> bytes:
+    return keccak256_hasher(data).digest()
+
+
+def selector(signature: str) -> bytes:
+    """Sélecteur de fonction Solidity (4 premiers octets de keccak256(signature))."""
+    return keccak256(signature.encode())[:4]
+
+
+# -------------------------------
+# Empreintes d'un round (en flux)
+# -------------------------------
+def _word(x: int) -> bytes:
+    """int256 big-endian, complément à deux (abi.encodePacked d'un int256)."""
+    return int(x).to_bytes(32, "big", signed=True)
+
+
+def model_hash(round_dir: str) -> bytes:
+    """H_model : keccak256 des w_avg_pub de inputs/input_chunk_k.json, chunk par chunk."""
+    inputs_dir = os.path.join(round_dir, "inputs")
+    with open(os.path.join(round_dir, "meta.json")) as f:
+        n_chunks = int(json.load(f)["n_chunks"])
+    h = keccak256_hasher()
+    for k in range(n_chunks):
+        with open(os.path.join(inputs_dir, f"input_chunk_{k}.json")) as f:
+            h.update(b"".join(_word(x) for x in json.load(f)["w_avg_pub"]))
+    return h.digest()
+
+
+def artifacts_hash(round_dir: str, n_chunks: Optional[int] = None, block: int = 1 << 16) -> bytes:
+    """H_artifacts : keccak256(proof_0 || public_0 || ...) lu par blocs."""
+    if n_chunks is None:
+        with open(os.path.join(round_dir, "meta.json")) as f:
+            n_chunks = int(json.load(f)["n_chunks"])
+    h = keccak256_hasher()
+    for k in range(n_chunks):
+        for name in (f"proof_{k}.json", f"public_{k}.json"):
+            with open(os.path.join(round_dir, name), "rb") as f:
+                for buf in iter(lambda: f.read(block), b""):
+                    h.update(buf)
+    return h.digest()
+
+
+def round_id(server_round: int, session: Optional[int] = None) -> int:
+    """roundId on-chain : (session << 32) | round (session 0 hors daemon)."""
+    return ((session or 0) << 32) | int(server_round)
+
+
+@dataclass
+class RoundAnchor:
+    name: str
+    round_id: int
+    h_model: bytes
+    h_artifacts: bytes
+
+    @property
+    def leaf(self) -> bytes:
+        return keccak256(self.round_id.to_bytes(32, "big") + self.h_model + self.h_artifacts)
+
+
+def anchor_for_round(round_dir: str, server_round: int, session: Optional[int] = None) -> RoundAnchor:
+    return RoundAnchor(
+        name=os.path.basename(os.path.normpath(round_dir)),
+        round_id=round_id(server_round, session),
+        h_model=model_hash(round_dir),
+        h_artifacts=artifacts_hash(round_dir),
+    )
+
+
+# -------------------------------
+# Merkle (paires triées, compatible MerkleProof d'OpenZeppelin)
+# -------------------------------
+def _hash_pair(a: bytes, b: bytes) -> bytes:
+    return keccak256(a + b) if a < b else keccak256(b + a)
+
+
+def batch_root(leaves: Sequence[bytes]) -> bytes:
+    if not leaves:
+        raise ValueError("[Anchor] Lot vide")
+    level = list(leaves)
+    while len(level) > 1:
+        nxt = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])      # nœud impair promu tel quel
+        level = nxt
+    return level[0]
+
+
+def batch_proof(leaves: Sequence[bytes], index: int) -> List[bytes]:
+    """Chemin Merkle de la feuille `index` (pour FLAnchors.verifyRound)."""
+    proof, level, i = [], list(leaves), index
+    while len(level) > 1:
+        sib = i ^ 1
+        if sib < len(level):
+            proof.append(level[sib])
+        nxt = [_hash_pair(level[j], level[j + 1]) for j in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level, i = nxt, i // 2
+    return proof
+
+
+def verify_proof(leaf: bytes, proof: Sequence[bytes], root: bytes) -> bool:
+    h = leaf
+    for p in proof:
+        h = _hash_pair(h, p)
+    return h == root
+
+
+# -------------------------------
+# ABI (arguments statiques uniquement)
+# -------------------------------
+SIG_ANCHOR_ROUND = "anchorRound(uint256,bytes32,bytes32)"
+SIG_ANCHOR_BATCH = "anchorBatch(bytes32,uint256,uint256,uint256)"
+
+
+def encode_call(signature: str, *args) -> bytes:
+    out = selector(signature)
+    for a in args:
+        out += a.rjust(32, b"\0") if isinstance(a, bytes) else int(a).to_bytes(32, "big")
+    return out
+
+
+def calldata_gas(data: bytes) -> int:
+    return sum(4 if b == 0 else 16 for b in data)
+
+
+# -------------------------------
+# Backends
+# -------------------------------
+@dataclass
+class TxReceipt:
+    tx_hash: str
+    gas_used: int
+    latency_s: float
+    n_rounds: int
+    batch_root: Optional[str] = None
+
+
+class InProcessChain:
+    """
+    Contrat FLAnchors simulé en mémoire, avec un modèle de gaz simplifié (tarifs post-Berlin) :
+    21000 + calldata + SSTORE à froid (22100 / emplacement) + LOG (375 + 375/topic + 8/octet).
+    """
+    G_TX, G_SSTORE_COLD, G_LOG, G_LOG_TOPIC, G_LOG_BYTE, G_EXEC = 21000, 22100, 375, 375, 8, 2500
+
+    def __init__(self, block_time: float = 0.0):
+        self.block_time = block_time
+        self.anchors: Dict[int, Tuple[bytes, bytes]] = {}
+        self.batches: Dict[bytes, Tuple[int, int, int]] = {}
+        self.events: List[Tuple[str, tuple]] = []
+        self._nonce = 0
+
+    def _receipt(self, data: bytes, gas: int, t0: float, n: int, root: Optional[bytes] = None) -> TxReceipt:
+        if self.block_time:
+            time.sleep(self.block_time)
+        self._nonce += 1
+        return TxReceipt(
+            tx_hash="0x" + keccak256(self._nonce.to_bytes(32, "big") + data).hex(),
+            gas_used=self.G_TX + calldata_gas(data) + gas,
+            latency_s=time.perf_counter() - t0,
+            n_rounds=n,
+            batch_root=None if root is None else "0x" + root.hex(),
+        )
+
+    def anchor_round(self, a: RoundAnchor) -> TxReceipt:
+        t0 = time.perf_counter()
+        if a.round_id in self.anchors:
+            raise RuntimeError("round already anchored")
+        data = encode_call(SIG_ANCHOR_ROUND, a.round_id, a.h_model, a.h_artifacts)
+        self.anchors[a.round_id] = (a.h_model, a.h_artifacts)
+        self.events.append(("RoundAnchored", (a.round_id, a.h_model, a.h_artifacts)))
+        gas = self.G_EXEC + 3 * self.G_SSTORE_COLD + self.G_LOG + 2 * self.G_LOG_TOPIC + 64 * self.G_LOG_BYTE
+        return self._receipt(data, gas, t0, 1)
+
+    def anchor_batch(self, anchors: Sequence[RoundAnchor]) -> TxReceipt:
+        return self.anchor_root(batch_root([a.leaf for a in anchors]), len(anchors), anchors[0].round_id, anchors[-1].round_id)
+
+    def anchor_root(self, root: bytes, count: int, first: int, last: int) -> TxReceipt:
+        t0 = time.perf_counter()
+        if root in self.batches:
+            raise RuntimeError("batch already anchored")
+        data = encode_call(SIG_ANCHOR_BATCH, root, count, first, last)
+        self.batches[root] = (count, first, last)
+        self.events.append(("BatchAnchored", (root, count, first, last)))
+        gas = self.G_EXEC + 2 * self.G_SSTORE_COLD + self.G_LOG + 2 * self.G_LOG_TOPIC + 96 * self.G_LOG_BYTE
+        return self._receipt(data, gas, t0, count, root)
+
+    def verify_round(self, root: bytes, a: RoundAnchor, proof: Sequence[bytes]) -> bool:
+        return root in self.batches and verify_proof(a.leaf, proof, root)
+
+
+class JsonRpcChain:
+    """
+    Nœud JSON-RPC (geth --dev, voir chain/) : eth_sendTransaction depuis un compte déverrouillé
+    vers un contrat FLAnchors déjà déployé ; attend le reçu pour mesurer gaz et latence.
+    """
+
+    def __init__(self, url: str, contract: str, sender: Optional[str] = None, poll: float = 0.2, timeout: float = 120.0):
+        self.url = url
+        self.contract = contract
+        self.poll = poll
+        self.timeout = timeout
+        self._id = 0
+        self.sender = sender or self._rpc("eth_accounts")[0]
+
+    def _rpc(self, method: str, *params):
+        self._id += 1
+        body = json.dumps({"jsonrpc": "2.0", "id": self._id, "method": method, "params": list(params)}).encode()
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=30) as r:
+            out = json.load(r)
+        if "error" in out:
+            raise RuntimeError(f"[Anchor] RPC {method}: {out['error']}")
+        return out["result"]
+
+    def _send(self, data: bytes, n: int, root: Optional[bytes] = None) -> TxReceipt:
+        t0 = time.perf_counter()
+        tx_hash = self._rpc("eth_sendTransaction", {"from": self.sender, "to": self.contract, "data": "0x" + data.hex()})
+        deadline = time.time() + self.timeout
+        while True:
+            rcpt = self._rpc("eth_getTransactionReceipt", tx_hash)
+            if rcpt is not None:
+                break
+            if time.time() > deadline:
+                raise TimeoutError(f"[Anchor] Pas de reçu pour {tx_hash}")
+            time.sleep(self.poll)
+        if int(rcpt.get("status", "0x1"), 16) != 1:
+            raise RuntimeError(f"[Anchor] Transaction annulée: {tx_hash}")
+        return TxReceipt(tx_hash, int(rcpt["gasUsed"], 16), time.perf_counter() - t0, n,
+                         None if root is None else "0x" + root.hex())
+
+    def anchor_round(self, a: RoundAnchor) -> TxReceipt:
+        return self._send(encode_call(SIG_ANCHOR_ROUND, a.round_id, a.h_model, a.h_artifacts), 1)
+
+    def anchor_batch(self, anchors: Sequence[RoundAnchor]) -> TxReceipt:
+        return self.anchor_root(batch_root([a.leaf for a in anchors]), len(anchors), anchors[0].round_id, anchors[-1].round_id)
+
+    def anchor_root(self, root: bytes, count: int, first: int, last: int) -> TxReceipt:
+        return self._send(encode_call(SIG_ANCHOR_BATCH, root, count, first, last), count, root)
+
+
+def anchor_in_batches(chain, anchors: Sequence[RoundAnchor], batch_size: int) -> List[TxReceipt]:
+    """Soumet les ancres par lots de `batch_size` (1 = une transaction anchorRound par round)."""
+    if batch_size <= 1:
+        return [chain.anchor_round(a) for a in anchors]
+    return [chain.anchor_batch(anchors[i:i + batch_size]) for i in range(0, len(anchors), batch_size)]
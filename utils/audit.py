@@ -0,0 +1,225 @@
+# utils/audit.py
+"""
+Audit incrémental des rounds commités : racines recalculées depuis les poids, publics et preuves vérifiés.
+
+- empreintes de fichiers (sha256) mises en cache dans le ledger, recalculées seulement si (taille, mtime) change ;
+- clé de stat d'un round (chemins, tailles, mtimes de tous ses artefacts + vkey) : inchangée -> rapport
+  précédent réutilisé sans rien relire (O(1)) ;
+- sinon, travail au plus fin : racines recalculées seulement si poids ou roots.json ont changé, chaque
+  chunk revérifié seulement si l'empreinte (proof, public, vkey) a changé ;
+- verdict par chunk : vérifié, échoué (avec la raison) ou manquant (proof/public absent).
+"""
+import os
+import glob
+import json
+import time
+import hashlib
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from utils import paths
+from utils import zkp_utils as z
+from utils.commitment import PUBLIC_MODE, _hash_leaves_streaming
+from utils.chunk_stream import load_round_weights
+from utils.ledger import get_ledger, file_digest
+from utils.merkle import build_merkle
+from utils.poseidon_wrapper import LEAF_HASH_V1
+
+
+def cached_file_digest(path: str) -> Optional[str]:
+    """sha256 d'un fichier, relu seulement si sa taille ou son mtime a changé ; None s'il est absent."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    ledger = get_ledger()
+    digest = ledger.cached_digest(path, st.st_size, st.st_mtime_ns)
+    if digest is None:
+        digest = file_digest(path)
+        ledger.store_digest(path, st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+
+def _stat_key(files: List[str], extra: str = "") -> str:
+    h = hashlib.sha256(extra.encode())
+    for path in files:
+        try:
+            st = os.stat(path)
+            h.update(f"{path}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        except FileNotFoundError:
+            h.update(f"{path}\0absent\n".encode())
+    return h.hexdigest()
+
+
+def _digest_key(files: List[str]) -> str:
+    h = hashlib.sha256()
+    for path in files:
+        h.update(f"{os.path.basename(path)}\0{cached_file_digest(path)}\n".encode())
+    return h.hexdigest()
+
+
+def round_dirs(name: str) -> Dict[str, str]:
+    info = get_ledger().get_round(name) or {}
+    return {
+        "commit": info.get("commit_dir") or os.path.join(paths.COMMITS_DIR, name),
+        "zkp": info.get("zkp_dir") or os.path.join(paths.zkp_dir(), name),
+    }
+
+
+def find_committed_rounds() -> List[str]:
+    """Rounds du ledger puis dossiers de COMMITS_DIR ayant un roots.json (rounds antérieurs au ledger)."""
+    names = [r["name"] for r in get_ledger().list_rounds()]
+    if os.path.isdir(paths.COMMITS_DIR):
+        seen = set(names)
+        names += sorted(
+            n for n in os.listdir(paths.COMMITS_DIR)
+            if n not in seen and os.path.exists(os.path.join(paths.COMMITS_DIR, n, "roots.json"))
+        )
+    return names
+
+
+def check_roots(zkp_dir: str, roots: Dict) -> Dict[str, object]:
+    """Racines recalculées depuis les poids du round et comparées à roots.json : {"w1": bool, "w2": bool[, "avg"]}."""
+    w1, w2, _ = load_round_weights(zkp_dir)
+    with_avg = "root_avg" in roots
+    leaves1, leaves2, leaves_avg = _hash_leaves_streaming(
+        w1, w2, int(roots["scale"]), int(roots["chunk_size"]), roots.get("leaf_hash", LEAF_HASH_V1), with_avg
+    )
+    out = {
+        "w1": str(build_merkle(leaves1)[0]) == str(roots["root_w1"]),
+        "w2": str(build_merkle(leaves2)[0]) == str(roots["root_w2"]),
+    }
+    if with_avg:
+        out["avg"] = str(build_merkle(leaves_avg)[0]) == str(roots["root_avg"])
+    if len(leaves1) != int(roots["n_chunks"]):
+        out["n_chunks"] = f"{len(leaves1)} chunks recalculés, roots.json annonce {roots['n_chunks']}"
+    return out
+
+
+def verify_chunk(k: int, proof: str, publ: str, vkey: str, roots: Dict, backend: str) -> Optional[str]:
+    """None si la preuve du chunk k est valide et porte les racines de roots.json, sinon la raison."""
+    try:
+        with open(publ) as f:
+            pub = [str(x) for x in json.load(f)]
+    except (OSError, ValueError) as e:
+        return f"public illisible: {e}"
+    expected = [str(roots["root_w1"]), str(roots["root_w2"])]
+    if "root_avg" in roots:
+        expected.append(str(roots["root_avg"]))
+    expected.append(str(k))
+    if pub[-len(expected):] != expected:
+        return "publics (racines / chunkIndex) différents de roots.json"
+    try:
+        z._verify(vkey, publ, proof, backend)
+    except Exception as e:
+        return f"verify: {str(e)[:300]}"
+    return None
+
+
+def audit_round(name: str, pool: Executor, backend: str = z.BACKEND, circuit_dir: str = z.CIRCUIT_DIR,
+                force: bool = False) -> Dict:
+    """Rapport d'audit d'un round ; les vérifications de chunks sont soumises à `pool`."""
+    t0 = time.perf_counter()
+    ledger = get_ledger()
+    dirs = round_dirs(name)
+    roots_path = os.path.join(dirs["commit"], "roots.json")
+    if not os.path.exists(roots_path):
+        return {"status": "uncommitted", "cached": False, "seconds": time.perf_counter() - t0}
+    with open(roots_path) as f:
+        roots = json.load(f)
+    n_chunks = int(roots["n_chunks"])
+    vkey = z.circuit_files(circuit_dir, roots.get("public_mode", PUBLIC_MODE), backend,
+                           roots.get("leaf_hash", LEAF_HASH_V1))["vkey"]
+
+    weights = [os.path.join(dirs["zkp"], "clients.json"), os.path.join(dirs["zkp"], "avg.json")]
+    weights += sorted(glob.glob(os.path.join(dirs["zkp"], "*.npy")))
+    chunk_files = [(os.path.join(dirs["zkp"], f"proof_{k}.json"), os.path.join(dirs["zkp"], f"public_{k}.json"))
+                   for k in range(n_chunks)]
+    stat_key = _stat_key([roots_path, vkey] + weights + [p for pair in chunk_files for p in pair], backend)
+
+    prev = ledger.get_audit(name) if ledger.get_round(name) else None
+    if prev and prev["stat_key"] == stat_key and not force:
+        return {**prev["report"], "cached": True, "seconds": time.perf_counter() - t0}
+    keys = {} if force or prev is None else prev["keys"]
+    prev_report = {} if force or prev is None else prev["report"]
+
+    # racines : recalcul seulement si les poids ou roots.json ont changé
+    roots_key = _digest_key([roots_path] + weights)
+    if keys.get("roots") == roots_key and "roots" in prev_report:
+        roots_check = prev_report["roots"]
+    else:
+        try:
+            roots_check = check_roots(dirs["zkp"], roots)
+        except Exception as e:
+            roots_check = {"error": str(e)[:300]}
+
+    # chunks : revérifiés seulement si (proof, public, vkey) a changé
+    vkey_digest = cached_file_digest(vkey)
+    prev_failed = prev_report.get("chunks", {}).get("failed", {})
+    chunk_keys, results, pending, missing = {}, {}, {}, []
+    for k, (proof, publ) in enumerate(chunk_files):
+        if not (os.path.exists(proof) and os.path.exists(publ)):
+            missing.append(k)
+            continue
+        if vkey_digest is None:
+            results[k] = f"vkey absente: {vkey}"
+            continue
+        key = hashlib.sha256(f"{vkey_digest}:{cached_file_digest(proof)}:{cached_file_digest(publ)}".encode()).hexdigest()
+        chunk_keys[str(k)] = key
+        if keys.get("chunks", {}).get(str(k)) == key:
+            results[k] = prev_failed.get(str(k))
+        else:
+            pending[k] = pool.submit(verify_chunk, k, proof, publ, vkey, roots, backend)
+    for k, fut in pending.items():
+        results[k] = fut.result()
+
+    verified = sorted(k for k, reason in results.items() if reason is None)
+    failed = {str(k): reason for k, reason in sorted(results.items()) if reason is not None}
+    roots_ok = all(v is True for v in roots_check.values())
+    if not roots_ok or failed:
+        status = "failed"
+    elif missing:
+        status = "incomplete"
+    else:
+        status = "verified"
+    report = {
+        "status": status,
+        "roots": roots_check,
+        "n_chunks": n_chunks,
+        "chunks": {"verified": verified, "failed": failed, "missing": missing},
+        "reverified": len(pending),
+    }
+    if ledger.get_round(name):
+        ledger.set_audit(name, stat_key, report, {"roots": roots_key, "chunks": chunk_keys})
+    return {**report, "cached": False, "seconds": time.perf_counter() - t0}
+
+
+def audit_rounds(names: List[str], jobs: int = 4, chunk_jobs: int = 4, backend: str = z.BACKEND,
+                 circuit_dir: str = z.CIRCUIT_DIR, force: bool = False, on_done=None) -> Dict:
+    """
+    Audite les rounds en parallèle (`jobs` rounds, `chunk_jobs` vérifications de chunks partagées).
+    on_done(name, report) : appelé à chaque round terminé. Retourne le rapport complet.
+    """
+    t0 = time.perf_counter()
+    rounds: Dict[str, Dict] = {}
+    with ThreadPoolExecutor(max_workers=max(1, chunk_jobs), thread_name_prefix="audit-chunk") as chunk_pool, \
+            ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="audit-round") as round_pool:
+        futures = {name: round_pool.submit(audit_round, name, chunk_pool, backend, circuit_dir, force) for name in names}
+        for name, fut in futures.items():
+            try:
+                rounds[name] = fut.result()
+            except Exception as e:
+                rounds[name] = {"status": "error", "error": str(e)[:300], "cached": False}
+            if on_done is not None:
+                on_done(name, rounds[name])
+    summary = {s: 0 for s in ("verified", "incomplete", "failed", "uncommitted", "error")}
+    for rep in rounds.values():
+        summary[rep["status"]] = summary.get(rep["status"], 0) + 1
+    summary["cached"] = sum(1 for rep in rounds.values() if rep.get("cached"))
+    return {
+        "generated_at": time.time(),
+        "backend": backend,
+        "seconds": time.perf_counter() - t0,
+        "summary": summary,
+        "rounds": rounds,
+    }
@@ -0,0 +1,132 @@
+# utils/checkpoints.py
+"""
+Checkpoints du modèle global, adressés par contenu, sur le volume partagé.
+
+- un objet par modèle : <SHARED_DIR>/checkpoints/objects/<sha256>.npz (écriture tmp + os.replace,
+  un modèle déjà présent n'est pas réécrit) ;
+- l'empreinte couvre dtype, forme et octets de chaque tenseur, dans l'ordre du state_dict ;
+- le ledger relie chaque checkpoint à son round (table checkpoints) ;
+- au chargement l'empreinte est recalculée : un objet tronqué ou altéré n'est jamais utilisé.
+Le serveur d'une nouvelle session repart du dernier checkpoint vérifié (initial_parameters) et
+un client qui lit le store (ou détient déjà le modèle) ne reçoit que l'empreinte.
+"""
+import os
+import hashlib
+import tempfile
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils import paths
+
+# warm start : latest (dernier checkpoint dont la preuve n'a pas échoué) | proved | off
+WARM_START_MODES = ("latest", "proved", "off")
+# envoi du modèle aux clients : full (toujours) | auto (appris des métriques client) | store (volume partagé)
+TRANSFER_MODES = ("full", "auto", "store")
+
+
+def store_dir() -> str:
+    return os.path.join(paths.SHARED_DIR, "checkpoints", "objects")
+
+
+def object_path(digest: str) -> str:
+    return os.path.join(store_dir(), f"{digest}.npz")
+
+
+def model_digest(ndarrays: Sequence[np.ndarray]) -> str:
+    """sha256 du modèle : (dtype, forme, octets C) de chaque tenseur, sans copie pour les tenseurs contigus."""
+    h = hashlib.sha256()
+    for a in ndarrays:
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.dtype.str}{a.shape};".encode())
+        h.update(a.reshape(-1).view(np.uint8))
+    return h.hexdigest()
+
+
+def has_checkpoint(digest: str) -> bool:
+    return os.path.exists(object_path(digest))
+
+
+def save_checkpoint(ndarrays: Sequence[np.ndarray], name: Optional[str] = None,
+                    session_id: Optional[int] = None, server_round: Optional[int] = None) -> str:
+    """
+    Écrit le modèle dans le store (si absent) et, si `name` est fourni, l'enregistre
+    comme checkpoint de ce round dans le ledger. Retourne l'empreinte.
+    """
+    digest = model_digest(ndarrays)
+    path = object_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(store_dir(), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=store_dir(), prefix=f".{digest[:12]}-", suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, *ndarrays)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    if name is not None:
+        from utils.ledger import get_ledger
+
+        ledger = get_ledger()
+        if ledger.get_round(name) is None:
+            ledger.upsert_round(name, session_id=session_id, server_round=server_round)
+        ledger.add_checkpoint(name, digest, path, n_params=sum(int(a.size) for a in ndarrays))
+    return digest
+
+
+def load_checkpoint(digest: str) -> List[np.ndarray]:
+    """Relit un modèle du store et contrôle son empreinte (ValueError si elle ne correspond pas)."""
+    with np.load(object_path(digest), allow_pickle=False) as z:
+        nds = [z[f"arr_{i}"] for i in range(len(z.files))]
+    got = model_digest(nds)
+    if got != digest:
+        raise ValueError(f"[CKPT] Empreinte incohérente pour {digest[:12]} (lu {got[:12]})")
+    return nds
+
+
+def load_latest_checkpoint(mode: str = "latest", limit: int = 10) -> Optional[Tuple[str, List[np.ndarray], dict]]:
+    """
+    Dernier checkpoint vérifié : (empreinte, tenseurs, ligne du ledger), ou None.
+    mode "proved" n'accepte que les rounds dont toutes les preuves ont été vérifiées.
+    Un objet manquant ou corrompu est ignoré au profit du précédent.
+    """
+    if mode not in WARM_START_MODES:
+        raise ValueError(f"[CKPT] warm_start inconnu: {mode} (attendu: {', '.join(WARM_START_MODES)})")
+    if mode == "off":
+        return None
+    from utils.ledger import get_ledger
+
+    for row in get_ledger().latest_checkpoints(status="proved" if mode == "proved" else None, limit=limit):
+        try:
+            return row["digest"], load_checkpoint(row["digest"]), row
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[CKPT] Checkpoint {row['name']} ignoré: {e}")
+    return None
+
+
+class HeldModel:
+    """
+    Côté client (FLClient, agrégateur de bord) : modèle global du round reçu tel quel, ou désigné
+    par son empreinte seule (config["model_digest"], paramètres vides) et repris du cache local
+    puis du store partagé ; les metrics annoncent le modèle détenu pour les rounds suivants.
+    """
+    held = None   # (empreinte, ndarrays) du dernier modèle global reçu
+
+    def resolve_model(self, parameters, config):
+        digest = config.get("model_digest")
+        if digest is None:
+            return parameters
+        if len(parameters) > 0:
+            self.held = (digest, parameters)
+            return parameters
+        if self.held is None or self.held[0] != digest:
+            self.held = (digest, load_checkpoint(digest))
+        return self.held[1]
+
+    def model_metrics(self, config):
+        """Modèle détenu + accès au store : le serveur n'enverra plus que l'empreinte."""
+        if config.get("model_digest") is None or self.held is None:
+            return {}
+        return {"held_digest": self.held[0], "ckpt_store": os.path.isdir(store_dir())}
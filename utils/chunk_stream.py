@@ -0,0 +1,155 @@
+# utils/chunk_stream.py
+"""
+Export ZKP en flux, à mémoire bornée : les poids ne sont jamais matérialisés en listes Python complètes.
+
+- sources de poids : liste de tenseurs (ordre du state_dict), ndarray plat, memmap .npy ou
+  (ancien format) liste de floats issue de clients.json ;
+- iter_flat_chunks      : tranches de `chunk` valeurs qui traversent les frontières de tenseurs ;
+- iter_quantized_chunks : (k, W1, W2, AVG_pub) quantifiés et complétés à `chunk`, un chunk à la fois ;
+- quantized_chunk       : accès direct au chunk k (vérification par échantillonnage) ;
+- save_weights / load_round_weights : poids d'un round en .npy (écriture tenseur par tenseur,
+  relecture en mmap), clients.json / avg.json ne gardant que les métadonnées.
+Mémoire de pointe : O(chunk × lots en vol), indépendante de la taille du modèle.
+"""
+import os
+import json
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+
+def _parts(src) -> List:
+    """Découpe une source en morceaux 1-D (vues, sans copie pour les ndarrays)."""
+    if isinstance(src, np.ndarray):
+        return [src.reshape(-1)]
+    if isinstance(src, (list, tuple)) and src and isinstance(src[0], np.ndarray):
+        return [t.reshape(-1) for t in src]
+    return [src]   # liste de floats (ancien format JSON)
+
+
+def flat_size(src) -> int:
+    return sum(len(p) for p in _parts(src))
+
+
+def iter_flat_chunks(src, chunk: int) -> Iterator[np.ndarray]:
+    """Tranches float64 de `chunk` valeurs (la dernière peut être plus courte), en flux."""
+    buf = np.empty(chunk, dtype=np.float64)
+    fill = 0
+    for part in _parts(src):
+        off, n = 0, len(part)
+        while off < n:
+            take = min(chunk - fill, n - off)
+            buf[fill:fill + take] = np.asarray(part[off:off + take], dtype=np.float64)
+            fill += take
+            off += take
+            if fill == chunk:
+                yield buf.copy()
+                fill = 0
+    if fill:
+        yield buf[:fill].copy()
+
+
+def _quantize(values: np.ndarray, scale: int, chunk: int) -> np.ndarray:
+    """Identique bit à bit à commitment.quantize_flat (float64 puis arrondi au pair), complété par 0."""
+    q = np.zeros(chunk, dtype=np.int64)
+    q[:values.size] = np.rint(values * scale)
+    return q
+
+
+def read_flat(src, start: int, stop: int) -> np.ndarray:
+    """Valeurs [start, stop) de la source aplatie (float64), sans parcourir ce qui précède."""
+    out, base = [], 0
+    for part in _parts(src):
+        n = len(part)
+        lo, hi = max(start - base, 0), min(stop - base, n)
+        if lo < hi:
+            out.append(np.asarray(part[lo:hi], dtype=np.float64))
+        base += n
+        if base >= stop:
+            break
+    return np.concatenate(out) if out else np.empty(0, dtype=np.float64)
+
+
+def quantized_chunk(src, k: int, scale: int, chunk: int) -> List[int]:
+    """Chunk quantifié n°k (accès direct, pour les vérifications par échantillonnage)."""
+    return _quantize(read_flat(src, k * chunk, (k + 1) * chunk), scale, chunk).tolist()
+
+
+def iter_quantized(src, scale: int, chunk: int) -> Iterator[Tuple[int, List[int]]]:
+    """(k, W) pour chaque chunk d'une seule source (engagement côté client)."""
+    for k, a in enumerate(iter_flat_chunks(src, chunk)):
+        yield k, _quantize(a, scale, chunk).tolist()
+
+
+def iter_quantized_chunks(w1, w2, scale: int, chunk: int) -> Iterator[Tuple[int, List[int], List[int], List[int]]]:
+    """
+    (k, W1, W2, AVG_pub) pour chaque chunk, en listes d'int de longueur `chunk` (padding à droite).
+    AVG_pub = floor((W1 + W2) / 2), comme l'export historique.
+    """
+    if flat_size(w1) != flat_size(w2):
+        raise RuntimeError("[ZKP] Tailles incohérentes (w1/w2)")
+    for k, (a, b) in enumerate(zip(iter_flat_chunks(w1, chunk), iter_flat_chunks(w2, chunk))):
+        q1 = _quantize(a, scale, chunk)
+        q2 = _quantize(b, scale, chunk)
+        yield k, q1.tolist(), q2.tolist(), ((q1 + q2) // 2).tolist()
+
+
+def batched(it, n: int) -> Iterator[list]:
+    """Regroupe un itérateur en lots de `n` éléments (le dernier peut être plus court)."""
+    batch = []
+    for x in it:
+        batch.append(x)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# -------------------------------
+# Poids d'un round sur disque (.npy)
+# -------------------------------
+def save_weights(path: str, tensors: Sequence[np.ndarray]) -> int:
+    """Écrit les tenseurs (ordre du state_dict) en un .npy float32 plat, tenseur par tenseur."""
+    total = sum(int(t.size) for t in tensors)
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(total,))
+    off = 0
+    for t in tensors:
+        out[off:off + t.size] = t.reshape(-1)
+        off += t.size
+    out.flush()
+    del out
+    return total
+
+
+def load_round_weights(round_dir: str):
+    """
+    (w1, w2, avg) d'un round : memmaps .npy (format courant) ou listes de clients.json/avg.json
+    (ancien format avec flat_weights). Les memmaps ne chargent que les pages lues.
+    """
+    clients_path = os.path.join(round_dir, "clients.json")
+    avg_path = os.path.join(round_dir, "avg.json")
+    if not (os.path.exists(clients_path) and os.path.exists(avg_path)):
+        try:
+            listing = sorted(os.listdir(round_dir))[:20]
+        except Exception as e:
+            listing = [f"<ls error: {e}>"]
+        raise RuntimeError(f"Manque clients.json/avg.json dans {round_dir} | ls={listing}")
+
+    with open(clients_path) as f:
+        clients = json.load(f)["clients"]
+    with open(avg_path) as f:
+        avg = json.load(f)
+    if len(clients) != 2:
+        raise RuntimeError(f"Attendu 2 clients, trouvé {len(clients)}")
+
+    def _src(entry, legacy_key):
+        if "weights_file" in entry:
+            return np.load(os.path.join(round_dir, entry["weights_file"]), mmap_mode="r")
+        return entry[legacy_key]
+
+    w1, w2 = _src(clients[0], "flat_weights"), _src(clients[1], "flat_weights")
+    avg = _src(avg, "avg")
+    if not (flat_size(w1) == flat_size(w2) == flat_size(avg)):
+        raise RuntimeError("Tailles incohérentes (w1/w2/avg)")
+    return w1, w2, avg
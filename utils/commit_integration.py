@@ -1,21 +1,68 @@
 # utils/commit_integration.py
 from __future__ import annotations
 import os, shutil, json
-from utils.commitment import build_commitments_for_round, DEFAULT_SCALE, DEFAULT_CHUNK
+import hashlib
+from utils import paths
+from utils.ledger import get_ledger, record_roots
+from utils.mmr import append_committed_round
+from utils.commitment import build_commitments_for_round, DEFAULT_SCALE, DEFAULT_CHUNK, PUBLIC_MODE, LEAF_HASH
 
 def _swap_atomically(src_tmp: str, dst_final: str):
     if os.path.exists(dst_final):
         shutil.rmtree(dst_final)
     os.replace(src_tmp, dst_final)
 
-def integrate_commitments_for_round(round_dir: str, commits_root: str = "/app/commits") -> str:
+def round_inputs_digest(round_dir: str, scale: int = DEFAULT_SCALE, chunk: int = DEFAULT_CHUNK) -> str:
     """
-    Génère Poseidon+Merkle pour UN round, écrit atomiquement dans /app/commits/<round>/.
+    Empreinte sha256 de tout ce dont dépendent les engagements d'un round :
+    paramètres (scale, chunk, mode des publics, convention des feuilles), clients.json, avg.json,
+    poids *.npy et inputs/input_chunk_*.json.
+    """
+    h = hashlib.sha256(f"scale={int(scale)};chunk={int(chunk)};public_mode={PUBLIC_MODE};leaf_hash={LEAF_HASH}".encode())
+    files = [os.path.join(round_dir, "clients.json"), os.path.join(round_dir, "avg.json")]
+    files += [os.path.join(round_dir, n) for n in sorted(os.listdir(round_dir)) if n.endswith(".npy")]
+    inputs_dir = os.path.join(round_dir, "inputs")
+    if os.path.isdir(inputs_dir):
+        files += [os.path.join(inputs_dir, n) for n in sorted(os.listdir(inputs_dir)) if n.endswith(".json")]
+    for path in files:
+        h.update(os.path.relpath(path, round_dir).encode() + b"\0")
+        with open(path, "rb") as f:
+            for buf in iter(lambda: f.read(1 << 20), b""):
+                h.update(buf)
+    return h.hexdigest()
+
+def committed_digest(round_name: str, commits_root: str | None = None) -> str | None:
+    """Empreinte des entrées au moment du dernier commit (status.json, sinon ledger)."""
+    status_path = os.path.join(commits_root or paths.COMMITS_DIR, round_name, "status.json")
+    if os.path.exists(status_path):
+        with open(status_path) as f:
+            digest = json.load(f).get("inputs_digest")
+        if digest:
+            return digest
+    info = get_ledger().get_round(round_name)
+    return info.get("inputs_digest") if info else None
+
+def integrate_commitments_for_round(
+    round_dir: str,
+    commits_root: str | None = None,
+    weights=None,
+    inputs_digest: str | None = None,
+    client_commitments=None,
+    history: bool = True,
+) -> str:
+    """
+    Génère Poseidon+Merkle pour UN round, écrit atomiquement dans <commits_root>/<round>/ (défaut: paths.COMMITS_DIR).
     round_dir: ex. /app/shared-data/zkp/round1
+    weights: (w1, w2, avg) en mémoire, optionnel (évite de relire les JSON)
+    inputs_digest: empreinte déjà calculée (round_inputs_digest), recalculée sinon
+    client_commitments: engagements (racine/feuilles) annoncés par les 2 clients, contrôlés par échantillonnage
+    history: ajoute le round à la MMR ; False quand l'appelant l'ajoute lui-même dans l'ordre des rounds (commit_all)
     """
+    commits_root = commits_root or paths.COMMITS_DIR
     round_name = os.path.basename(os.path.normpath(round_dir))
     final_out  = os.path.join(commits_root, round_name)
     tmp_out    = final_out + ".tmp"
+    inputs_digest = inputs_digest or round_inputs_digest(round_dir)
 
     # 1) dossier temp propre
     if os.path.exists(tmp_out):
@@ -23,12 +70,16 @@ def integrate_commitments_for_round(round_dir: str, commits_root: str = "/app/co
     os.makedirs(tmp_out, exist_ok=True)
 
     # 2) engagements
-    build_commitments_for_round(round_dir=round_dir, output_dir=tmp_out)
+    checks = build_commitments_for_round(
+        round_dir=round_dir, output_dir=tmp_out, weights=weights, client_commitments=client_commitments
+    )
 
     # 3) petit statut
     status = {
         "round_dir": os.path.abspath(round_dir),
-        "params": {"scale": int(DEFAULT_SCALE), "chunk": int(DEFAULT_CHUNK)},
+        "params": {"scale": int(DEFAULT_SCALE), "chunk": int(DEFAULT_CHUNK), "public_mode": PUBLIC_MODE, "leaf_hash": LEAF_HASH},
+        "inputs_digest": inputs_digest,
+        "client_commitments": checks,
         "commitments": "OK"
     }
     with open(os.path.join(tmp_out, "status.json"), "w") as f:
@@ -36,4 +87,12 @@ def integrate_commitments_for_round(round_dir: str, commits_root: str = "/app/co
 
     # 4) swap atomique
     _swap_atomically(tmp_out, final_out)
+
+    # 5) ledger : racines + statut (requêtes O(1) ensuite, sans relire roots.json)
+    record_roots(round_name, os.path.join(final_out, "roots.json"))
+    get_ledger().upsert_round(round_name, inputs_digest=inputs_digest)
+
+    # 6) historique : feuille du round dans la MMR des racines (utils/mmr.py)
+    if history:
+        append_committed_round(round_name, os.path.join(final_out, "roots.json"), round_dir)
     return final_out
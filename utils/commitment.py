@@ -1,99 +1,204 @@
 from __future__ import annotations
 import os, json, math
-from typing import List, Tuple
-from utils.poseidon_wrapper import poseidon_hash_array
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from utils.poseidon_wrapper import poseidon_hash_many, LEAF_HASHES, POSEIDON_WORKERS
+from utils.chunk_stream import (
+    batched, flat_size, iter_quantized, iter_quantized_chunks, load_round_weights, quantized_chunk,
+)
 from utils.merkle import build_merkle, get_merkle_proof
-import shutil
+from utils.merkle_store import TREE_FILE, write_tree_file
+import random
 
 DEFAULT_SCALE = 1_000_000
 DEFAULT_CHUNK = 4096
+# "full" : w_avg_pub[CHUNK] publics dans chaque preuve ; "root" : moyenne liée par la racine root_avg
+PUBLIC_MODES  = ("full", "root")
+PUBLIC_MODE   = os.environ.get("ZKP_PUBLIC_MODE", "full")
+# Convention des feuilles de chunk (enregistrée dans roots.json ; doit correspondre au circuit compilé)
+LEAF_HASH     = os.environ.get("ZKP_LEAF_HASH", "poseidon2-fold-v1")
+# Chunks quantifiés en vol pendant le hachage des feuilles (défaut : 2 lots par worker Poseidon)
+STREAM_BATCH  = int(os.environ.get("ZKP_STREAM_BATCH", str(2 * max(1, POSEIDON_WORKERS))))
+# Engagements calculés par les clients : "off" (défaut : le serveur hache tout), "root" (racine seule)
+# ou "leaves" (racine + feuilles) ; opt-in, car le client charge alors Poseidon et hache ses chunks
+CLIENT_COMMIT_MODES = ("off", "root", "leaves")
+CLIENT_COMMIT = os.environ.get("ZKP_CLIENT_COMMIT", "off")
+# Chunks recalculés par le serveur pour contrôler les feuilles d'un client (<= 0 : tous)
+COMMIT_SAMPLE = int(os.environ.get("ZKP_COMMIT_SAMPLE", "8"))
+_RNG = random.SystemRandom()   # tirage non prévisible par le client
 
 def _q(x: float, scale: int = DEFAULT_SCALE) -> int:
     # quantification arrondi au plus proche
     return int(round(x * scale))
 
-def _pad_right(xs: List[int], size: int) -> List[int]:
-    if len(xs) >= size:
-        return xs[:size]
-    return xs + [0] * (size - len(xs))
+def quantize_flat(values, scale: int = DEFAULT_SCALE) -> List[int]:
+    """
+    Quantification vectorisée, identique bit à bit à [_q(x) for x in values]
+    (produit float64 puis arrondi au pair le plus proche, comme round()).
+    """
+    if isinstance(values, np.ndarray):
+        return np.rint(values.astype(np.float64) * scale).astype(np.int64).tolist()
+    return [_q(x, scale) for x in values]
 
-def _chunkify(xs: List[int], chunk: int) -> List[List[int]]:
-    out = []
-    L = len(xs)
-    n_chunks = math.ceil(L / chunk) if L > 0 else 1
-    for k in range(n_chunks):
-        a = k * chunk
-        b = min((k + 1) * chunk, L)
-        out.append(_pad_right(xs[a:b], chunk))
-    return out
+def _load_round_inputs(round_dir: str):
+    """(w1, w2, avg) du round : memmaps .npy, ou listes de clients.json/avg.json (ancien format)."""
+    return load_round_weights(round_dir)
 
-def _hash_chunk_poseidon(arr4096: List[int]) -> int:
-    # Convention : Poseidon sur toute la liste (arité variable) pour compatibilité circomlibjs
-    # arr4096 doit être exactement de taille CHUNK (paddé si besoin)
-    return poseidon_hash_array(arr4096)
-
-def _load_round_inputs(round_dir: str) -> Tuple[List[float], List[float], List[float]]:
-    clients_path = os.path.join(round_dir, "clients.json")
-    avg_path     = os.path.join(round_dir, "avg.json")
-
-    if not (os.path.exists(clients_path) and os.path.exists(avg_path)):
-        # 🔍 DEBUG : état exact du dossier au moment où on ne trouve pas les fichiers
-        try:
-            listing = sorted(os.listdir(round_dir))[:20]
-        except Exception as e:
-            listing = [f"<ls error: {e}>"]
-        raise RuntimeError(
-            f"Manque clients.json/avg.json dans {round_dir} | "
-            f"exists(clients)={os.path.exists(clients_path)} "
-            f"exists(avg)={os.path.exists(avg_path)} | ls={listing}"
-        )
+def _hash_leaves_streaming(w1, w2, scale: int, chunk: int, leaf_hash: str, with_avg: bool,
+                           need1: bool = True, need2: bool = True):
+    """
+    Feuilles de w1, w2 (et de la moyenne publique si with_avg) en un seul passage :
+    les chunks quantifiés sont hachés par lots de STREAM_BATCH, puis libérés.
+    need1/need2=False : feuilles déjà fournies (et vérifiées) par le client, non recalculées.
+    """
+    leaves1, leaves2, leaves_avg = [], [], []
+    if not (need1 or need2 or with_avg):
+        return leaves1, leaves2, leaves_avg
+    for batch in batched(iter_quantized_chunks(w1, w2, scale, chunk), STREAM_BATCH):
+        groups = [(need1, 1, leaves1), (need2, 2, leaves2), (with_avg, 3, leaves_avg)]
+        arrays = [c[i] for need, i, _ in groups if need for c in batch]
+        hashes = poseidon_hash_many(arrays, leaf_hash)
+        n, off = len(batch), 0
+        for need, _, out in groups:
+            if need:
+                out += hashes[off:off + n]
+                off += n
+    return leaves1, leaves2, leaves_avg
 
-    with open(clients_path) as f:
-        clients = json.load(f)["clients"]
-    with open(avg_path) as f:
-        avg = json.load(f)["avg"]
+# -------------------------------
+# Engagements calculés par les clients (renvoyés dans les fit metrics)
+# -------------------------------
+def leaves_to_bytes(leaves: Sequence[int]) -> bytes:
+    """Feuilles (éléments BN254) en 32 octets big-endian chacune (les metrics Flower n'acceptent pas les listes)."""
+    return b"".join(int(x).to_bytes(32, "big") for x in leaves)
+
+def leaves_from_bytes(data: bytes) -> List[int]:
+    if len(data) % 32:
+        raise ValueError(f"Feuilles mal encodées ({len(data)} octets)")
+    return [int.from_bytes(data[i:i + 32], "big") for i in range(0, len(data), 32)]
+
+def hash_leaves(w, scale: int = DEFAULT_SCALE, chunk: int = DEFAULT_CHUNK, leaf_hash: str | None = None) -> List[int]:
+    """Feuilles d'un seul vecteur de poids, en flux (lots de STREAM_BATCH chunks)."""
+    leaf_hash = leaf_hash or LEAF_HASH
+    leaves = []
+    for batch in batched(iter_quantized(w, scale, chunk), STREAM_BATCH):
+        leaves += poseidon_hash_many([c[1] for c in batch], leaf_hash)
+    return leaves or poseidon_hash_many([[0] * chunk], leaf_hash)
+
+def commit_weights(w, scale: int = DEFAULT_SCALE, chunk: int = DEFAULT_CHUNK, leaf_hash: str | None = None) -> dict:
+    """Engagement d'un client sur ses poids : {"root", "leaves"} (même convention que le serveur)."""
+    leaves = hash_leaves(w, scale, chunk, leaf_hash)
+    root, _, _ = build_merkle(leaves)
+    return {"root": root, "leaves": leaves}
+
+def commit_update(payload, parameters, codec: str, config: dict) -> dict:
+    """
+    Fit metrics d'engagement (commit_root [+ commit_leaves], commit_time) sur les poids tels que
+    le serveur les décodera depuis `payload` (codec appliqué à partir du global `parameters`).
+    """
+    import time
+    from utils.update_codec import decode_update
 
-    if len(clients) != 2:
-        raise RuntimeError(f"Attendu 2 clients, trouvé {len(clients)}")
+    t0 = time.perf_counter()
+    seen = decode_update(payload, parameters, codec)
+    c = commit_weights(seen, int(config["zkp_scale"]), int(config["zkp_chunk"]), config.get("zkp_leaf_hash"))
+    out = {"commit_root": str(c["root"]), "commit_time": time.perf_counter() - t0}
+    if config["zkp_commit"] == "leaves":
+        out["commit_leaves"] = leaves_to_bytes(c["leaves"])
+    return out
 
-    w1 = clients[0]["flat_weights"]
-    w2 = clients[1]["flat_weights"]
-    if not (len(w1) == len(w2) == len(avg)):
-        raise RuntimeError("Tailles incohérentes (w1/w2/avg)")
+def check_client_commitment(
+    w,
+    claim: dict,
+    scale: int = DEFAULT_SCALE,
+    chunk: int = DEFAULT_CHUNK,
+    leaf_hash: str | None = None,
+    sample: int = COMMIT_SAMPLE,
+) -> Tuple[Optional[List[int]], str]:
+    """
+    Contrôle l'engagement annoncé par un client sur les poids vus par le serveur.
+    - feuilles fournies : nombre de chunks, racine reconstruite, puis `sample` chunks tirés au hasard
+      recalculés (sample <= 0 : tous) ;
+    - racine seule : toutes les feuilles sont recalculées puis comparées à la racine.
+    Retourne (feuilles validées ou None, verdict).
+    """
+    leaf_hash = leaf_hash or LEAF_HASH
+    n_chunks = max(1, math.ceil(flat_size(w) / chunk))
+    leaves = claim.get("leaves")
+    if leaves is None:
+        leaves = hash_leaves(w, scale, chunk, leaf_hash)
+        return (leaves, "root-recomputed") if build_merkle(leaves)[0] == int(claim["root"]) else (None, "root-mismatch")
 
-    return w1, w2, avg
+    if len(leaves) != n_chunks:
+        return None, f"n_chunks {len(leaves)} != {n_chunks}"
+    if build_merkle(leaves)[0] != int(claim["root"]):
+        return None, "root-mismatch"
+    ks = list(range(n_chunks)) if sample <= 0 or sample >= n_chunks else _RNG.sample(range(n_chunks), sample)
+    recomputed = poseidon_hash_many([quantized_chunk(w, k, scale, chunk) for k in ks], leaf_hash)
+    bad = [k for k, h in zip(ks, recomputed) if h != leaves[k]]
+    if bad:
+        return None, f"leaf-mismatch {bad[:4]}"
+    return leaves, f"sampled {len(ks)}/{n_chunks}"
 
 def build_commitments_for_round(
     round_dir: str,
     scale: int = DEFAULT_SCALE,
     chunk: int = DEFAULT_CHUNK,
-    output_dir: str | None = None,   # <-- nouveau paramètre
-) -> None:
+    output_dir: str | None = None,
+    weights: Optional[Sequence] = None,
+    public_mode: str | None = None,
+    leaf_hash: str | None = None,
+    client_commitments: Optional[Sequence] = None,
+) -> dict:
     """
-    1) Charge w1/w2/avg depuis round_dir (clients.json / avg.json)
-    2) Quantifie et découpe w1/w2 en chunks de `chunk` éléments (padding à droite)
-    3) Calcule les feuilles: Poseidon-fold du chunk (acc=1; acc=Poseidon([acc,x]))
+    1) Charge w1/w2 depuis round_dir (memmaps .npy, ou clients.json / avg.json)
+    2) Quantifie et découpe w1/w2 en chunks de `chunk` éléments (padding à droite), en flux
+    3) Calcule les feuilles par lots de STREAM_BATCH chunks (convention `leaf_hash`)
     4) Construit 2 arbres Merkle (w1 et w2)
-    5) Écrit roots.json dans output_dir (ou round_dir si non fourni)
+    5) Écrit roots.json et trees.bin (arbres complets, utils/merkle_store.py) dans output_dir (ou round_dir si non fourni)
     6) Enrichit chaque input_chunk_k.json dans output_dir/inputs
        avec chunkIndex, siblings/pathBits pour w1 et w2
-    """
-    # 1) Lire les poids
-    w1_f, w2_f, avg_f = _load_round_inputs(round_dir)
 
-    # 2) Quantifier
-    W1 = [_q(x, scale) for x in w1_f]
-    W2 = [_q(x, scale) for x in w2_f]
+    weights : (w1, w2, avg) déjà décodés en mémoire (tenseurs ou vues aplaties du serveur) ;
+    si absent, ils sont relus depuis le round. Seuls les feuilles et arbres (O(n_chunks))
+    sont conservés : la mémoire ne dépend pas de la taille du modèle.
+    public_mode="root" : 3e arbre sur la moyenne publique quantifiée (root_avg + siblingsAvg/pathBitsAvg).
+    leaf_hash : convention des feuilles (LEAF_HASHES) ; les nœuds Merkle restent Poseidon(2).
+    client_commitments : (claim_w1, claim_w2), engagements annoncés dans les fit metrics
+    ({"root", "leaves"|None} ou None). Un engagement contrôlé (check_client_commitment) évite
+    de recalculer les feuilles de ce client ; rejeté, le serveur les recalcule lui-même.
+    Retourne le verdict par slot ({"w1": ..., "w2": ...}).
+    """
+    public_mode = public_mode or PUBLIC_MODE
+    if public_mode not in PUBLIC_MODES:
+        raise ValueError(f"ZKP_PUBLIC_MODE inconnu: {public_mode} (attendu: {', '.join(PUBLIC_MODES)})")
+    leaf_hash = leaf_hash or LEAF_HASH
+    if leaf_hash not in LEAF_HASHES:
+        raise ValueError(f"ZKP_LEAF_HASH inconnu: {leaf_hash} (attendu: {', '.join(LEAF_HASHES)})")
+    # 1) Lire les poids (tenseurs du serveur, ou memmaps du round)
+    w1_f, w2_f, _ = weights if weights is not None else _load_round_inputs(round_dir)
 
-    # 3) Découper en chunks (padding)
-    W1_chunks = _chunkify(W1, chunk)
-    W2_chunks = _chunkify(W2, chunk)
-    assert len(W1_chunks) == len(W2_chunks)
-    n_chunks = len(W1_chunks)
+    # 1b) Engagements des clients : contrôle par échantillonnage au lieu du hachage complet
+    client_leaves, checks = [None, None], {"w1": "server", "w2": "server"}
+    for i, (slot, w, claim) in enumerate(zip(("w1", "w2"), (w1_f, w2_f), client_commitments or (None, None))):
+        if claim is None:
+            continue
+        client_leaves[i], checks[slot] = check_client_commitment(w, claim, scale, chunk, leaf_hash)
+        if client_leaves[i] is None:
+            print(f"[Commitments] Engagement client {slot} rejeté ({checks[slot]}) : feuilles recalculées par le serveur")
 
-    # 4) Feuilles (hash des chunks, poseidon fold)
-    leaves1 = [_hash_chunk_poseidon(c) for c in W1_chunks]
-    leaves2 = [_hash_chunk_poseidon(c) for c in W2_chunks]
+    # 2-4) Quantifier, découper et hacher en flux (mémoire ~ chunk × STREAM_BATCH)
+    leaves1, leaves2, leaves_avg = _hash_leaves_streaming(
+        w1_f, w2_f, scale, chunk, leaf_hash, with_avg=(public_mode == "root"),
+        need1=client_leaves[0] is None, need2=client_leaves[1] is None,
+    )
+    leaves1 = client_leaves[0] or leaves1
+    leaves2 = client_leaves[1] or leaves2
+    if not leaves1 or not leaves2:
+        # modèle vide : un chunk de zéros, comme l'ancien découpage
+        leaves1 = leaves2 = poseidon_hash_many([[0] * chunk], leaf_hash)
+        leaves_avg = list(leaves1) if public_mode == "root" else []
+    n_chunks = len(leaves1)
 
     # 5) Arbres Merkle et racines
     root1, tree1, depth1 = build_merkle(leaves1)
@@ -101,25 +206,37 @@ def build_commitments_for_round(
     if depth1 != depth2:
         raise RuntimeError(f"Profondeurs Merkle différentes: {depth1} vs {depth2}")
 
+    # 5b) Mode "root" : arbre de la moyenne publique (même convention que l'export : floor((w1+w2)/2))
+    tree_avg = None
+    if public_mode == "root":
+        root_avg, tree_avg, _ = build_merkle(leaves_avg)
+
     # Dossiers in/out
     out_dir = output_dir or round_dir
     os.makedirs(out_dir, exist_ok=True)
 
     # 6) Écrire roots.json dans out_dir
     roots_path = os.path.join(out_dir, "roots.json")
+    roots = {
+        "root_w1": str(root1),
+        "root_w2": str(root2),
+        "depth": int(depth1),
+        "n_chunks": int(n_chunks),
+        "chunk_size": int(chunk),
+        "scale": int(scale),
+        "public_mode": public_mode,
+        "leaf_hash": leaf_hash,
+    }
+    if tree_avg is not None:
+        roots["root_avg"] = str(root_avg)
     with open(roots_path, "w") as f:
-        json.dump(
-            {
-                "root_w1": str(root1),
-                "root_w2": str(root2),
-                "depth": int(depth1),
-                "n_chunks": int(n_chunks),
-                "chunk_size": int(chunk),
-                "scale": int(scale),
-            },
-            f,
-            indent=2,
-        )
+        json.dump(roots, f, indent=2)
+
+    # 6b) Arbres complets en binaire compact (preuves d'inclusion sans relire les inputs)
+    trees = {"w1": tree1, "w2": tree2}
+    if tree_avg is not None:
+        trees["avg"] = tree_avg
+    write_tree_file(os.path.join(out_dir, TREE_FILE), trees, n_chunks)
 
     # 7) Enrichir inputs : lecture depuis round_dir/inputs, écriture dans out_dir/inputs
     in_inputs_dir  = os.path.join(round_dir, "inputs")
@@ -148,6 +265,14 @@ def build_commitments_for_round(
                 "pathBits2": [int(b) for b in bits2],
             }
         )
+        if tree_avg is not None:
+            # la moyenne devient une entrée privée, liée par root_avg
+            sibA, bitsA = get_merkle_proof(tree_avg, k)
+            payload["w_avg"] = payload.pop("w_avg_pub")
+            payload["siblingsAvg"] = [str(x) for x in sibA]
+            payload["pathBitsAvg"] = [int(b) for b in bitsA]
 
         with open(out_path, "w") as f:
             json.dump(payload, f)
+
+    return checks
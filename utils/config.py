@@ -1,27 +1,76 @@
 import yaml
 import pickle
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 import os
+from utils import paths
 
 def load_or_init_config(config_path: str)-> Dict:
 	with open(config_path) as f:
 		return yaml.safe_load(f)
 
 def load_or_init_state(config: Dict)-> Dict:
-	state_file = Path("/app/shared/state.pkl")
+	""" État de la fédération (serveur courant, n° de session) depuis le ledger SQLite partagé """
+	from utils.ledger import get_ledger
+
 	try:
+		initial_server, initial_session = config["all_peers"][0], 0
+		# migration : reprendre un ancien state.pkl s'il existe
+		state_file = Path(paths.state_file())
 		if state_file.exists():
 			with open (state_file, "rb") as f:
-				return pickle.load(f)
-		else:
-			state_file.parent.mkdir(parents = True, exist_ok = True)
-			initial_server = config["all_peers"][0]
-			state = {
-				"current_server" : initial_server
-			}
-			with open(state_file, "wb") as f:
-				pickle.dump(state, f)
-			return state
+				legacy = pickle.load(f)
+			initial_server = legacy.get("current_server", initial_server)
+			initial_session = legacy.get("session", 0)
+		return get_ledger().get_or_init_state(initial_server, initial_session)
 	except PermissionError:
 		raise RuntimeError("Permission denied. Verify volume permissions.")
+
+def hierarchy_groups(config: Dict, server_id: str)-> Dict[str, List[str]]:
+	"""
+	Mode hiérarchique : groupes {agrégateur de bord: [clients]} des pairs hors serveur, dans l'ordre
+	de all_peers (le premier pair de chaque bloc de group_size + 1 agrège les suivants).
+	Un dernier bloc trop petit pour l'export ZKP (< 2 clients) rejoint le groupe précédent.
+	Vide si le mode est désactivé ou s'il n'y a pas de quoi former deux groupes.
+	"""
+	hierarchy = config.get("hierarchy") or {}
+	if not hierarchy.get("enabled", False):
+		return {}
+	size = max(2, int(hierarchy.get("group_size", 2))) + 1
+	peers = [p for p in config["all_peers"] if p != server_id]
+	blocks = [peers[i:i + size] for i in range(0, len(peers), size)]
+	if len(blocks) > 1 and len(blocks[-1]) < 3:
+		tail = blocks.pop()
+		blocks[-1] += tail
+	if len(blocks) < 2 or len(blocks[-1]) < 3:
+		return {}
+	return {block[0]: block[1:] for block in blocks}
+
+def session_config(config: Dict, peer_id: str, server_id: str, session: int = None)-> Dict:
+	""" Config d'une session pour `peer_id`, le serveur élu étant `server_id` """
+	cfg = dict(config)
+	cfg["session"] = session
+	cfg["peer_id"] = peer_id
+	cfg["is_server"] = (peer_id == server_id)
+	cfg["server"] = server_id
+	cfg["host"] = '0.0.0.0' if cfg["is_server"] else server_id
+	cfg["role"] = "server" if cfg["is_server"] else "client"
+
+	groups = hierarchy_groups(config, server_id)
+	if groups:
+		# serveur racine <- agrégateurs de bord <- clients ; seuls les clients ont des données
+		edge_port = int(config["hierarchy"].get("edge_port", int(config["port"]) - 1))
+		cfg["trainers"] = [c for clients in groups.values() for c in clients]
+		if cfg["is_server"]:
+			cfg["min_clients"] = len(groups)
+		elif peer_id in groups:
+			cfg["role"] = "edge"
+			cfg["edge_clients"] = groups[peer_id]
+			cfg["edge_port"] = edge_port
+			cfg["min_clients"] = len(groups[peer_id])
+		else:
+			edge = next(e for e, clients in groups.items() if peer_id in clients)
+			cfg["edge"] = edge
+			cfg["host"] = edge
+			cfg["port"] = edge_port
+	return cfg
@@ -2,22 +2,21 @@ import pickle
 import os
 import logging
 import json 
+from utils import paths
 
 
 logger = logging.getLogger(__name__)
 
 def elect_next_server(state, config):
-	current = state["current_server"]
-	all_peers = config["all_peers"]
-	idx = (all_peers.index(current) + 1) % len(all_peers)
-	next_server = all_peers[idx]
+	""" Élection atomique (ledger SQLite, verrou en écriture) du serveur de la session suivante """
+	from utils.ledger import get_ledger
 
-	state["current_server"] = next_server
-
-	with open("/app/shared/state.pkl", "wb") as f:
-		pickle.dump(state, f)
+	new_state = get_ledger().elect_next(config["all_peers"], expected_current = state["current_server"])
+	state.update(new_state)
+	next_server = state["current_server"]
 
 	logger.info(f"[Election] Prochaine seveur élu: {next_server}")
+	return state
 
 def weighted_average(metrics_list):
 	total_examples = sum([num_examples for num_examples, _ in metrics_list])
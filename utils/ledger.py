@@ -0,0 +1,657 @@
+# utils/ledger.py
+"""
+Registre SQLite des sessions et rounds, sur le volume partagé (remplace state.pkl et les glob).
+
+- WAL + busy_timeout : lecteurs concurrents et écrivains multiples (tous les pairs) ;
+- transactions BEGIN IMMEDIATE pour les mises à jour lecture-modification-écriture (élection) ;
+- rounds nommés par session (s<session>_round<r>) : plus d'écrasement entre sessions ;
+- accès O(1) par nom de round (clé unique) pour les outils et la stratégie ;
+- file de preuves par chunk (proof_jobs) : tout pair peut prendre un job sous bail ;
+- checkpoints du modèle global par round (empreinte du store adressé par contenu) ;
+- audit : empreintes de fichiers mises en cache (taille, mtime) et dernier rapport par round ;
+- historique : Merkle Mountain Range des racines de rounds (feuilles, nœuds, racines ancrées).
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils import paths
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id          INTEGER PRIMARY KEY,
+    server      TEXT NOT NULL,
+    started_at  REAL,
+    ended_at    REAL
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    name          TEXT UNIQUE NOT NULL,
+    session_id    INTEGER,
+    server_round  INTEGER,
+    zkp_dir       TEXT,
+    commit_dir    TEXT,
+    n_chunks      INTEGER,
+    chunk_size    INTEGER,
+    scale         INTEGER,
+    depth         INTEGER,
+    root_w1       TEXT,
+    root_w2       TEXT,
+    inputs_digest TEXT,
+    proof_status  TEXT NOT NULL DEFAULT 'pending',
+    created_at    REAL,
+    updated_at    REAL
+);
+CREATE INDEX IF NOT EXISTS rounds_session ON rounds(session_id, server_round);
+CREATE INDEX IF NOT EXISTS rounds_status ON rounds(proof_status);
+CREATE TABLE IF NOT EXISTS client_roots (
+    round_id     INTEGER NOT NULL REFERENCES rounds(id) ON DELETE CASCADE,
+    slot         TEXT NOT NULL,
+    client_id    TEXT,
+    num_examples INTEGER,
+    root         TEXT,
+    PRIMARY KEY (round_id, slot)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    round_id  INTEGER NOT NULL REFERENCES rounds(id) ON DELETE CASCADE,
+    kind      TEXT NOT NULL,
+    chunk     INTEGER NOT NULL DEFAULT -1,
+    path      TEXT NOT NULL,
+    digest    TEXT,
+    PRIMARY KEY (round_id, kind, chunk)
+);
+CREATE TABLE IF NOT EXISTS anchors (
+    round_id       INTEGER PRIMARY KEY REFERENCES rounds(id) ON DELETE CASCADE,
+    chain_round_id TEXT NOT NULL,
+    h_model        TEXT NOT NULL,
+    h_artifacts    TEXT NOT NULL,
+    batch_root     TEXT,
+    tx_hash        TEXT,
+    gas_used       INTEGER,
+    anchored_at    REAL
+);
+CREATE TABLE IF NOT EXISTS proof_jobs (
+    round_id     INTEGER NOT NULL REFERENCES rounds(id) ON DELETE CASCADE,
+    chunk        INTEGER NOT NULL,
+    backend      TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'queued',
+    worker       TEXT,
+    lease_until  REAL,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    error        TEXT,
+    seconds      REAL,
+    updated_at   REAL,
+    PRIMARY KEY (round_id, chunk)
+);
+CREATE INDEX IF NOT EXISTS proof_jobs_status ON proof_jobs(status, lease_until);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    round_id    INTEGER PRIMARY KEY REFERENCES rounds(id) ON DELETE CASCADE,
+    digest      TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    n_params    INTEGER,
+    created_at  REAL
+);
+CREATE INDEX IF NOT EXISTS checkpoints_created ON checkpoints(created_at);
+CREATE TABLE IF NOT EXISTS file_digests (
+    path      TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    digest    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS audits (
+    round_id    INTEGER PRIMARY KEY REFERENCES rounds(id) ON DELETE CASCADE,
+    stat_key    TEXT NOT NULL,
+    report      TEXT NOT NULL,
+    keys        TEXT NOT NULL,
+    audited_at  REAL
+);
+CREATE TABLE IF NOT EXISTS mmr_leaves (
+    leaf_index      INTEGER PRIMARY KEY,
+    round_id        INTEGER NOT NULL REFERENCES rounds(id),
+    chain_round_id  TEXT NOT NULL,
+    root_w1         TEXT NOT NULL,
+    root_w2         TEXT NOT NULL,
+    root_agg        TEXT NOT NULL,
+    leaf            TEXT NOT NULL,
+    added_at        REAL
+);
+CREATE INDEX IF NOT EXISTS mmr_leaves_round ON mmr_leaves(round_id);
+CREATE TABLE IF NOT EXISTS mmr_nodes (
+    height  INTEGER NOT NULL,
+    idx     INTEGER NOT NULL,
+    hash    TEXT NOT NULL,
+    PRIMARY KEY (height, idx)
+);
+CREATE TABLE IF NOT EXISTS mmr_anchors (
+    size         INTEGER PRIMARY KEY,
+    root         TEXT NOT NULL,
+    tx_hash      TEXT,
+    gas_used     INTEGER,
+    anchored_at  REAL
+);
+CREATE TABLE IF NOT EXISTS timings (
+    round_id  INTEGER NOT NULL REFERENCES rounds(id) ON DELETE CASCADE,
+    phase     TEXT NOT NULL,
+    seconds   REAL NOT NULL,
+    PRIMARY KEY (round_id, phase)
+);
+"""
+
+ROUND_FIELDS = (
+    "session_id", "server_round", "zkp_dir", "commit_dir", "n_chunks", "chunk_size", "scale",
+    "depth", "root_w1", "root_w2", "inputs_digest", "proof_status",
+)
+
+
+def file_digest(path: str, algo: str = "sha256", block: int = 1 << 20) -> str:
+    """Empreinte d'un fichier, lue par blocs."""
+    h = hashlib.new(algo)
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(block), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+
+def round_name(server_round: int, session: Optional[int] = None) -> str:
+    """Nom unique d'un round : s<session>_round<r> (ou round<r> hors session)."""
+    return f"round{server_round}" if session is None else f"s{session}_round{server_round}"
+
+
+class Ledger:
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(paths.SHARED_DIR, "ledger.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    # ---------------------------------------------------------------
+    # Connexions (une par thread) et transactions
+    # ---------------------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        """Transaction d'écriture : verrou pris dès le début (BEGIN IMMEDIATE)."""
+        c = self._conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ---------------------------------------------------------------
+    # État de la fédération (remplace state.pkl)
+    # ---------------------------------------------------------------
+    def _get_kv(self, c, key: str) -> Optional[str]:
+        row = c.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_kv(self, c, key: str, value) -> None:
+        c.execute(
+            "INSERT INTO kv(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    def get_or_init_state(self, initial_server: str, initial_session: int = 0) -> Dict:
+        with self._tx() as c:
+            server = self._get_kv(c, "current_server")
+            if server is None:
+                self._set_kv(c, "current_server", initial_server)
+                self._set_kv(c, "session", initial_session)
+                server, session = initial_server, initial_session
+            else:
+                session = int(self._get_kv(c, "session") or 0)
+        return {"current_server": server, "session": session}
+
+    def elect_next(self, all_peers: List[str], expected_current: Optional[str] = None) -> Dict:
+        """
+        Élection atomique (tourniquet). Si `expected_current` ne correspond plus au serveur
+        enregistré (élection déjà faite par un autre pair), l'état courant est renvoyé tel quel.
+        """
+        with self._tx() as c:
+            current = self._get_kv(c, "current_server") or all_peers[0]
+            session = int(self._get_kv(c, "session") or 0)
+            if expected_current is not None and current != expected_current:
+                return {"current_server": current, "session": session}
+            nxt = all_peers[(all_peers.index(current) + 1) % len(all_peers)]
+            c.execute("UPDATE sessions SET ended_at = ? WHERE id = ? AND ended_at IS NULL", (time.time(), session))
+            self._set_kv(c, "current_server", nxt)
+            self._set_kv(c, "session", session + 1)
+        return {"current_server": nxt, "session": session + 1}
+
+    def start_session(self, session: int, server: str) -> None:
+        with self._tx() as c:
+            c.execute(
+                "INSERT INTO sessions(id, server, started_at) VALUES(?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET server = excluded.server, started_at = excluded.started_at",
+                (session, server, time.time()),
+            )
+
+    # ---------------------------------------------------------------
+    # Rounds
+    # ---------------------------------------------------------------
+    def upsert_round(self, name: str, **fields) -> int:
+        unknown = set(fields) - set(ROUND_FIELDS)
+        if unknown:
+            raise KeyError(f"Champs de round inconnus: {sorted(unknown)}")
+        now = time.time()
+        with self._tx() as c:
+            row = c.execute("SELECT id FROM rounds WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                cols = ["name", "created_at", "updated_at"] + list(fields)
+                vals = [name, now, now] + list(fields.values())
+                cur = c.execute(
+                    f"INSERT INTO rounds({', '.join(cols)}) VALUES({', '.join('?' * len(cols))})", vals
+                )
+                return cur.lastrowid
+            if fields:
+                sets = ", ".join(f"{k} = ?" for k in fields)
+                c.execute(f"UPDATE rounds SET {sets}, updated_at = ? WHERE id = ?", (*fields.values(), now, row["id"]))
+            return row["id"]
+
+    def _round_id(self, c, name: str) -> int:
+        row = c.execute("SELECT id FROM rounds WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(f"Round inconnu dans le ledger: {name}")
+        return row["id"]
+
+    def get_round(self, name: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM rounds WHERE name = ?", (name,)).fetchone()
+        return dict(row) if row else None
+
+    def list_rounds(self, session_id: Optional[int] = None, status: Optional[str] = None) -> List[Dict]:
+        q, args = "SELECT * FROM rounds WHERE 1=1", []
+        if session_id is not None:
+            q += " AND session_id = ?"
+            args.append(session_id)
+        if status is not None:
+            q += " AND proof_status = ?"
+            args.append(status)
+        q += " ORDER BY id"
+        return [dict(r) for r in self._conn().execute(q, args).fetchall()]
+
+    def latest_round(self, status: Optional[str] = None) -> Optional[Dict]:
+        q = "SELECT * FROM rounds" + (" WHERE proof_status = ?" if status else "") + " ORDER BY id DESC LIMIT 1"
+        row = self._conn().execute(q, (status,) if status else ()).fetchone()
+        return dict(row) if row else None
+
+    def set_client_roots(self, name: str, roots: Iterable[Tuple[str, Optional[str], Optional[int], str]]) -> None:
+        """roots : (slot, client_id, num_examples, root) — slot = 'w1' / 'w2' ..."""
+        with self._tx() as c:
+            rid = self._round_id(c, name)
+            c.executemany(
+                "INSERT OR REPLACE INTO client_roots(round_id, slot, client_id, num_examples, root) VALUES(?, ?, ?, ?, ?)",
+                [(rid, slot, cid, n, None if root is None else str(root)) for slot, cid, n, root in roots],
+            )
+
+    def get_client_roots(self, name: str) -> List[Dict]:
+        rows = self._conn().execute(
+            "SELECT cr.* FROM client_roots cr JOIN rounds r ON r.id = cr.round_id WHERE r.name = ? ORDER BY slot",
+            (name,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def add_artifacts(self, name: str, items: Iterable[Tuple[str, int, str, Optional[str]]]) -> None:
+        """items : (kind, chunk, path, digest) — chunk = -1 pour un artefact de round."""
+        with self._tx() as c:
+            rid = self._round_id(c, name)
+            c.executemany(
+                "INSERT OR REPLACE INTO artifacts(round_id, kind, chunk, path, digest) VALUES(?, ?, ?, ?, ?)",
+                [(rid, kind, int(chunk), path, digest) for kind, chunk, path, digest in items],
+            )
+
+    def get_artifacts(self, name: str, kind: Optional[str] = None) -> List[Dict]:
+        q = "SELECT a.* FROM artifacts a JOIN rounds r ON r.id = a.round_id WHERE r.name = ?"
+        args = [name]
+        if kind is not None:
+            q += " AND a.kind = ?"
+            args.append(kind)
+        q += " ORDER BY a.kind, a.chunk"
+        return [dict(r) for r in self._conn().execute(q, args).fetchall()]
+
+    def record_anchors(self, items: Iterable[Tuple[str, int, str, str, Optional[str], str, int]]) -> None:
+        """items : (round, chain_round_id, h_model, h_artifacts, batch_root, tx_hash, gas_used)."""
+        now = time.time()
+        with self._tx() as c:
+            for name, chain_id, h_model, h_artifacts, root, tx_hash, gas in items:
+                c.execute(
+                    "INSERT OR REPLACE INTO anchors VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self._round_id(c, name), str(chain_id), h_model, h_artifacts, root, tx_hash, int(gas), now),
+                )
+
+    def unanchored_rounds(self, status: str = "proved") -> List[Dict]:
+        rows = self._conn().execute(
+            "SELECT r.* FROM rounds r LEFT JOIN anchors a ON a.round_id = r.id "
+            "WHERE a.round_id IS NULL AND r.proof_status = ? ORDER BY r.id",
+            (status,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ---------------------------------------------------------------
+    # File de preuves par chunk (partagée par tous les pairs, baux à expiration)
+    # ---------------------------------------------------------------
+    def enqueue_proof_jobs(self, name: str, n_chunks: int, backend: str,
+                           rejected: Optional[Dict[int, str]] = None) -> None:
+        """
+        (Ré)initialise les jobs d'un round : un job 'queued' par chunk,
+        sauf les chunks `rejected` ({chunk: raison}) inscrits directement en 'failed'.
+        """
+        now = time.time()
+        rejected = rejected or {}
+        with self._tx() as c:
+            rid = self._round_id(c, name)
+            c.execute("DELETE FROM proof_jobs WHERE round_id = ?", (rid,))
+            c.executemany(
+                "INSERT INTO proof_jobs(round_id, chunk, backend, status, error, updated_at) VALUES(?, ?, ?, ?, ?, ?)",
+                [
+                    (rid, k, backend, "failed" if k in rejected else "queued", rejected.get(k, None), now)
+                    for k in range(int(n_chunks))
+                ],
+            )
+
+    def claim_proof_job(self, worker: str, lease: float, name: Optional[str] = None,
+                        max_attempts: int = 3) -> Optional[Dict]:
+        """
+        Prend le plus ancien job libre (en attente, ou bail expiré) ; `name` restreint à un round.
+        Un bail expiré au dernier essai (worker mort) passe en 'failed' : il ne serait plus jamais repris.
+        Retourne {round, zkp_dir, chunk, backend, attempts} ou None.
+        """
+        now = time.time()
+        q = (
+            "SELECT j.round_id, j.chunk, j.backend, j.attempts, r.name, r.zkp_dir FROM proof_jobs j "
+            "JOIN rounds r ON r.id = j.round_id "
+            "WHERE (j.status = 'queued' OR (j.status = 'leased' AND j.lease_until < ?)) AND j.attempts < ?"
+        )
+        args = [now, int(max_attempts)]
+        if name is not None:
+            q += " AND r.name = ?"
+            args.append(name)
+        q += " ORDER BY j.round_id, j.chunk LIMIT 1"
+        with self._tx() as c:
+            c.execute(
+                "UPDATE proof_jobs SET status = 'failed', lease_until = NULL, "
+                "error = COALESCE(error, 'bail expiré au dernier essai (worker ' || COALESCE(worker, '?') || ')'), "
+                "updated_at = ? WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, now, int(max_attempts)),
+            )
+            row = c.execute(q, args).fetchone()
+            if row is None:
+                return None
+            c.execute(
+                "UPDATE proof_jobs SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE round_id = ? AND chunk = ?",
+                (worker, now + lease, now, row["round_id"], row["chunk"]),
+            )
+        return {"round": row["name"], "zkp_dir": row["zkp_dir"], "chunk": row["chunk"],
+                "backend": row["backend"], "attempts": row["attempts"] + 1}
+
+    def renew_proof_lease(self, name: str, chunk: int, worker: str, lease: float) -> bool:
+        """Prolonge le bail ; False si le job a été repris par un autre worker."""
+        now = time.time()
+        with self._tx() as c:
+            cur = c.execute(
+                "UPDATE proof_jobs SET lease_until = ?, updated_at = ? "
+                "WHERE round_id = ? AND chunk = ? AND worker = ? AND status = 'leased'",
+                (now + lease, now, self._round_id(c, name), int(chunk), worker),
+            )
+        return cur.rowcount == 1
+
+    def finish_proof_job(self, name: str, chunk: int, worker: str, ok: bool,
+                         error: Optional[str] = None, seconds: Optional[float] = None,
+                         max_attempts: int = 3) -> None:
+        """Succès -> 'done' ; échec -> 'queued' (nouvel essai) ou 'failed' après max_attempts."""
+        now = time.time()
+        with self._tx() as c:
+            rid = self._round_id(c, name)
+            if ok:
+                c.execute(
+                    "UPDATE proof_jobs SET status = 'done', worker = ?, lease_until = NULL, error = NULL, "
+                    "seconds = ?, updated_at = ? WHERE round_id = ? AND chunk = ? AND status != 'done'",
+                    (worker, seconds, now, rid, int(chunk)),
+                )
+            else:
+                c.execute(
+                    "UPDATE proof_jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                    "lease_until = NULL, error = ?, updated_at = ? "
+                    "WHERE round_id = ? AND chunk = ? AND worker = ? AND status = 'leased'",
+                    (int(max_attempts), error, now, rid, int(chunk), worker),
+                )
+
+    def proof_jobs(self, name: str) -> List[Dict]:
+        rows = self._conn().execute(
+            "SELECT j.* FROM proof_jobs j JOIN rounds r ON r.id = j.round_id WHERE r.name = ? ORDER BY j.chunk",
+            (name,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def proof_job_counts(self, name: str) -> Dict[str, int]:
+        rows = self._conn().execute(
+            "SELECT j.status, COUNT(*) AS n FROM proof_jobs j JOIN rounds r ON r.id = j.round_id "
+            "WHERE r.name = ? GROUP BY j.status",
+            (name,),
+        ).fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    # ---------------------------------------------------------------
+    # Checkpoints du modèle global
+    # ---------------------------------------------------------------
+    def add_checkpoint(self, name: str, digest: str, path: str, n_params: Optional[int] = None) -> None:
+        with self._tx() as c:
+            rid = self._round_id(c, name)
+            c.execute(
+                "INSERT OR REPLACE INTO checkpoints(round_id, digest, path, n_params, created_at) "
+                "VALUES(?, ?, ?, ?, ?)",
+                (rid, digest, path, n_params, time.time()),
+            )
+
+    def latest_checkpoints(self, status: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """
+        Checkpoints les plus récents d'abord, avec le nom et l'état de preuve de leur round.
+        Les rounds dont la preuve a échoué sont exclus ; `status` restreint à un état (ex: 'proved').
+        """
+        q = (
+            "SELECT c.*, r.name, r.session_id, r.server_round, r.proof_status FROM checkpoints c "
+            "JOIN rounds r ON r.id = c.round_id WHERE r.proof_status != 'failed'"
+        )
+        args = []
+        if status is not None:
+            q += " AND r.proof_status = ?"
+            args.append(status)
+        q += " ORDER BY c.created_at DESC LIMIT ?"
+        args.append(int(limit))
+        return [dict(r) for r in self._conn().execute(q, args).fetchall()]
+
+    # ---------------------------------------------------------------
+    # Historique : Merkle Mountain Range des racines de rounds (utils/mmr.py)
+    # ---------------------------------------------------------------
+    def append_mmr_leaf(self, name: str, chain_round_id: int, roots: Tuple[str, str, str], leaf: bytes,
+                        merge: Callable[[bytes, bytes], bytes]) -> Optional[int]:
+        """
+        Ajoute la feuille d'un round et les nœuds complétés (merge(gauche, droite)) dans une seule
+        transaction. Retourne l'index de la feuille, ou None si la dernière feuille du round est identique.
+        """
+        with self._tx() as c:
+            rid = self._round_id(c, name)
+            last = c.execute(
+                "SELECT leaf FROM mmr_leaves WHERE round_id = ? ORDER BY leaf_index DESC LIMIT 1", (rid,)
+            ).fetchone()
+            if last is not None and last["leaf"] == leaf.hex():
+                return None
+            index = c.execute("SELECT COUNT(*) FROM mmr_leaves").fetchone()[0]
+            c.execute(
+                "INSERT INTO mmr_leaves VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                (index, rid, str(chain_round_id), *roots, leaf.hex(), time.time()),
+            )
+            h, i, node = 0, index, leaf
+            c.execute("INSERT INTO mmr_nodes VALUES(?, ?, ?)", (h, i, node.hex()))
+            while i & 1:
+                left = bytes.fromhex(c.execute(
+                    "SELECT hash FROM mmr_nodes WHERE height = ? AND idx = ?", (h, i - 1)
+                ).fetchone()["hash"])
+                node = merge(left, node)
+                h, i = h + 1, i >> 1
+                c.execute("INSERT INTO mmr_nodes VALUES(?, ?, ?)", (h, i, node.hex()))
+            return index
+
+    def mmr_size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM mmr_leaves").fetchone()[0]
+
+    def mmr_node(self, height: int, idx: int) -> bytes:
+        row = self._conn().execute(
+            "SELECT hash FROM mmr_nodes WHERE height = ? AND idx = ?", (height, idx)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Nœud MMR absent: ({height}, {idx})")
+        return bytes.fromhex(row["hash"])
+
+    def mmr_leaf(self, name: Optional[str] = None, index: Optional[int] = None) -> Optional[Dict]:
+        """Feuille par index, ou dernière feuille d'un round."""
+        q = "SELECT l.*, r.name FROM mmr_leaves l JOIN rounds r ON r.id = l.round_id"
+        if index is not None:
+            row = self._conn().execute(q + " WHERE l.leaf_index = ?", (index,)).fetchone()
+        else:
+            row = self._conn().execute(q + " WHERE r.name = ? ORDER BY l.leaf_index DESC LIMIT 1", (name,)).fetchone()
+        return dict(row) if row else None
+
+    def rounds_without_mmr_leaf(self) -> List[Dict]:
+        rows = self._conn().execute(
+            "SELECT r.* FROM rounds r WHERE r.root_w1 IS NOT NULL AND r.proof_status != 'failed' "
+            "AND NOT EXISTS (SELECT 1 FROM mmr_leaves l WHERE l.round_id = r.id) ORDER BY r.id"
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def record_mmr_anchor(self, size: int, root: str, tx_hash: str, gas_used: int) -> None:
+        with self._tx() as c:
+            c.execute(
+                "INSERT OR REPLACE INTO mmr_anchors VALUES(?, ?, ?, ?, ?)",
+                (int(size), root, tx_hash, int(gas_used), time.time()),
+            )
+
+    def mmr_anchor(self, size: Optional[int] = None) -> Optional[Dict]:
+        """Racine ancrée pour une taille d'historique (défaut: la plus récente)."""
+        if size is None:
+            row = self._conn().execute("SELECT * FROM mmr_anchors ORDER BY size DESC LIMIT 1").fetchone()
+        else:
+            row = self._conn().execute("SELECT * FROM mmr_anchors WHERE size = ?", (int(size),)).fetchone()
+        return dict(row) if row else None
+
+    # ---------------------------------------------------------------
+    # Audit : cache d'empreintes et rapports par round
+    # ---------------------------------------------------------------
+    def cached_digest(self, path: str, size: int, mtime_ns: int) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT digest FROM file_digests WHERE path = ? AND size = ? AND mtime_ns = ?", (path, size, mtime_ns)
+        ).fetchone()
+        return row["digest"] if row else None
+
+    def store_digest(self, path: str, size: int, mtime_ns: int, digest: str) -> None:
+        with self._tx() as c:
+            c.execute(
+                "INSERT OR REPLACE INTO file_digests(path, size, mtime_ns, digest) VALUES(?, ?, ?, ?)",
+                (path, size, mtime_ns, digest),
+            )
+
+    def get_audit(self, name: str) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT a.* FROM audits a JOIN rounds r ON r.id = a.round_id WHERE r.name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"stat_key": row["stat_key"], "report": json.loads(row["report"]), "keys": json.loads(row["keys"]),
+                "audited_at": row["audited_at"]}
+
+    def set_audit(self, name: str, stat_key: str, report: Dict, keys: Dict) -> None:
+        with self._tx() as c:
+            rid = self._round_id(c, name)
+            c.execute(
+                "INSERT OR REPLACE INTO audits(round_id, stat_key, report, keys, audited_at) VALUES(?, ?, ?, ?, ?)",
+                (rid, stat_key, json.dumps(report), json.dumps(keys), time.time()),
+            )
+
+    def record_timing(self, name: str, phase: str, seconds: float) -> None:
+        with self._tx() as c:
+            rid = self._round_id(c, name)
+            c.execute(
+                "INSERT OR REPLACE INTO timings(round_id, phase, seconds) VALUES(?, ?, ?)",
+                (rid, phase, float(seconds)),
+            )
+
+    def get_timings(self, name: str) -> Dict[str, float]:
+        rows = self._conn().execute(
+            "SELECT t.phase, t.seconds FROM timings t JOIN rounds r ON r.id = t.round_id WHERE r.name = ?",
+            (name,),
+        ).fetchall()
+        return {r["phase"]: r["seconds"] for r in rows}
+
+
+_LEDGERS: Dict[str, Ledger] = {}
+_LEDGERS_LOCK = threading.Lock()
+
+
+def get_ledger(db_path: Optional[str] = None) -> Ledger:
+    """Ledger partagé du processus (un par fichier SQLite)."""
+    path = os.path.abspath(db_path or os.path.join(paths.SHARED_DIR, "ledger.sqlite"))
+    with _LEDGERS_LOCK:
+        if path not in _LEDGERS:
+            _LEDGERS[path] = Ledger(path)
+        return _LEDGERS[path]
+
+
+def record_roots(name: str, roots_path: str, clients: Optional[List[Dict]] = None) -> None:
+    """
+    Reporte roots.json (et les racines par client) dans le ledger. Un recommit aux racines
+    inchangées conserve le statut de preuve déjà atteint ('proved' / 'failed').
+    """
+    with open(roots_path) as f:
+        roots = json.load(f)
+    ledger = get_ledger()
+    prev = ledger.get_round(name) or {}
+    unchanged = (prev.get("root_w1"), prev.get("root_w2")) == (str(roots["root_w1"]), str(roots["root_w2"]))
+    keep = unchanged and prev.get("proof_status") in ("proved", "failed")
+    ledger.upsert_round(
+        name,
+        commit_dir=os.path.dirname(os.path.abspath(roots_path)),
+        n_chunks=int(roots["n_chunks"]),
+        chunk_size=int(roots["chunk_size"]),
+        scale=int(roots["scale"]),
+        depth=int(roots["depth"]),
+        root_w1=str(roots["root_w1"]),
+        root_w2=str(roots["root_w2"]),
+        proof_status=prev["proof_status"] if keep else "committed",
+    )
+    # client_id / num_examples déjà enregistrés à l'export (sinon fournis par `clients`)
+    known = {r["slot"]: r for r in ledger.get_client_roots(name)}
+    clients = clients or [known.get("w1", {}), known.get("w2", {})]
+    ledger.set_client_roots(name, [
+        (slot, c.get("client_id"), c.get("num_examples"), roots[f"root_{slot}"])
+        for slot, c in zip(("w1", "w2"), clients)
+    ])
+    ledger.add_artifacts(name, [("roots", -1, os.path.abspath(roots_path), file_digest(roots_path))])
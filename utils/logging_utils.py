@@ -1,56 +1,104 @@
+"""
+Journal des métriques du serveur : une ligne JSON par enregistrement (append-only), fichier gardé ouvert.
+
+Chaque ligne : {"round", "phase", "time" (epoch), "elapsed" (s depuis create_log), métriques...}
+- phase : TRAIN (fit agrégé), EVAL (évaluation fédérée) ou SERVER_EVAL (test côté serveur) ;
+- métriques : valeurs numériques typées (int / float, bool exclus), sans arrondi, y compris
+  temps (aggregation_time, eval_time...) et débits (samples_per_sec, update_bytes, updates_per_min...) ;
+  chaînes et octets (client_id, empreintes) ignorés.
+Les anciens journaux CSV (server_log_*.csv) restent lisibles par read_metrics.
+"""
 import os
 import csv
+import json
+import math
+import time
+import threading
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+from utils import paths
+
+LOG_EXT = ".jsonl"
+PHASES = ("TRAIN", "EVAL", "SERVER_EVAL")
+
+_LOG_LOCK = threading.Lock()   # l'évaluation serveur journalise depuis son propre thread
+_HANDLES = {}                  # log_file -> (fichier ouvert en append, instant de création)
 
 def create_log():
-	log_dir = "/app/logs"
+	log_dir = paths.LOGS_DIR
 	try:
 		os.makedirs(log_dir, exist_ok = True)
-		log_file = f"logs/server_log_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv"
-
-		with open(log_file, mode = "w", newline= "", encoding = "utf-8") as f:
-			writer = csv.writer(f)
-			writer.writerow([
-				"Round",
-				"Train_Loss",
-				"Train_Accuracy",
-				"Eval_Loss",
-				"Eval_Accuracy",
-				"Phase"
-		])
+		log_file = os.path.join(log_dir, f"server_log_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}{LOG_EXT}")
+		with _LOG_LOCK:
+			_HANDLES[log_file] = (open(log_file, mode = "a", encoding = "utf-8"), time.time())
 		return log_file
 	except Exception as e:
 		raise RuntimeError(f"Failed to create log file: {str(e)}")
 
-def log_metrics(log_file:str, server_round:int, train_metrics:Optional[Dict], eval_metrics:Optional[Dict]):
-	def fmt(val):
-		return f"{val:4f}" if isinstance(val, (float,int)) else "N/A"
-
-	write_header = not os.path.exists(log_file)
-
-	with open(log_file, mode = "a", newline = "") as f:
-		writer = csv.writer(f)
-
-		if write_header:
-			writer.writerow(["Round", "Train_Loss", "Train_Accuracy", "Eval_Loss", "Eval_Accuracy", "Phase"])
-
-		if train_metrics:
-			writer.writerow([
-				server_round,
-				fmt(train_metrics.get("loss")),
-				fmt(train_metrics.get("accuracy")),
-				"N/A",
-				"N/A",
-				"TRAIN"
-			])
-		if eval_metrics:
-			writer.writerow([
-				server_round,
-				"N/A",
-				"N/A",
-				fmt(eval_metrics.get("loss")),
-				fmt(eval_metrics.get("accuracy")),
-				"EVAL"
-			])
+def close_log(log_file: str):
+	with _LOG_LOCK:
+		handle = _HANDLES.pop(log_file, None)
+	if handle is not None:
+		handle[0].close()
+
+def _numeric(metrics: Dict) -> Dict:
+	out = {}
+	for key, val in metrics.items():
+		if isinstance(val, bool) or not isinstance(val, (int, float)):
+			continue
+		if isinstance(val, float) and not math.isfinite(val):
+			continue
+		out[key] = val
+	return out
+
+def log_metrics(log_file:str, server_round:int, train_metrics:Optional[Dict], eval_metrics:Optional[Dict], eval_phase:str = "EVAL"):
+	""" eval_phase : "EVAL" (évaluation fédérée des clients) ou "SERVER_EVAL" (jeu de test, côté serveur) """
+	records = []
+	if train_metrics:
+		records.append(("TRAIN", train_metrics))
+	if eval_metrics:
+		records.append((eval_phase, eval_metrics))
+	if not records or log_file is None:
+		return
+
+	now = time.time()
+	with _LOG_LOCK:
+		if log_file not in _HANDLES:
+			# journal créé par un autre processus (ou refermé) : rouvert une fois, puis gardé
+			_HANDLES[log_file] = (open(log_file, mode = "a", encoding = "utf-8"), os.path.getmtime(log_file) if os.path.exists(log_file) else now)
+		f, t0 = _HANDLES[log_file]
+		for phase, metrics in records:
+			f.write(json.dumps({"round": int(server_round), "phase": phase, "time": now, "elapsed": now - t0, **_numeric(metrics)}) + "\n")
+		f.flush()   # lignes complètes visibles du traceur en arrière-plan
+
+def _csv_records(log_file: str) -> List[Dict]:
+	""" Ancien format : Round, Train_Loss, Train_Accuracy, Eval_Loss, Eval_Accuracy, Phase ("N/A" = absent) """
+	records = []
+	with open(log_file, newline = "") as f:
+		for row in csv.DictReader(f):
+			rec = {"round": int(row["Round"]), "phase": row["Phase"]}
+			prefix = "Train" if row["Phase"] == "TRAIN" else "Eval"
+			for key in ("loss", "accuracy"):
+				val = row.get(f"{prefix}_{key.capitalize()}")
+				if val not in (None, "", "N/A"):
+					rec[key] = float(val)
+			records.append(rec)
+	return records
 
+def read_metrics(log_file: str, offset: int = 0):
+	"""
+	Enregistrements du journal à partir de l'octet `offset` -> (records, nouvel offset).
+	Seules les lignes complètes sont lues : un lecteur incrémental reprend au nouvel offset.
+	"""
+	if log_file.endswith(".csv"):
+		return (_csv_records(log_file) if offset == 0 else []), os.path.getsize(log_file)
+	records = []
+	with open(log_file, "rb") as f:
+		f.seek(offset)
+		for line in f:
+			if not line.endswith(b"\n"):
+				break
+			offset += len(line)
+			if line.strip():
+				records.append(json.loads(line))
+	return records, offset
@@ -1,5 +1,5 @@
 from typing import List, Tuple
-from utils.poseidon_wrapper import poseidon_hash_array
+from utils.poseidon_wrapper import poseidon_hash_many
 
 def build_merkle(leaves: List[int]) -> Tuple[int, List[List[int]], int]:
     """
@@ -22,10 +22,8 @@ def build_merkle(leaves: List[int]) -> Tuple[int, List[List[int]], int]:
     tree = [padded]
     cur = padded
     while len(cur) > 1:
-        nxt = []
-        for i in range(0, len(cur), 2):
-            left, right = cur[i], cur[i+1]
-            nxt.append(poseidon_hash_array([left, right]))
+        # un seul lot par niveau (worker Poseidon persistant)
+        nxt = poseidon_hash_many([[cur[i], cur[i+1]] for i in range(0, len(cur), 2)])
         tree.append(nxt)
         cur = nxt
 
@@ -0,0 +1,283 @@
+# utils/merkle_store.py
+"""
+Arbres Merkle des rounds commités, en fichier binaire compact, pour répondre aux preuves d'inclusion
+(round, client, chunk) -> leaf, siblings, pathBits, root sans relire les input_chunk_k.json.
+
+Format trees.bin (écrit à côté de roots.json au commit, entiers big-endian) :
+  "FLMT" | version u8 | n_arbres u8 | depth u8 | 0 u8 | n_chunks u32
+  | slot (8 octets ASCII, complétés par des 0) × n_arbres
+  | pour chaque arbre, niveaux 0..depth : 2^(depth-l) nœuds de 32 octets (feuilles paddées à 0 incluses)
+Un nœud se lit par simple décalage : une preuve coûte quelques microsecondes.
+
+Les rounds commités avant ce format sont reconstruits une fois depuis leurs inputs (frères récoltés,
+feuilles manquantes rehachées), contrôlés contre roots.json, puis écrits en trees.bin.
+TreeCache garde les derniers rounds consultés en mémoire (LRU, ZKP_TREE_CACHE rounds).
+"""
+import os
+import json
+import struct
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils import paths
+from utils.ledger import get_ledger
+from utils.poseidon_wrapper import poseidon_hash_many, LEAF_HASH_V1
+
+TREE_FILE = "trees.bin"
+MAGIC = b"FLMT"
+VERSION = 1
+NODE = 32
+HEADER = struct.Struct(">4sBBBBI")
+SLOT = 8
+TREE_CACHE = int(os.environ.get("ZKP_TREE_CACHE", "16"))
+FIELD_P = 21888242871839275222246405745257275088548364400416034343698204186575808495617
+
+# slot de l'arbre -> clés des frères / bits dans input_chunk_k.json
+SLOT_KEYS = {"w1": ("siblings1", "pathBits1"), "w2": ("siblings2", "pathBits2"), "avg": ("siblingsAvg", "pathBitsAvg")}
+
+
+def write_tree_file(path: str, trees: Dict[str, List[List[int]]], n_chunks: int) -> str:
+    """Écrit les arbres (niveaux de build_merkle, par slot) en trees.bin, par renommage atomique."""
+    depths = {len(t) - 1 for t in trees.values()}
+    if len(depths) != 1:
+        raise ValueError(f"[MERKLE] Profondeurs différentes: {sorted(depths)}")
+    depth = depths.pop()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(trees), depth, 0, int(n_chunks)))
+        for slot in trees:
+            f.write(slot.encode("ascii").ljust(SLOT, b"\0"))
+        for levels in trees.values():
+            for l, level in enumerate(levels):
+                if len(level) != 1 << (depth - l):
+                    raise ValueError(f"[MERKLE] Niveau {l} de taille {len(level)} (attendu {1 << (depth - l)})")
+                f.write(b"".join(int(x).to_bytes(NODE, "big") for x in level))
+    os.replace(tmp, path)
+    return path
+
+
+class RoundTrees:
+    """Arbres d'un round (trees.bin en mémoire) : accès direct aux nœuds et preuves d'inclusion."""
+
+    def __init__(self, data: bytes, name: str = "", clients: Optional[Dict[str, str]] = None):
+        magic, version, n_trees, depth, _, n_chunks = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"[MERKLE] {name}: fichier d'arbres invalide ({magic!r} v{version})")
+        self.name = name
+        self.depth = depth
+        self.n_chunks = n_chunks
+        off = HEADER.size
+        self.slots = [data[off + i * SLOT: off + (i + 1) * SLOT].rstrip(b"\0").decode("ascii") for i in range(n_trees)]
+        self._base = off + n_trees * SLOT
+        self._tree_bytes = NODE * ((2 << depth) - 1)
+        self._level_off = [NODE * ((2 << depth) - (2 << (depth - l))) for l in range(depth + 1)]
+        if len(data) != self._base + n_trees * self._tree_bytes:
+            raise ValueError(f"[MERKLE] {name}: taille de fichier incohérente")
+        self._data = data
+        self.clients = clients or {}   # client_id -> slot
+
+    @classmethod
+    def load(cls, path: str, name: str = "", clients: Optional[Dict[str, str]] = None) -> "RoundTrees":
+        with open(path, "rb") as f:
+            return cls(f.read(), name, clients)
+
+    def slot_for(self, client: str) -> str:
+        if client in self.slots:
+            return client
+        if client in self.clients:
+            return self.clients[client]
+        raise KeyError(f"[MERKLE] {self.name}: client inconnu {client} (slots {self.slots}, clients {sorted(self.clients)})")
+
+    def node(self, slot: str, level: int, index: int) -> int:
+        off = self._base + self.slots.index(slot) * self._tree_bytes + self._level_off[level] + NODE * index
+        return int.from_bytes(self._data[off:off + NODE], "big")
+
+    def root(self, slot: str) -> int:
+        return self.node(slot, self.depth, 0)
+
+    def proof(self, client: str, chunk: int) -> Dict:
+        """Preuve d'inclusion du chunk : mêmes conventions que get_merkle_proof / MerkleVerify."""
+        slot = self.slot_for(client)
+        if not 0 <= chunk < self.n_chunks:
+            raise IndexError(f"[MERKLE] {self.name}: chunk {chunk} hors de [0, {self.n_chunks})")
+        siblings, bits, cur = [], [], chunk
+        for level in range(self.depth):
+            siblings.append(str(self.node(slot, level, cur ^ 1)))
+            bits.append(cur & 1)
+            cur >>= 1
+        client_id = next((c for c, s in self.clients.items() if s == slot), None)
+        return {
+            "round": self.name, "slot": slot, "client_id": client_id, "chunk": int(chunk),
+            "leaf": str(self.node(slot, 0, chunk)), "siblings": siblings, "pathBits": bits,
+            "root": str(self.root(slot)),
+        }
+
+
+# -------------------------------
+# Rounds commités avant trees.bin : reconstruction depuis les inputs
+# -------------------------------
+def rebuild_from_inputs(commits_dir: str) -> Dict[str, List[List[int]]]:
+    """
+    Niveaux complets des arbres d'un round à partir des frères portés par input_chunk_k.json.
+    Les nœuds qui ne sont le frère d'aucun chunk (feuille du dernier chunk impair, ancêtres en bordure
+    du padding) sont recalculés (Poseidon, par niveau) ; les racines sont contrôlées contre roots.json.
+    """
+    with open(os.path.join(commits_dir, "roots.json")) as f:
+        roots = json.load(f)
+    depth, n_chunks = int(roots["depth"]), int(roots["n_chunks"])
+    leaf_hash = roots.get("leaf_hash", LEAF_HASH_V1)
+    slots = ["w1", "w2"] + (["avg"] if "root_avg" in roots else [])
+    nodes = {slot: [dict() for _ in range(depth + 1)] for slot in slots}
+    missing_leaves = {slot: [] for slot in slots}
+
+    for k in range(n_chunks):
+        with open(os.path.join(commits_dir, "inputs", f"input_chunk_{k}.json")) as f:
+            payload = json.load(f)
+        for slot in slots:
+            sib_key, _ = SLOT_KEYS[slot]
+            for level, sib in enumerate(payload[sib_key]):
+                nodes[slot][level][(k >> level) ^ 1] = int(sib)
+            if (k ^ 1) >= n_chunks or depth == 0:
+                arr = payload["w_avg_pub" if "w_avg_pub" in payload else "w_avg"] if slot == "avg" else payload[slot]
+                missing_leaves[slot].append((k, [int(x) for x in arr]))
+
+    trees = {}
+    for slot in slots:
+        level0 = nodes[slot][0]
+        if missing_leaves[slot]:
+            hashed = poseidon_hash_many([arr for _, arr in missing_leaves[slot]], leaf_hash)
+            level0.update({k: h for (k, _), h in zip(missing_leaves[slot], hashed)})
+        levels = [[level0.get(j, 0) for j in range(1 << depth)]]   # feuilles de padding = 0
+        for level in range(1, depth + 1):
+            known = nodes[slot][level]
+            below = levels[-1]
+            todo = [j for j in range(1 << (depth - level)) if j not in known]
+            if todo:
+                hashed = poseidon_hash_many([[below[2 * j], below[2 * j + 1]] for j in todo])
+                known.update(zip(todo, hashed))
+            levels.append([known[j] for j in range(1 << (depth - level))])
+        expected = int(roots["root_avg" if slot == "avg" else f"root_{slot}"])
+        if levels[-1][0] != expected:
+            raise ValueError(f"[MERKLE] {commits_dir}: racine {slot} reconstruite différente de roots.json")
+        trees[slot] = levels
+    return trees
+
+
+# -------------------------------
+# Cache LRU des rounds
+# -------------------------------
+class TreeCache:
+    def __init__(self, maxsize: int = TREE_CACHE):
+        self.maxsize = max(1, int(maxsize))
+        self._trees: "OrderedDict[str, RoundTrees]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, name: str) -> RoundTrees:
+        ledger = get_ledger()
+        info = ledger.get_round(name) or {}
+        commits_dir = info.get("commit_dir") or os.path.join(paths.COMMITS_DIR, name)
+        if not os.path.exists(os.path.join(commits_dir, "roots.json")):
+            raise KeyError(f"[MERKLE] Round non commité: {name}")
+        path = os.path.join(commits_dir, TREE_FILE)
+        if not os.path.exists(path):
+            print(f"[MERKLE] {name}: {TREE_FILE} absent, reconstruction depuis les inputs")
+            with open(os.path.join(commits_dir, "roots.json")) as f:
+                n_chunks = int(json.load(f)["n_chunks"])
+            write_tree_file(path, rebuild_from_inputs(commits_dir), n_chunks)
+        clients = {r["client_id"]: r["slot"] for r in ledger.get_client_roots(name) if r.get("client_id")}
+        return RoundTrees.load(path, name, clients)
+
+    def get(self, name: str) -> RoundTrees:
+        with self._lock:
+            trees = self._trees.get(name)
+            if trees is not None:
+                self._trees.move_to_end(name)
+                return trees
+        trees = self._load(name)   # hors verrou : un chargement lent ne bloque pas les autres rounds
+        with self._lock:
+            self._trees[name] = trees
+            self._trees.move_to_end(name)
+            while len(self._trees) > self.maxsize:
+                self._trees.popitem(last=False)
+        return trees
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            if name is None:
+                self._trees.clear()
+            else:
+                self._trees.pop(name, None)
+
+    def query(self, name: str, client: str, chunk: int) -> Dict:
+        return self.get(name).proof(client, int(chunk))
+
+    def query_many(self, queries: Iterable[Tuple[str, str, int]]) -> List[Dict]:
+        """Lot de requêtes (round, client, chunk) ; une erreur par requête est renvoyée en {"error": ...}."""
+        out = []
+        for name, client, chunk in queries:
+            try:
+                out.append(self.query(name, client, chunk))
+            except (KeyError, IndexError, ValueError, OSError) as e:
+                out.append({"round": name, "client": client, "chunk": chunk, "error": str(e)})
+        return out
+
+
+_CACHE: Optional[TreeCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_tree_cache() -> TreeCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = TreeCache()
+        return _CACHE
+
+
+# -------------------------------
+# Vérification (même calcul que MerkleVerify du circuit)
+# -------------------------------
+def verify_proofs(proofs: Sequence[Dict]) -> List[bool]:
+    """
+    Recalcule la racine de chaque preuve : à chaque niveau (cur, sib) si pathBits = 0, (sib, cur) sinon,
+    hachés par Poseidon(2). Un lot Poseidon par niveau pour toutes les preuves. Contrôle aussi
+    pathBits ∈ {0,1}, les éléments dans le corps et, si `chunk` est donné, que les bits en sont l'écriture binaire.
+    """
+    ok, cur, paths_ = [], [], []
+    for p in proofs:
+        try:
+            sib = [int(x) for x in p["siblings"]]
+            bits = [int(b) for b in p["pathBits"]]
+            leaf, root = int(p["leaf"]), int(p["root"])
+        except (KeyError, TypeError, ValueError):
+            ok.append(False)
+            cur.append(None)
+            paths_.append(([], []))
+            continue
+        valid = (
+            len(sib) == len(bits)
+            and all(b in (0, 1) for b in bits)
+            and all(0 <= x < FIELD_P for x in sib + [leaf, root])
+            and ("chunk" not in p or bits == [(int(p["chunk"]) >> i) & 1 for i in range(len(bits))])
+        )
+        ok.append(valid)
+        cur.append(leaf if valid else None)
+        paths_.append((sib, bits))
+
+    depth = max((len(s) for s, _ in paths_), default=0)
+    for level in range(depth):
+        todo = [i for i, (s, _) in enumerate(paths_) if ok[i] and level < len(s)]
+        if not todo:
+            break
+        pairs = []
+        for i in todo:
+            s, b = paths_[i][0][level], paths_[i][1][level]
+            pairs.append([s, cur[i]] if b else [cur[i], s])
+        for i, h in zip(todo, poseidon_hash_many(pairs)):
+            cur[i] = h
+    return [bool(ok[i] and cur[i] == int(p["root"])) for i, p in enumerate(proofs)]
+
+
+def verify_proof(proof: Dict) -> bool:
+    return verify_proofs([proof])[0]
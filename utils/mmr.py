@@ -0,0 +1,247 @@
+# utils/mmr.py
+"""
+Historique des rounds : Merkle Mountain Range (keccak256) des racines commitées, append-only.
+
+- feuille = keccak256(abi.encode(roundId, root_w1, root_w2, root_agg)) ; root_agg = root_avg (mode root)
+  ou H_model (keccak des w_avg_pub, comme l'ancrage) en mode full ;
+- nœud (h, i) = keccak256(gauche || droite), couvre les feuilles [i·2^h, (i+1)·2^h) ; stocké une fois
+  dans le ledger (immuable) : un ajout crée la feuille puis les parents complétés (O(1) amorti) ;
+- sommets (peaks) = décomposition binaire de la taille n, du plus haut au plus bas ;
+- racine = keccak256(uint256(n) || sommets...) : la seule valeur à ancrer pour tout l'historique ;
+- preuves d'appartenance et de consistance (taille m -> n) en O(log n) empreintes.
+
+Les preuves sont des dict JSON (hex) ; verify_membership / verify_consistency n'ont besoin que d'elles
+et des racines de confiance (ancrées).
+"""
+import os
+import json
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils import paths
+from utils.anchoring import keccak256, model_hash, round_id as chain_round_id
+from utils.ledger import get_ledger
+
+MMR_ENABLED = os.environ.get("ZKP_MMR", "1") == "1"
+
+Node = Tuple[int, int]   # (hauteur, index au niveau)
+
+
+def _word(x) -> bytes:
+    return x.rjust(32, b"\0") if isinstance(x, bytes) else int(x).to_bytes(32, "big")
+
+
+def leaf_hash(round_id: int, root_w1, root_w2, root_agg) -> bytes:
+    return keccak256(_word(round_id) + _word(root_w1) + _word(root_w2) + _word(root_agg))
+
+
+def merge(left: bytes, right: bytes) -> bytes:
+    return keccak256(left + right)
+
+
+def peaks(size: int) -> List[Node]:
+    """Sommets d'une MMR de `size` feuilles, de gauche (le plus haut) à droite."""
+    out, offset = [], 0
+    for h in range(size.bit_length() - 1, -1, -1):
+        if size >> h & 1:
+            out.append((h, offset >> h))
+            offset += 1 << h
+    return out
+
+
+def bag(size: int, peak_hashes: Sequence[bytes]) -> bytes:
+    return keccak256(_word(size) + b"".join(peak_hashes))
+
+
+def _climb(known: Dict[Node, bytes], size: int, sibling: Callable[[Node], bytes]) -> Dict[Node, bytes]:
+    """
+    Remonte les nœuds connus jusqu'à leurs sommets dans la MMR de `size` feuilles.
+    Les frères manquants sont demandés à `sibling`, dans un ordre déterministe (niveau croissant,
+    index croissant) : le prouveur les lit dans le ledger, le vérificateur les dépile de la preuve.
+    """
+    targets = set(peaks(size))
+    known = dict(known)
+    level = 0
+    while any(n[0] >= level and n not in targets for n in known):
+        for h, i in sorted(n for n in known if n[0] == level and n not in targets):
+            parent = (h + 1, i >> 1)
+            if parent in known:
+                continue
+            sib = (h, i ^ 1)
+            s = known[sib] if sib in known else sibling(sib)
+            known[parent] = merge(known[(h, i)], s) if i % 2 == 0 else merge(s, known[(h, i)])
+        level += 1
+    return {n: v for n, v in known.items() if n in targets}
+
+
+def _check_peaks(reached: Dict[Node, bytes], size: int, peak_hashes: Sequence[bytes]) -> bool:
+    nodes = peaks(size)
+    if len(peak_hashes) != len(nodes):
+        return False
+    return all(peak_hashes[nodes.index(n)] == v for n, v in reached.items())
+
+
+# -------------------------------
+# Vérification (preuves seules + racines de confiance)
+# -------------------------------
+def verify_membership(proof: Dict, root: Optional[bytes] = None) -> bool:
+    """Feuille `leaf` à l'index `leaf_index` dans la MMR de taille `size` dont la racine est `root`."""
+    try:
+        size, index = int(proof["size"]), int(proof["leaf_index"])
+        if not 0 <= index < size:
+            return False
+        siblings = [bytes.fromhex(s) for s in proof["siblings"]]
+        peak_hashes = [bytes.fromhex(p) for p in proof["peaks"]]
+        reached = _climb({(0, index): bytes.fromhex(proof["leaf"])}, size, lambda _: siblings.pop(0))
+    except (KeyError, ValueError, IndexError):
+        return False
+    expected = root if root is not None else bytes.fromhex(proof["root"])
+    return not siblings and _check_peaks(reached, size, peak_hashes) and bag(size, peak_hashes) == expected
+
+
+def verify_consistency(proof: Dict, old_root: bytes, new_root: bytes) -> bool:
+    """La MMR de racine `new_root` prolonge celle de racine `old_root` (feuilles anciennes inchangées)."""
+    try:
+        old_size, new_size = int(proof["old_size"]), int(proof["new_size"])
+        if not 0 < old_size <= new_size:
+            return False
+        old_peaks = [bytes.fromhex(p) for p in proof["old_peaks"]]
+        new_peaks = [bytes.fromhex(p) for p in proof["new_peaks"]]
+        siblings = [bytes.fromhex(s) for s in proof["siblings"]]
+        if len(old_peaks) != len(peaks(old_size)) or bag(old_size, old_peaks) != old_root:
+            return False
+        reached = _climb(dict(zip(peaks(old_size), old_peaks)), new_size, lambda _: siblings.pop(0))
+    except (KeyError, ValueError, IndexError):
+        return False
+    return not siblings and _check_peaks(reached, new_size, new_peaks) and bag(new_size, new_peaks) == new_root
+
+
+# -------------------------------
+# MMR du ledger
+# -------------------------------
+class RoundMMR:
+    def __init__(self, ledger=None):
+        self.ledger = ledger or get_ledger()
+
+    @property
+    def size(self) -> int:
+        return self.ledger.mmr_size()
+
+    def peak_hashes(self, size: Optional[int] = None) -> List[bytes]:
+        size = self.size if size is None else size
+        return [self.ledger.mmr_node(h, i) for h, i in peaks(size)]
+
+    def root(self, size: Optional[int] = None) -> bytes:
+        """Racine de la MMR (de taille `size` : une racine ancrée passée reste reproductible)."""
+        size = self.size if size is None else size
+        if size <= 0:
+            raise ValueError("[MMR] Historique vide")
+        return bag(size, self.peak_hashes(size))
+
+    def _size(self, size: Optional[int]) -> int:
+        current = self.size
+        size = current if size is None else int(size)
+        if not 0 < size <= current:
+            raise ValueError(f"[MMR] Taille {size} hors de [1, {current}]")
+        return size
+
+    def append_round(self, name: str, roots: Optional[Dict] = None, round_dir: Optional[str] = None) -> Optional[int]:
+        """
+        Ajoute la feuille du round (racines de roots.json). Retourne son index, ou None si
+        le round figure déjà avec les mêmes racines (recommit à l'identique).
+        """
+        info = self.ledger.get_round(name) or {}
+        if roots is None:
+            commit_dir = info.get("commit_dir") or os.path.join(paths.COMMITS_DIR, name)
+            with open(os.path.join(commit_dir, "roots.json")) as f:
+                roots = json.load(f)
+        if "root_avg" in roots:
+            agg = int(roots["root_avg"])
+        else:
+            agg = int.from_bytes(model_hash(round_dir or info.get("zkp_dir") or os.path.join(paths.zkp_dir(), name)), "big")
+        rid = chain_round_id(info.get("server_round") or 0, info.get("session_id"))
+        leaf = leaf_hash(rid, int(roots["root_w1"]), int(roots["root_w2"]), agg)
+        fields = (str(roots["root_w1"]), str(roots["root_w2"]), str(agg))
+        return self.ledger.append_mmr_leaf(name, rid, fields, leaf, merge)
+
+    def backfill(self) -> List[str]:
+        """Ajoute, dans l'ordre du ledger, les rounds commités absents de l'historique (antérieurs à la MMR)."""
+        added = []
+        for r in self.ledger.rounds_without_mmr_leaf():
+            try:
+                if self.append_round(r["name"]) is not None:
+                    added.append(r["name"])
+            except (OSError, KeyError, ValueError) as e:
+                print(f"[MMR] {r['name']} ignoré : {e}")
+        return added
+
+    def membership_proof(self, name: Optional[str] = None, index: Optional[int] = None,
+                         size: Optional[int] = None) -> Dict:
+        """Preuve d'appartenance de la (dernière) feuille d'un round, ou de la feuille `index`."""
+        size = self._size(size)
+        row = self.ledger.mmr_leaf(name=name, index=index)
+        if row is None:
+            raise KeyError(f"[MMR] {name if index is None else index} absent de l'historique")
+        index = int(row["leaf_index"])
+        if index >= size:
+            raise ValueError(f"[MMR] Feuille {index} postérieure à la taille {size}")
+        siblings: List[bytes] = []
+
+        def _fetch(n: Node) -> bytes:
+            siblings.append(self.ledger.mmr_node(*n))
+            return siblings[-1]
+
+        _climb({(0, index): bytes.fromhex(row["leaf"])}, size, _fetch)
+        peak_hashes = self.peak_hashes(size)
+        return {
+            "round": row["name"],
+            "round_id": row["chain_round_id"],
+            "root_w1": row["root_w1"],
+            "root_w2": row["root_w2"],
+            "root_agg": row["root_agg"],
+            "leaf_index": index,
+            "leaf": row["leaf"],
+            "size": size,
+            "siblings": [s.hex() for s in siblings],
+            "peaks": [p.hex() for p in peak_hashes],
+            "root": bag(size, peak_hashes).hex(),
+        }
+
+    def consistency_proof(self, old_size: int, new_size: Optional[int] = None) -> Dict:
+        new_size = self._size(new_size)
+        old_size = int(old_size)
+        if not 0 < old_size <= new_size:
+            raise ValueError(f"[MMR] Tailles incohérentes: {old_size} -> {new_size}")
+        old_peaks = self.peak_hashes(old_size)
+        siblings: List[bytes] = []
+
+        def _fetch(n: Node) -> bytes:
+            siblings.append(self.ledger.mmr_node(*n))
+            return siblings[-1]
+
+        _climb(dict(zip(peaks(old_size), old_peaks)), new_size, _fetch)
+        new_peaks = self.peak_hashes(new_size)
+        return {
+            "old_size": old_size,
+            "new_size": new_size,
+            "old_peaks": [p.hex() for p in old_peaks],
+            "new_peaks": [p.hex() for p in new_peaks],
+            "siblings": [s.hex() for s in siblings],
+            "old_root": bag(old_size, old_peaks).hex(),
+            "new_root": bag(new_size, new_peaks).hex(),
+        }
+
+
+def append_committed_round(name: str, roots_path: str, round_dir: Optional[str] = None) -> Optional[int]:
+    """Appelé après chaque commit : ajoute le round à l'historique (sans jamais faire échouer le commit)."""
+    if not MMR_ENABLED:
+        return None
+    try:
+        with open(roots_path) as f:
+            roots = json.load(f)
+        index = RoundMMR().append_round(name, roots, round_dir)
+        if index is not None:
+            print(f"[MMR] {name} ajouté à l'historique (feuille {index})")
+        return index
+    except Exception as e:
+        print(f"[MMR] {name} non ajouté à l'historique : {e}")
+        return None
@@ -0,0 +1,56 @@
+# utils/paths.py
+"""
+Chemins de l'application, surchargeables par variables d'environnement
+(valeurs par défaut = arborescence du conteneur /app/...).
+
+Les modules lisent toujours `paths.X` au moment de l'appel (pas de copie à l'import),
+ce qui permet à un harnais local (simulate.py) de rediriger tout vers un dossier temporaire
+via configure().
+"""
+import os
+
+APP_DIR      = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_DIR   = os.environ.get("FL_SHARED_DIR", "/app/shared")
+COMMITS_DIR  = os.environ.get("FL_COMMITS_DIR", "/app/commits")
+LOGS_DIR     = os.environ.get("FL_LOGS_DIR", "/app/logs")
+CERTS_DIR    = os.environ.get("FL_CERTS_DIR", "/app/certs")
+DATA_DIR     = os.environ.get("FL_DATA_DIR", "./data")
+NODE_MODULES = os.environ.get("FL_NODE_MODULES", "/app/node_modules")
+
+
+def configure(root: str = None, **overrides) -> None:
+    """
+    Redirige les chemins. `root` place shared/commits/logs sous un même dossier ;
+    les autres clés (shared_dir, commits_dir, logs_dir, certs_dir, data_dir, node_modules)
+    surchargent individuellement.
+    """
+    g = globals()
+    if root is not None:
+        g["SHARED_DIR"] = os.path.join(root, "shared")
+        g["COMMITS_DIR"] = os.path.join(root, "commits")
+        g["LOGS_DIR"] = os.path.join(root, "logs")
+    for key, value in overrides.items():
+        name = key.upper()
+        if name not in ("SHARED_DIR", "COMMITS_DIR", "LOGS_DIR", "CERTS_DIR", "DATA_DIR", "NODE_MODULES"):
+            raise KeyError(f"Chemin inconnu: {key}")
+        g[name] = value
+
+
+def environ() -> dict:
+    """Variables FL_* reproduisant les chemins courants (configure() inclus) dans un sous-processus."""
+    return {
+        "FL_SHARED_DIR": os.path.abspath(SHARED_DIR),
+        "FL_COMMITS_DIR": os.path.abspath(COMMITS_DIR),
+        "FL_LOGS_DIR": os.path.abspath(LOGS_DIR),
+        "FL_CERTS_DIR": os.path.abspath(CERTS_DIR),
+        "FL_DATA_DIR": os.path.abspath(DATA_DIR),
+        "FL_NODE_MODULES": os.path.abspath(NODE_MODULES),
+    }
+
+
+def zkp_dir() -> str:
+    return os.path.join(SHARED_DIR, "zkp")
+
+
+def state_file() -> str:
+    return os.path.join(SHARED_DIR, "state.pkl")
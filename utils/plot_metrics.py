@@ -1,20 +1,33 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+"""
+Graphiques des métriques du serveur (journal JSON-lines de utils/logging_utils.py, ou ancien CSV).
+
+Tracé hors du serveur : start_background_plotter lance `python -m utils.plot_metrics --follow <journal>`
+dans un processus séparé (backend Agg, sans affichage). Il relit seulement les lignes ajoutées et
+redessine le PNG quand le journal a grandi ; à la fermeture de son stdin (fin ou arrêt du serveur),
+il fait un dernier rendu et s'arrête seul : le serveur n'attend jamais le tracé.
+"""
 import os
+import sys
 import glob
-import seaborn as sns
+import time
+import argparse
+import threading
+import subprocess
+from utils import paths
+from utils.logging_utils import LOG_EXT, read_metrics
 
-# Répertoires
-LOG_DIR = "/app/logs"
-OUTPUT_DIR = "/app/logs/plots"
+PLOT_INTERVAL = float(os.environ.get("FL_PLOT_INTERVAL", "10"))   # s entre deux contrôles du journal
+TIMING_KEYS = ("aggregation_time", "checkpoint_time", "zkp_export_time", "eval_time")
 
-# Crée le dossier de sortie s'il n'existe pas
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Répertoires (lus à l'appel : surchargeables via utils.paths)
+def _output_dir():
+	return os.path.join(paths.LOGS_DIR, "plots")
 
 def find_latest_log():
 	"""Trouve le fichier de log le plus récent"""
 	try:
-		log_files = glob.glob(os.path.join(LOG_DIR, "server_log_*.csv"))
+		log_files = glob.glob(os.path.join(paths.LOGS_DIR, f"server_log_*{LOG_EXT}"))
+		log_files += glob.glob(os.path.join(paths.LOGS_DIR, "server_log_*.csv"))
 		if not log_files:
 			raise FileNotFoundError("Aucun fichier de log trouvé dans le dossier logs/")
 		log_files.sort(key=os.path.getmtime, reverse=True)
@@ -23,72 +36,135 @@ def find_latest_log():
 		print(f"Erreur lors de la recherche des logs : {e}")
 	return None
 
+def _output_path(log_path):
+	base_name = os.path.splitext(os.path.basename(log_path))[0].replace("server_log_", "metrics_") + ".png"
+	return os.path.join(_output_dir(), base_name)
+
+def _series(records, phase, key):
+	points = sorted((r["round"], r[key]) for r in records if r.get("phase") == phase and key in r)
+	return [p[0] for p in points], [p[1] for p in points]
+
+def render(records, output_path):
+	""" Trace loss / accuracy (train, validation, test serveur) et temps par round ; écrit le PNG atomiquement """
+	import matplotlib
+	matplotlib.use("Agg")
+	import matplotlib.pyplot as plt
+
+	timings = [k for k in TIMING_KEYS if any(k in r for r in records)]
+	plt.style.use('seaborn-v0_8')
+	fig, axes = plt.subplots(3 if timings else 2, 1, figsize=(10, 12 if timings else 8))
+
+	styles = [("TRAIN", 'b-', "Training"), ("EVAL", 'r--', "Validation"), ("SERVER_EVAL", 'g-.', "Test (serveur)")]
+	for ax, key, title in ((axes[0], "loss", "Évolution de la Loss"), (axes[1], "accuracy", "Évolution de l'Accuracy")):
+		for phase, style, label in styles:
+			x, y = _series(records, phase, key)
+			if x:
+				ax.plot(x, y, style, label=f"{label} {key.capitalize()}")
+		ax.set_title(title)
+		ax.set_ylabel(key.capitalize())
+		ax.legend()
+		ax.grid(True)
+
+	if timings:
+		ax3 = axes[2]
+		for key in timings:
+			phase = "SERVER_EVAL" if key == "eval_time" else "TRAIN"
+			x, y = _series(records, phase, key)
+			ax3.plot(x, y, marker='.', label=key)
+		ax3.set_title("Temps par round")
+		ax3.set_xlabel("Round")
+		ax3.set_ylabel("s")
+		ax3.legend()
+		ax3.grid(True)
+
+	os.makedirs(os.path.dirname(output_path), exist_ok=True)
+	tmp = output_path + ".tmp.png"
+	fig.tight_layout()
+	fig.savefig(tmp)
+	plt.close(fig)
+	os.replace(tmp, output_path)
+	return output_path
+
 def plot_metrics(log_path):
 	"""Génère les graphiques à partir du fichier de log"""
 	try:
 		if not os.path.exists(log_path):
 			raise FileNotFoundError(f"Fichier {log_path} introuvable")
-
-		# Lecture du CSV
-		df = pd.read_csv(log_path)
-
-		if 'Phase' not in df.columns:
-			raise ValueError("La colonne 'Phase' est manquante dans le fichier CSV")
-
-		# Filtrer TRAIN et EVAL
-		train_df = df[df['Phase'] == 'TRAIN'].copy()
-		eval_df = df[df['Phase'] == 'EVAL'].copy()
-
-		# Nettoyage des 'N/A'
-		train_df.replace("N/A", pd.NA, inplace=True)
-		eval_df.replace("N/A", pd.NA, inplace=True)
-
-		# Conversion en numérique
-		train_df['Train_Loss'] = pd.to_numeric(train_df['Train_Loss'], errors='coerce')
-		train_df['Train_Accuracy'] = pd.to_numeric(train_df['Train_Accuracy'], errors='coerce')
-		eval_df['Eval_Loss'] = pd.to_numeric(eval_df['Eval_Loss'], errors='coerce')
-		eval_df['Eval_Accuracy'] = pd.to_numeric(eval_df['Eval_Accuracy'], errors='coerce')
-
-		# Tracé
-		plt.style.use('seaborn-v0_8')
-		fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
-
-		ax1.plot(train_df['Round'], train_df['Train_Loss'], 'b-', label="Training Loss")
-		if not eval_df.empty:
-			ax1.plot(eval_df['Round'], eval_df['Eval_Loss'], 'r--', label="Validation Loss")
-		ax1.set_title("Évolution de la Loss")
-		ax1.set_ylabel("Loss")
-		ax1.legend()
-		ax1.grid(True)
-
-		ax2.plot(train_df['Round'], train_df['Train_Accuracy'], 'b-', label="Training Accuracy")
-		if not eval_df.empty:
-			ax2.plot(eval_df['Round'], eval_df['Eval_Accuracy'], 'r--', label="Validation Accuracy")
-		ax2.set_title("Évolution de l'Accuracy")
-		ax2.set_ylabel("Accuracy")
-		ax2.legend()
-		ax2.grid(True)
-
-		# Nom de sortie
-		base_name = os.path.basename(log_path).replace("server_log_", "metrics_").replace(".csv", ".png")
-		output_path = os.path.join(OUTPUT_DIR, base_name)
-
-		plt.tight_layout()
-		plt.savefig(output_path)
+		records, _ = read_metrics(log_path)
+		output_path = render(records, _output_path(log_path))
 		print(f"Graphiques sauvegardés dans {output_path}")
-		plt.show()
-		plt.close()
 		return True
-
 	except Exception as e:
 		print(f"Erreur lors de la génération des graphiques : {e}")
 	return False
 
+def follow(log_path, interval = PLOT_INTERVAL):
+	"""
+	Boucle du processus de tracé : lecture incrémentale du journal, rendu quand de nouvelles lignes
+	sont arrivées, dernier rendu puis sortie à la fermeture de stdin.
+	"""
+	stop = threading.Event()
+
+	def _watch_stdin():
+		try:
+			while sys.stdin.read(4096):
+				pass
+		finally:
+			stop.set()
+	threading.Thread(target=_watch_stdin, name="plot-stdin", daemon=True).start()
+
+	records, offset, drawn = [], 0, 0
+	output_path = _output_path(log_path)
+	while True:
+		final = stop.wait(interval)
+		try:
+			if os.path.exists(log_path):
+				new, offset = read_metrics(log_path, offset)
+				records += new
+			if len(records) > drawn:
+				drawn = len(records)   # un échec n'est retenté qu'avec de nouvelles lignes
+				render(records, output_path)
+		except Exception as e:
+			print(f"[PLOT] Erreur de tracé {log_path} : {e}", file=sys.stderr)
+		if final:
+			return
+
+def start_background_plotter(log_path, interval = PLOT_INTERVAL):
+	"""
+	Processus de tracé détaché pour `log_path` ; retourne le Popen. Fermer son stdin
+	(ou la fin du processus serveur) déclenche le dernier rendu, sans attente côté serveur.
+	"""
+	# chemins du processus parent (dont paths.configure() de simulate.py --root) : le fils relit utils.paths
+	env = dict(os.environ, **paths.environ(), MPLBACKEND="Agg")
+	return subprocess.Popen(
+		[sys.executable, "-m", "utils.plot_metrics", "--follow", log_path, "--interval", str(interval)],
+		cwd=paths.APP_DIR,
+		env=env,
+		stdin=subprocess.PIPE,
+		stdout=subprocess.DEVNULL,
+		start_new_session=True,
+	)
+
+def finish_background_plotter(proc):
+	""" Signale la fin du journal au traceur (dernier rendu en arrière-plan), sans l'attendre """
+	if proc is not None and proc.stdin is not None:
+		try:
+			proc.stdin.close()
+		except OSError:
+			pass
+
 if __name__ == "__main__":
-	latest_log = find_latest_log()
-	if latest_log:
+	parser = argparse.ArgumentParser(description="Graphiques des métriques du serveur")
+	parser.add_argument("log", nargs="?", default=None, help="Journal (défaut: le plus récent)")
+	parser.add_argument("--follow", action="store_true", help="Rendu incrémental jusqu'à la fermeture de stdin")
+	parser.add_argument("--interval", type=float, default=PLOT_INTERVAL)
+	args = parser.parse_args()
+
+	latest_log = args.log or find_latest_log()
+	if args.follow:
+		follow(latest_log, args.interval)
+	elif latest_log:
 		print(f"Traitement du fichier de log : {latest_log}")
 		success = plot_metrics(latest_log)
 		if not success:
 			print("Échec de la génération des graphiques.")
-
@@ -1,30 +1,187 @@
 import subprocess
 import json
-from typing import List
+import os
+import threading
+from typing import List, Optional
 
-def poseidon_hash_array(arr: List[int]) -> int:
-    """
-    Calcule Poseidon(arr) en appelant le script Node.
-    - arr : liste d'entiers (déjà quantifiés si ce sont des poids)
-    - return : int (élément du champ BN254 en base 10)
-    """
+POSEIDON_JS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "zkp", "poseidon_hash.js")
+
+# Workers Node persistants (node zkp/poseidon_hash.js --serve) ; ZKP_POSEIDON_WORKERS=0 pour revenir
+# à un processus node par appel.
+POSEIDON_WORKERS = int(os.environ.get("ZKP_POSEIDON_WORKERS", "1"))
+
+# Conventions de hachage (voir zkp/poseidon_hash.js) ; v1 reste celle des nœuds Merkle
+LEAF_HASH_V1 = "poseidon2-fold-v1"       # acc=1 ; acc = Poseidon([acc, x]) (4096 permutations / chunk)
+LEAF_HASH_V2 = "poseidon16-sponge-v2"    # acc=len ; acc = Poseidon([acc, x0..x14]) (~274 / chunk)
+LEAF_HASHES = (LEAF_HASH_V1, LEAF_HASH_V2)
+
+
+def _check_int_list(arr: List[int], name: str = "arr") -> None:
     if not isinstance(arr, list):
         raise TypeError("poseidon_hash_array attend une liste d'entiers")
     # Sécurité basique : s'assurer que tous les éléments sont des int
     for i, x in enumerate(arr):
         if not isinstance(x, int):
-            raise TypeError(f"arr[{i}] n'est pas un int (reçu: {type(x)})")
+            raise TypeError(f"{name}[{i}] n'est pas un int (reçu: {type(x)})")
+
+
+class PoseidonWorker:
+    """
+    Un processus `node poseidon_hash.js --serve` gardé chaud : Poseidon n'est construit qu'une fois,
+    et chaque lot de tableaux est haché en un aller-retour (une ligne JSON).
+    """
+
+    def __init__(self):
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(
+                ["node", POSEIDON_JS, "--serve"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+            )
+        return self._proc
+
+    def hash_many(self, arrays: List[List[int]], scheme: str = LEAF_HASH_V1) -> List[int]:
+        if not arrays:
+            return []
+        req = arrays if scheme == LEAF_HASH_V1 else {"scheme": scheme, "arrays": arrays}
+        with self._lock:
+            proc = self._ensure_started()
+            try:
+                proc.stdin.write(json.dumps(req) + "\n")
+                proc.stdin.flush()
+                line = proc.stdout.readline()
+            except (BrokenPipeError, OSError) as e:
+                self.close()
+                raise RuntimeError(f"Erreur Poseidon (worker Node): {e}")
+            if not line:
+                err = proc.stderr.read() if proc.poll() is not None else ""
+                self.close()
+                raise RuntimeError(f"Erreur Poseidon (worker Node terminé): {err}")
+        out = json.loads(line)
+        if isinstance(out, dict):
+            raise RuntimeError(f"Erreur Poseidon (worker Node): {out.get('error')}")
+        return [int(x) for x in out]
+
+    def close(self) -> None:
+        if self._proc is not None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=5)
+            except Exception:
+                self._proc.kill()
+            self._proc = None
+
+
+class PoseidonWorkerPool:
+    """
+    Pool de workers Poseidon partagé par tout le processus (rounds, commits, audit...).
+    Les gros lots sont répartis entre workers (chaque worker = un processus node).
+    """
 
+    def __init__(self, n_workers: int = 1):
+        self.workers = [PoseidonWorker() for _ in range(max(1, n_workers))]
+        self._rr = 0
+        self._rr_lock = threading.Lock()
+
+    def _next(self) -> PoseidonWorker:
+        with self._rr_lock:
+            w = self.workers[self._rr % len(self.workers)]
+            self._rr += 1
+        return w
+
+    def hash_many(self, arrays: List[List[int]], scheme: str = LEAF_HASH_V1) -> List[int]:
+        if len(self.workers) == 1 or len(arrays) < 2 * len(self.workers):
+            return self._next().hash_many(arrays, scheme)
+        # découpage en tranches contiguës, une par worker, exécutées en parallèle
+        n = len(self.workers)
+        step = (len(arrays) + n - 1) // n
+        slices = [arrays[i:i + step] for i in range(0, len(arrays), step)]
+        results: List[Optional[List[int]]] = [None] * len(slices)
+        errors: List[Exception] = []
+
+        def _run(i, w, part):
+            try:
+                results[i] = w.hash_many(part, scheme)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=_run, args=(i, self.workers[i], part)) for i, part in enumerate(slices)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0]
+        return [h for part in results for h in part]
+
+    def warm_up(self) -> None:
+        """Démarre tous les workers (construction Poseidon) avant le premier vrai lot."""
+        for w in self.workers:
+            w.hash_many([[0, 0]])
+
+    def close(self) -> None:
+        for w in self.workers:
+            w.close()
+
+
+_POOL: Optional[PoseidonWorkerPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool(n_workers: Optional[int] = None) -> PoseidonWorkerPool:
+    """Pool global (créé à la demande). `n_workers` ne fait qu'agrandir un pool existant."""
+    global _POOL
+    with _POOL_LOCK:
+        wanted = n_workers or max(1, POSEIDON_WORKERS)
+        if _POOL is None:
+            _POOL = PoseidonWorkerPool(wanted)
+        elif wanted > len(_POOL.workers):
+            _POOL.workers.extend(PoseidonWorker() for _ in range(wanted - len(_POOL.workers)))
+        return _POOL
+
+
+def _poseidon_hash_array_cli(arr: List[int], scheme: str = LEAF_HASH_V1) -> int:
     payload = json.dumps(arr)
     try:
         # Appel en passant le JSON en argument (plus simple/robuste que stdin)
         res = subprocess.run(
-            ["node", "zkp/poseidon_hash.js", payload],
+            ["node", POSEIDON_JS, f"--scheme={scheme}", payload],
             check=True,
             capture_output=True,
+            stdin=subprocess.DEVNULL,
             text=True,
         )
         out = res.stdout.strip()
         return int(out)
     except subprocess.CalledProcessError as e:
         raise RuntimeError(f"Erreur Poseidon (Node): {e.stderr or e.stdout}")
+
+
+def poseidon_hash_array(arr: List[int]) -> int:
+    """
+    Calcule Poseidon(arr) via Node (worker persistant si ZKP_POSEIDON_WORKERS>0).
+    - arr : liste d'entiers (déjà quantifiés si ce sont des poids)
+    - return : int (élément du champ BN254 en base 10)
+    """
+    _check_int_list(arr)
+    if POSEIDON_WORKERS <= 0:
+        return _poseidon_hash_array_cli(arr)
+    return get_pool().hash_many([arr])[0]
+
+
+def poseidon_hash_many(arrays: List[List[int]], scheme: str = LEAF_HASH_V1) -> List[int]:
+    """Version par lot de poseidon_hash_array (un aller-retour par worker) ; `scheme` : LEAF_HASHES."""
+    if scheme not in LEAF_HASHES:
+        raise ValueError(f"Convention Poseidon inconnue: {scheme}")
+    for k, arr in enumerate(arrays):
+        _check_int_list(arr, f"arrays[{k}]")
+    if POSEIDON_WORKERS <= 0:
+        return [_poseidon_hash_array_cli(arr, scheme) for arr in arrays]
+    return get_pool().hash_many(arrays, scheme)
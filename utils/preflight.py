@@ -0,0 +1,214 @@
+# utils/preflight.py
+"""
+Contrôle préalable (NumPy) des inputs commités d'un round, avant tout witness ou preuve.
+
+Chaque chunk est vérifié contre les contraintes qu'imposera le circuit avg2_chunk :
+- formes : w1 / w2 / moyenne de longueur `chunk_size`, chemins de longueur `depth` (roots.json) ;
+- bornes : entiers signés avec |x| < 2^61 — les négatifs deviennent p - |x| dans le corps, et
+  w1 + w2 - 2·avg reste loin de p : la relation dans le corps équivaut à la relation entière ;
+- moyenne : r = w1 + w2 - 2·avg ∈ {0, 1} élément par élément ;
+- padding : au-delà de la longueur du modèle (meta.json), le dernier chunk est nul ;
+- Merkle : chunkIndex = k, pathBits = bits de k, frères dans [0, p), frère nul pour une feuille
+  de padding, frères identiques pour tous les chunks d'un même sous-arbre, et racines publiques
+  égales à roots.json.
+Le recalcul des hachages Poseidon reste au circuit (il demanderait node) : ce contrôle coûte
+quelques millisecondes par chunk et écarte un chunk avant qu'un processus node ne démarre.
+"""
+import os
+import json
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils import paths
+from utils.ledger import get_ledger
+
+# ordre du groupe de la courbe BN254 (corps des signaux circom)
+FIELD_P = 21888242871839275222246405745257275088548364400416034343698204186575808495617
+VALUE_BOUND = 1 << 61
+PREFLIGHT = os.environ.get("ZKP_PREFLIGHT", "1") == "1"
+MAX_LISTED = 10   # indices listés par problème
+
+
+def _indices(mask: np.ndarray) -> str:
+    idx = np.flatnonzero(mask)
+    shown = ", ".join(str(int(i)) for i in idx[:MAX_LISTED])
+    return f"[{shown}{', ...' if idx.size > MAX_LISTED else ''}] ({idx.size})"
+
+
+def _int_array(values, name: str, size: int, problems: List[str]) -> Optional[np.ndarray]:
+    """Liste JSON -> int64, ou None (problème noté) si forme, type ou bornes ne conviennent pas."""
+    if values is None:
+        problems.append(f"{name} absent")
+        return None
+    a = np.asarray(values)
+    if a.ndim != 1 or a.size != size:
+        problems.append(f"{name} de forme {a.shape} (attendu ({size},))")
+        return None
+    if a.dtype.kind == "O":
+        # entiers hors int64 (ou types mélangés) : lent, mais seulement sur un chunk déjà fautif
+        bad = np.array([not isinstance(x, int) or abs(x) >= VALUE_BOUND for x in values])
+        problems.append(f"{name} hors bornes |x| < 2^61 aux indices {_indices(bad)}")
+        return None
+    if a.dtype.kind not in "iu":
+        problems.append(f"{name} non entier (dtype {a.dtype})")
+        return None
+    a = a.astype(np.int64, copy=False)
+    out = np.abs(a) >= VALUE_BOUND
+    if out.any():
+        problems.append(f"{name} hors bornes |x| < 2^61 aux indices {_indices(out)}")
+        return None
+    return a
+
+
+def check_average(w1: np.ndarray, w2: np.ndarray, avg: np.ndarray) -> Optional[str]:
+    """Contrainte r = w1 + w2 - 2·avg ∈ {0, 1} ; None si respectée, sinon les indices fautifs."""
+    r = w1 + w2 - 2 * avg
+    bad = (r != 0) & (r != 1)
+    return f"moyenne : w1 + w2 - 2·avg hors {{0,1}} aux indices {_indices(bad)}" if bad.any() else None
+
+
+def check_values(payload: Dict, k: int, chunk: int, length: Optional[int] = None) -> List[str]:
+    """Formes, bornes, relation de moyenne et padding d'un input de chunk."""
+    problems = []
+    avg_key = "w_avg_pub" if "w_avg_pub" in payload else "w_avg"
+    arrays = [_int_array(payload.get(key), key, chunk, problems) for key in ("w1", "w2", avg_key)]
+    if any(a is None for a in arrays):
+        return problems
+    w1, w2, avg = arrays
+    msg = check_average(w1, w2, avg)
+    if msg:
+        problems.append(msg)
+    if length:
+        valid = length - k * chunk
+        if valid <= 0:
+            problems.append(f"chunk au-delà de la longueur du modèle ({length})")
+        elif valid < chunk:
+            pad = (w1[valid:] != 0) | (w2[valid:] != 0) | (avg[valid:] != 0)
+            if pad.any():
+                problems.append(f"padding non nul aux indices {_indices(np.concatenate([np.zeros(valid, bool), pad]))}")
+    return problems
+
+
+def _field_elements(values, name: str, depth: int, problems: List[str]) -> Optional[List[int]]:
+    if values is None or len(values) != depth:
+        problems.append(f"{name} de longueur {None if values is None else len(values)} (attendu {depth})")
+        return None
+    try:
+        out = [int(x) for x in values]
+    except (TypeError, ValueError):
+        problems.append(f"{name} non entier")
+        return None
+    bad = [i for i, x in enumerate(out) if not 0 <= x < FIELD_P]
+    if bad:
+        problems.append(f"{name} hors du corps aux niveaux {bad}")
+        return None
+    return out
+
+
+def check_path(payload: Dict, k: int, depth: int, n_chunks: int, sib_key: str, bits_key: str,
+               problems: List[str]) -> Optional[List[int]]:
+    """Chemin Merkle d'un chunk (sans hachage) ; retourne les frères pour le contrôle inter-chunks."""
+    bits = payload.get(bits_key)
+    expected = [(k >> i) & 1 for i in range(depth)]
+    try:
+        ok = bits is not None and [int(b) for b in bits] == expected
+    except (TypeError, ValueError):
+        ok = False
+    if not ok:
+        problems.append(f"{bits_key} = {bits} (attendu les bits de {k} : {expected})")
+    siblings = _field_elements(payload.get(sib_key), sib_key, depth, problems)
+    if siblings is not None and depth > 0 and (k ^ 1) >= n_chunks and siblings[0] != 0:
+        problems.append(f"{sib_key}[0] non nul pour une feuille voisine de padding")
+    return siblings
+
+
+def check_shared_siblings(paths_by_chunk: Dict[int, List[int]], depth: int, n_chunks: int, name: str,
+                          bad: Dict[int, List[str]]) -> None:
+    """
+    Au niveau i, tous les chunks sous le même nœud (k >> i) ont le même frère ; les frères entièrement
+    dans le padding (même sous-arbre de zéros) sont aussi identiques d'un nœud à l'autre.
+    """
+    for i in range(depth):
+        groups: Dict[object, Dict[int, List[int]]] = {}
+        for k, sib in paths_by_chunk.items():
+            j = (k >> i) ^ 1
+            key = "padding" if (j << i) >= n_chunks else k >> i
+            groups.setdefault(key, {}).setdefault(sib[i], []).append(k)
+        for key, values in groups.items():
+            if len(values) > 1:
+                # la valeur majoritaire fait foi, les autres chunks sont rejetés
+                keep = max(values, key=lambda v: len(values[v]))
+                for v, ks in values.items():
+                    if v != keep:
+                        for k in ks:
+                            bad.setdefault(k, []).append(f"{name}[{i}] incohérent avec les chunks voisins {values[keep][:3]}")
+
+
+def preflight_round(round_name: str, input_files: Sequence[str], publics: Dict[str, int]) -> Dict[int, List[str]]:
+    """
+    Contrôle tous les chunks commités d'un round. Retourne {chunk: [problèmes]} pour les chunks
+    rejetés (vide si tout est conforme) et écrit preflight.json dans le dossier commits du round.
+    """
+    t0 = time.perf_counter()
+    info = get_ledger().get_round(round_name) or {}
+    commits_dir = info.get("commit_dir") or os.path.join(paths.COMMITS_DIR, round_name)
+    with open(os.path.join(commits_dir, "roots.json")) as f:
+        roots = json.load(f)
+    chunk, depth, n_chunks = int(roots["chunk_size"]), int(roots["depth"]), int(roots["n_chunks"])
+
+    length = None
+    meta_path = os.path.join(info.get("zkp_dir") or os.path.join(paths.zkp_dir(), round_name), "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            length = int(json.load(f)["length"])
+
+    bad: Dict[int, List[str]] = {}
+    round_problems = []
+    if len(input_files) != n_chunks:
+        round_problems.append(f"{len(input_files)} inputs pour n_chunks={n_chunks}")
+    for key, value in publics.items():
+        if int(roots.get(key, -1)) != int(value):
+            round_problems.append(f"{key} public différent de roots.json")
+    if (1 << depth) < n_chunks:
+        round_problems.append(f"profondeur {depth} trop faible pour {n_chunks} chunks")
+
+    trees = [("siblings1", "pathBits1"), ("siblings2", "pathBits2")]
+    if "root_avg" in publics:
+        trees.append(("siblingsAvg", "pathBitsAvg"))
+    siblings = {sib_key: {} for sib_key, _ in trees}
+    for k, inp in enumerate(input_files):
+        try:
+            with open(inp) as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            bad[k] = [f"input illisible: {e}"]
+            continue
+        problems = check_values(payload, k, chunk, length)
+        if payload.get("chunkIndex") != k:
+            problems.append(f"chunkIndex = {payload.get('chunkIndex')} (attendu {k})")
+        for sib_key, bits_key in trees:
+            sib = check_path(payload, k, depth, n_chunks, sib_key, bits_key, problems)
+            if sib is not None:
+                siblings[sib_key][k] = sib
+        if problems:
+            bad[k] = problems
+    for sib_key, _ in trees:
+        check_shared_siblings(siblings[sib_key], depth, n_chunks, sib_key, bad)
+
+    if round_problems:
+        # incohérence du round entier : aucun chunk ne peut être prouvé
+        bad = {k: round_problems + bad.get(k, []) for k in range(len(input_files))}
+    elapsed = time.perf_counter() - t0
+    with open(os.path.join(commits_dir, "preflight.json"), "w") as f:
+        json.dump({"n_chunks": len(input_files), "rejected": {str(k): v for k, v in sorted(bad.items())},
+                   "seconds": elapsed}, f, indent=2)
+    get_ledger().record_timing(round_name, "preflight", elapsed)
+    if bad:
+        print(f"[ZKP] Preflight {round_name} : {len(bad)}/{len(input_files)} chunks rejetés ({elapsed * 1e3:.0f} ms)")
+        for k in sorted(bad)[:MAX_LISTED]:
+            print(f"  chunk {k}: {'; '.join(bad[k])}")
+    else:
+        print(f"[ZKP] Preflight {round_name} : {len(input_files)} chunks conformes ({elapsed * 1e3:.0f} ms)")
+    return bad
@@ -0,0 +1,189 @@
+# utils/prove_queue.py
+"""
+Preuve distribuée des chunks d'un round entre tous les pairs (ZKP_DISTRIBUTED=1).
+
+- le serveur met un job par chunk dans le ledger SQLite partagé (table proof_jobs) ;
+- chaque pair client fait tourner un worker d'arrière-plan qui prend les jobs sous bail
+  (ZKP_JOB_LEASE secondes, renouvelé pendant la preuve) : un worker mort libère ses jobs
+  à l'expiration du bail, un autre pair les reprend ;
+- les preuves sont écrites dans le dossier du round (volume partagé) par renommage atomique ;
+- le serveur prouve lui aussi les jobs de son round en attendant, puis vérifie toutes les
+  preuves avec sa vkey et les enregistre dans le ledger.
+Le débit de preuve croît avec le nombre de pairs (un worker snarkjs par pair).
+"""
+import os
+import re
+import time
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from utils import zkp_utils as z
+from utils.ledger import get_ledger, file_digest
+from utils.preflight import PREFLIGHT, preflight_round
+
+JOB_LEASE      = float(os.environ.get("ZKP_JOB_LEASE", "300"))
+JOB_ATTEMPTS   = int(os.environ.get("ZKP_JOB_ATTEMPTS", "3"))
+JOB_POLL       = float(os.environ.get("ZKP_JOB_POLL", "1.0"))
+GATHER_TIMEOUT = float(os.environ.get("ZKP_GATHER_TIMEOUT", "3600"))
+
+
+def worker_id(peer_id: Optional[str] = None) -> str:
+    return f"{peer_id or socket.gethostname()}-{os.getpid()}"
+
+
+@contextmanager
+def _lease_heartbeat(name: str, chunk: int, worker: str, lease: float):
+    """Renouvelle le bail toutes les lease/3 secondes tant que le chunk est en cours de preuve."""
+    stop = threading.Event()
+
+    def _beat():
+        while not stop.wait(lease / 3.0):
+            if not get_ledger().renew_proof_lease(name, chunk, worker, lease):
+                return
+
+    t = threading.Thread(target=_beat, name=f"lease-{name}-{chunk}", daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        t.join()
+
+
+def run_job(job: Dict, worker: str, lease: float = JOB_LEASE) -> None:
+    """Prouve le chunk d'un job (circuit déjà construit par le serveur sur le cache partagé)."""
+    files = z.circuit_files(z.CIRCUIT_DIR, backend=job["backend"])
+    missing = [files[key] for key in ("wasm", "zkey") if not os.path.exists(files[key])]
+    if missing:
+        raise RuntimeError(f"[ZKP] Circuit absent sur ce pair: {missing}")
+    input_files, publics = z.round_circuit_inputs(job["round"])
+    k = int(job["chunk"])
+    with _lease_heartbeat(job["round"], k, worker, lease):
+        z.prove_chunk(job["zkp_dir"], k, input_files[k], publics, files, job["backend"],
+                      tag=re.sub(r"[^A-Za-z0-9_-]", "_", worker))
+
+
+def work_once(worker: str, name: Optional[str] = None, lease: float = JOB_LEASE) -> Optional[bool]:
+    """Prend et exécute un job (du round `name` si fourni). None si la file est vide."""
+    ledger = get_ledger()
+    job = ledger.claim_proof_job(worker, lease, name=name, max_attempts=JOB_ATTEMPTS)
+    if job is None:
+        return None
+    t0 = time.perf_counter()
+    try:
+        run_job(job, worker, lease)
+    except Exception as e:
+        print(f"[ZKP] {worker} : échec {job['round']} chunk {job['chunk']} (essai {job['attempts']}): {e}")
+        ledger.finish_proof_job(job["round"], job["chunk"], worker, ok=False, error=str(e)[:500],
+                                max_attempts=JOB_ATTEMPTS)
+        return False
+    ledger.finish_proof_job(job["round"], job["chunk"], worker, ok=True, seconds=time.perf_counter() - t0)
+    return True
+
+
+def run_worker(worker: str, stop: Optional[threading.Event] = None, poll: float = JOB_POLL) -> int:
+    """Boucle d'un pair : prend les jobs de tous les rounds jusqu'à `stop`. Retourne le nombre de chunks prouvés."""
+    stop = stop or threading.Event()
+    proved = 0
+    while not stop.is_set():
+        try:
+            r = work_once(worker)
+        except Exception as e:
+            print(f"[ZKP] {worker} : file de preuves indisponible: {e}")
+            r = None
+        if r is None:
+            stop.wait(poll)
+        elif r:
+            proved += 1
+    return proved
+
+
+_BACKGROUND: Optional[threading.Thread] = None
+_BACKGROUND_LOCK = threading.Lock()
+
+
+def start_background_worker(peer_id: Optional[str] = None) -> threading.Thread:
+    """Worker d'arrière-plan unique par processus (pairs clients et pairs longue durée)."""
+    global _BACKGROUND
+    with _BACKGROUND_LOCK:
+        if _BACKGROUND is None or not _BACKGROUND.is_alive():
+            wid = worker_id(peer_id)
+            _BACKGROUND = threading.Thread(target=run_worker, args=(wid,), name=f"prove-worker-{wid}", daemon=True)
+            _BACKGROUND.start()
+            print(f"[ZKP] Worker de preuve {wid} démarré (file partagée)")
+        return _BACKGROUND
+
+
+# -------------------------------
+# Côté serveur : mise en file, participation, collecte + vérification
+# -------------------------------
+def enqueue_round(round_dir: str, circuit_dir: str = z.CIRCUIT_DIR, ptau_path: str = z.PTAU_PATH,
+                  backend: str = z.BACKEND) -> int:
+    """
+    Contrôle les inputs (preflight), construit le circuit (cache partagé) puis met un job par chunk ;
+    les chunks rejetés sont inscrits directement en échec. Retourne le nombre de jobs à prouver.
+    """
+    name = os.path.basename(os.path.normpath(round_dir))
+    input_files, publics = z.round_circuit_inputs(name)
+    rejected = preflight_round(name, input_files, publics) if PREFLIGHT else {}
+    z._ensure_circuit_built(circuit_dir, ptau_path, backend=backend)
+    get_ledger().enqueue_proof_jobs(
+        name, len(input_files), backend,
+        rejected={k: "preflight: " + "; ".join(v) for k, v in rejected.items()},
+    )
+    return len(input_files) - len(rejected)
+
+
+def gather_round(round_dir: str, circuit_dir: str = z.CIRCUIT_DIR, backend: str = z.BACKEND,
+                 worker: Optional[str] = None, timeout: float = GATHER_TIMEOUT) -> int:
+    """
+    Prouve les jobs restants du round en attendant les autres pairs, puis vérifie chaque preuve
+    rendue et l'enregistre dans le ledger. Retourne le nombre de chunks vérifiés.
+    """
+    name = os.path.basename(os.path.normpath(round_dir))
+    worker = worker or worker_id()
+    ledger = get_ledger()
+    deadline = time.time() + timeout
+    while True:
+        if work_once(worker, name=name) is not None:
+            continue
+        counts = ledger.proof_job_counts(name)
+        if not counts.get("queued") and not counts.get("leased"):
+            break
+        if time.time() > deadline:
+            print(f"[ZKP] {name} : délai de collecte dépassé ({counts})")
+            break
+        time.sleep(JOB_POLL)
+
+    vkey = z.circuit_files(circuit_dir, backend=backend)["vkey"]
+    verified, by_worker = 0, {}
+    for job in ledger.proof_jobs(name):
+        if job["status"] != "done":
+            continue
+        k = job["chunk"]
+        proof = os.path.join(round_dir, f"proof_{k}.json")
+        publ = os.path.join(round_dir, f"public_{k}.json")
+        try:
+            z._verify(vkey, publ, proof, backend)
+        except Exception as e:
+            print(f"[ZKP] {name} chunk {k} (worker {job['worker']}) rejeté: {e}")
+            continue
+        ledger.add_artifacts(name, [
+            ("proof", k, proof, file_digest(proof)),
+            ("public", k, publ, file_digest(publ)),
+        ])
+        by_worker[job["worker"]] = by_worker.get(job["worker"], 0) + 1
+        verified += 1
+    failed = {job["chunk"]: job["error"] for job in ledger.proof_jobs(name) if job["status"] == "failed"}
+    if failed:
+        print(f"[ZKP] {name} : {len(failed)} chunks en échec {failed}")
+    print(f"[ZKP] {name} : chunks prouvés par worker {by_worker}")
+    return verified
+
+
+def prove_round_distributed(round_dir: str, circuit_dir: str = z.CIRCUIT_DIR, ptau_path: str = z.PTAU_PATH,
+                            backend: str = z.BACKEND) -> int:
+    enqueue_round(round_dir, circuit_dir, ptau_path, backend)
+    return gather_round(round_dir, circuit_dir, backend)
@@ -0,0 +1,122 @@
+# utils/readiness.py
+"""
+Signal de disponibilité entre pairs (remplace l'attente par sondage du serveur).
+
+Chaque pair longue durée écoute sur `control_port`. Les messages sont une ligne JSON :
+  {"event": "elected", "session": n, "server": "<peer_id>"}   (envoyé par l'ancien serveur)
+  {"event": "ready",   "session": n, "server": "<peer_id>", "port": p}  (serveur Flower à l'écoute)
+Les clients bloquent sur la réception du message (pas de boucle de sondage côté client).
+"""
+import json
+import queue
+import socket
+import threading
+import time
+import logging
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessListener:
+    """Écoute TCP en arrière-plan ; chaque message reçu est placé dans une file."""
+
+    def __init__(self, port: int, host: str = "0.0.0.0"):
+        self.port = int(port)
+        self.host = host
+        self._queue: "queue.Queue[Dict]" = queue.Queue()
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ReadinessListener":
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self._sock.listen(16)
+        self._thread = threading.Thread(target=self._serve, name="readiness-listener", daemon=True)
+        self._thread.start()
+        return self
+
+    def _serve(self) -> None:
+        while self._sock is not None:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    data = conn.makefile("r").readline()
+                    if data.strip():
+                        self._queue.put(json.loads(data))
+                        conn.sendall(b"ok\n")
+                except (OSError, ValueError) as e:
+                    logger.warning(f"[Readiness] Message invalide: {e}")
+
+    def wait(self, min_session: int = 0, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        Bloque jusqu'au prochain message de session >= min_session (les messages périmés sont ignorés).
+        Retourne None si `timeout` expire.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                msg = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if int(msg.get("session", 0)) >= min_session:
+                return msg
+
+    def close(self) -> None:
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+
+def _send(host: str, port: int, message: Dict, timeout: float) -> bool:
+    """Envoie un message à un pair, en réessayant tant que son écoute n'est pas ouverte."""
+    deadline = time.time() + timeout
+    delay = 0.2
+    payload = (json.dumps(message) + "\n").encode()
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=5) as s:
+                s.sendall(payload)
+                s.makefile("r").readline()
+                return True
+        except OSError:
+            if time.time() >= deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+
+def announce(peers: Iterable[str], port: int, message: Dict, timeout: float = 120.0) -> Dict[str, bool]:
+    """Diffuse `message` à tous les `peers` en parallèle ; retourne {peer: livré}."""
+    peers = list(peers)
+    results: Dict[str, bool] = {}
+
+    def _one(peer):
+        results[peer] = _send(peer, port, message, timeout)
+
+    threads = [threading.Thread(target=_one, args=(p,), daemon=True) for p in peers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    missed = [p for p, ok in results.items() if not ok]
+    if missed:
+        logger.warning(f"[Readiness] '{message.get('event')}' non livré à: {', '.join(missed)}")
+    return results
+
+
+def wait_until_listening(host: str, port: int, timeout: float = 60.0) -> bool:
+    """Côté serveur : attend que le port Flower local accepte les connexions."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
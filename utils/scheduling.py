@@ -0,0 +1,100 @@
+# utils/scheduling.py
+"""
+Ordonnancement des clients selon leur débit mesuré (fit metrics), pour MyCustomFedAvg et FedBuff.
+
+- par client : débit (samples_per_sec, moyenne glissante), taille du train (num_examples), batch_size ;
+- échéance du round : fixée (`deadline`) ou quantile des durées estimées du travail complet
+  (epochs × num_examples / débit) augmenté de la marge, plafonnée par `round_timeout` ;
+  pas d'échéance tant qu'aucun débit n'est connu (premier round = calibration) ;
+- budget par client : pas SGD tenant dans (1 - margin) × échéance, borné par le travail complet ;
+- sélection : un client incapable de faire `min_steps` avant l'échéance est écarté (s'il en reste assez) ;
+- un client absent à l'échéance (résultat abandonné) voit son débit estimé divisé par deux.
+"""
+import math
+from typing import Dict, List, Optional, Sequence
+
+
+class ThroughputScheduler:
+    def __init__(self, epochs=3, deadline=None, deadline_quantile=0.9, margin=0.2, min_steps=10,
+                 round_timeout=None, ema=0.5):
+        if not 0.0 < float(deadline_quantile) <= 1.0:
+            raise ValueError("[SCHED] deadline_quantile doit être dans ]0, 1]")
+        if not 0.0 <= float(margin) < 1.0:
+            raise ValueError("[SCHED] margin doit être dans [0, 1[")
+        self.epochs = int(epochs)
+        self.fixed_deadline = float(deadline) if deadline else None
+        self.quantile = float(deadline_quantile)
+        self.margin = float(margin)
+        self.min_steps = max(1, int(min_steps))
+        self.round_timeout = float(round_timeout) if round_timeout else None
+        self.ema = float(ema)
+        self.stats: Dict[str, Dict] = {}                  # cid -> {"sps", "n", "batch", "client_id", "missed"}
+        self._deadlines: Dict[int, Optional[float]] = {}  # round -> échéance figée au premier appel
+
+    # ---------------------------------------------------------------
+    # Mesures
+    # ---------------------------------------------------------------
+    def observe(self, cid: str, metrics: Dict, num_examples: int) -> None:
+        sps = metrics.get("samples_per_sec")
+        if not isinstance(sps, (int, float)) or sps <= 0:
+            return
+        s = self.stats.get(cid)
+        if s is None:
+            s = self.stats[cid] = {"sps": float(sps), "missed": 0}
+        else:
+            s["sps"] = self.ema * float(sps) + (1.0 - self.ema) * s["sps"]
+        s["n"] = int(num_examples)
+        s["batch"] = int(metrics.get("batch_size") or s.get("batch") or 32)
+        s["client_id"] = metrics.get("client_id", cid)
+
+    def missed(self, cid: str) -> None:
+        s = self.stats.get(cid)
+        if s is not None:
+            s["sps"] /= 2.0
+            s["missed"] += 1
+
+    def full_time(self, cid: str) -> float:
+        s = self.stats[cid]
+        return self.epochs * s["n"] / s["sps"]
+
+    def min_time(self, cid: str) -> float:
+        s = self.stats[cid]
+        return self.min_steps * s["batch"] / s["sps"]
+
+    # ---------------------------------------------------------------
+    # Échéance, sélection, budgets
+    # ---------------------------------------------------------------
+    def deadline(self, server_round: int) -> Optional[float]:
+        """Échéance (s) du round, calculée une fois à partir des débits connus ; None = pas d'échéance."""
+        if server_round not in self._deadlines:
+            d = self.fixed_deadline
+            if d is None and self.stats:
+                times = sorted(self.full_time(c) for c in self.stats)
+                d = times[max(0, math.ceil(self.quantile * len(times)) - 1)] / (1.0 - self.margin)
+            if self.round_timeout is not None:
+                d = min(d, self.round_timeout) if d is not None else self.round_timeout
+            self._deadlines[server_round] = d
+        return self._deadlines[server_round]
+
+    def select(self, cids: Sequence[str], deadline: Optional[float], min_clients: int) -> List[str]:
+        """Clients du round : ceux qui tiennent `min_steps` avant l'échéance, complétés par les plus rapides."""
+        if deadline is None:
+            return list(cids)
+        fits = [c for c in cids if c not in self.stats or self.min_time(c) <= deadline]
+        if len(fits) >= min_clients:
+            return fits
+        ranked = sorted(cids, key=lambda c: self.min_time(c) if c in self.stats else 0.0)
+        return ranked[:max(min_clients, len(fits))]
+
+    def budget(self, cid: str, deadline: Optional[float]) -> Dict[str, int]:
+        """Config de travail local : {"epochs"} (travail complet) ou {"epochs", "max_steps"} sous échéance."""
+        s = self.stats.get(cid)
+        if s is None or deadline is None:
+            return {"epochs": self.epochs}
+        steps_per_epoch = max(1, math.ceil(s["n"] / s["batch"]))
+        full = self.epochs * steps_per_epoch
+        fit = int(s["sps"] * deadline * (1.0 - self.margin) / s["batch"])
+        steps = max(self.min_steps, min(full, fit))
+        if steps >= full:
+            return {"epochs": self.epochs}
+        return {"epochs": math.ceil(steps / steps_per_epoch), "max_steps": steps}
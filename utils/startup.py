@@ -0,0 +1,157 @@
+# utils/startup.py
+"""
+Profil de démarrage d'un pair (main.py --profile-startup) :
+- temps d'import par module (temps propre et cumulé, agrégé par paquet de premier niveau) ;
+- temps des phases d'initialisation (config, état, construction du pair...) ;
+- contrôle d'un budget de démarrage (--startup-budget).
+
+Le profileur d'imports s'insère en tête de sys.meta_path et chronomètre exec_module
+des loaders trouvés par les autres finders ; il n'est installé qu'en mode profil.
+"""
+import sys
+import time
+import threading
+import importlib.abc
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+class _TimedLoader:
+    """Loader délégué : chronomètre l'exécution du module (temps propre = cumulé - sous-imports)."""
+
+    def __init__(self, loader, profiler: "StartupProfiler", name: str):
+        self._loader = loader
+        self._profiler = profiler
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = self._profiler._stack()
+        stack.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - t0
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            self._profiler._record(self._name, total, total - children)
+
+
+class StartupProfiler(importlib.abc.MetaPathFinder):
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.modules: Dict[str, Tuple[float, float]] = {}   # module -> (cumulé, propre)
+        self.phases: List[Tuple[str, float]] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------------
+    # Hook d'import
+    # ---------------------------------------------------------------
+    def _stack(self) -> List[float]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _record(self, name: str, total: float, own: float) -> None:
+        with self._lock:
+            self.modules[name] = (total, own)
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+        spec.loader = _TimedLoader(spec.loader, self, fullname)
+        return spec
+
+    def install(self) -> "StartupProfiler":
+        sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    # ---------------------------------------------------------------
+    # Phases et rapport
+    # ---------------------------------------------------------------
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - t0))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def by_package(self) -> Dict[str, float]:
+        """Temps propre agrégé par paquet de premier niveau (torch, flwr, pandas...)."""
+        out: Dict[str, float] = {}
+        for name, (_, own) in self.modules.items():
+            top = name.split(".")[0]
+            out[top] = out.get(top, 0.0) + own
+        return out
+
+    def report(self, top: int = 15) -> str:
+        lines = [f"[Startup] total {self.elapsed():.2f}s, {len(self.modules)} modules importés"]
+        lines.append("[Startup] phases :")
+        for name, dt in self.phases:
+            lines.append(f"    {name:<28} {dt * 1000:9.1f} ms")
+        lines.append("[Startup] imports par paquet (temps propre) :")
+        for name, dt in sorted(self.by_package().items(), key=lambda kv: -kv[1])[:top]:
+            lines.append(f"    {name:<28} {dt * 1000:9.1f} ms")
+        lines.append("[Startup] modules les plus coûteux (propre / cumulé) :")
+        for name, (total, own) in sorted(self.modules.items(), key=lambda kv: -kv[1][1])[:top]:
+            lines.append(f"    {name:<40} {own * 1000:9.1f} ms / {total * 1000:9.1f} ms")
+        return "\n".join(lines)
+
+
+class _NullProfiler:
+    """Sans --profile-startup : phases sans coût, pas de hook d'import."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        yield
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+
+def make_profiler(enabled: bool):
+    return StartupProfiler().install() if enabled else _NullProfiler()
+
+
+def check_budget(profiler, budget: Optional[float], label: str = "démarrage") -> bool:
+    """True si le démarrage tient dans `budget` secondes (toujours vrai sans budget)."""
+    if budget is None:
+        return True
+    elapsed = profiler.elapsed()
+    ok = elapsed <= budget
+    status = "OK" if ok else "DÉPASSÉ"
+    print(f"[Startup] budget {label} {status} : {elapsed:.2f}s / {budget:.2f}s")
+    return ok
@@ -0,0 +1,129 @@
+# utils/update_codec.py
+"""
+Codec des mises à jour client -> serveur.
+
+Modes (clé "codec" dans la config de fit, reprise dans les fit metrics) :
+- none  : poids complets float32 (comportement historique)
+- delta : delta float32 par rapport au modèle global reçu
+- fp16  : delta en float16
+- int8  : delta quantifié int8 (arrondi stochastique, une échelle par tenseur)
+- topk  : delta creux (indices int32 + valeurs float32), k = ratio * taille
+
+Les modes avec perte utilisent une rétroaction d'erreur (error feedback) :
+le résidu non transmis est conservé côté client et ajouté au delta suivant.
+Le serveur reconstruit `global + delta_décodé` en float32 ; le client peut
+calculer exactement la même reconstruction via decode_update().
+"""
+from __future__ import annotations
+import math
+from typing import List, Optional, Tuple
+import numpy as np
+
+CODECS = ("none", "delta", "fp16", "int8", "topk")
+LOSSY_CODECS = ("fp16", "int8", "topk")
+DEFAULT_TOPK_RATIO = 0.01
+
+
+def payload_nbytes(arrays: List[np.ndarray]) -> int:
+    """Taille brute (octets) d'une liste de tenseurs."""
+    return int(sum(a.nbytes for a in arrays))
+
+
+def _check_codec(codec: str) -> None:
+    if codec not in CODECS:
+        raise ValueError(f"[CODEC] Codec inconnu: {codec} (attendu: {', '.join(CODECS)})")
+
+
+def _encode_tensor(d: np.ndarray, codec: str, topk_ratio: float, rng: np.random.Generator) -> List[np.ndarray]:
+    if codec == "delta":
+        return [d.astype(np.float32)]
+    if codec == "fp16":
+        return [d.astype(np.float16)]
+    if codec == "int8":
+        amax = float(np.max(np.abs(d))) if d.size else 0.0
+        scale = amax / 127.0 if amax > 0 else 1.0
+        # arrondi stochastique : E[q] = d / scale
+        q = np.floor(d / scale + rng.random(d.shape, dtype=np.float32))
+        q = np.clip(q, -127, 127).astype(np.int8)
+        return [q, np.array([scale], dtype=np.float32)]
+    if codec == "topk":
+        flat = d.ravel()
+        k = max(1, int(math.ceil(topk_ratio * flat.size))) if flat.size else 0
+        if k >= flat.size:
+            idx = np.arange(flat.size, dtype=np.int32)
+        else:
+            idx = np.argpartition(np.abs(flat), -k)[-k:].astype(np.int32)
+            idx.sort()
+        return [idx, flat[idx].astype(np.float32)]
+    raise ValueError(f"[CODEC] Codec inconnu: {codec}")
+
+
+def _decode_tensor(parts: List[np.ndarray], codec: str, shape: Tuple[int, ...]) -> np.ndarray:
+    if codec in ("delta", "fp16"):
+        return parts[0].astype(np.float32).reshape(shape)
+    if codec == "int8":
+        return (parts[0].astype(np.float32) * np.float32(parts[1][0])).reshape(shape)
+    if codec == "topk":
+        out = np.zeros(int(np.prod(shape)), dtype=np.float32)
+        out[parts[0]] = parts[1]
+        return out.reshape(shape)
+    raise ValueError(f"[CODEC] Codec inconnu: {codec}")
+
+
+def _parts_per_tensor(codec: str) -> int:
+    return 2 if codec in ("int8", "topk") else 1
+
+
+def encode_update(
+    weights: List[np.ndarray],
+    base: List[np.ndarray],
+    codec: str,
+    residual: Optional[List[np.ndarray]] = None,
+    topk_ratio: float = DEFAULT_TOPK_RATIO,
+    rng: Optional[np.random.Generator] = None,
+) -> Tuple[List[np.ndarray], Optional[List[np.ndarray]]]:
+    """
+    Encode `weights` par rapport à `base` (modèle global reçu).
+    Retourne (payload, nouveau_résidu). Le résidu vaut None pour les modes sans perte.
+    """
+    _check_codec(codec)
+    if codec == "none":
+        return [np.asarray(w, dtype=np.float32) for w in weights], None
+    if len(weights) != len(base):
+        raise ValueError(f"[CODEC] Nombre de tenseurs incohérent: {len(weights)} vs {len(base)}")
+
+    rng = rng or np.random.default_rng()
+    payload: List[np.ndarray] = []
+    new_residual: List[np.ndarray] = []
+    for i, (w, b) in enumerate(zip(weights, base)):
+        d = np.asarray(w, dtype=np.float32) - np.asarray(b, dtype=np.float32)
+        if codec in LOSSY_CODECS and residual is not None:
+            d = d + residual[i]
+        parts = _encode_tensor(d, codec, topk_ratio, rng)
+        payload.extend(parts)
+        if codec in LOSSY_CODECS:
+            new_residual.append(d - _decode_tensor(parts, codec, d.shape))
+
+    return payload, (new_residual if codec in LOSSY_CODECS else None)
+
+
+def decode_update(payload: List[np.ndarray], base: List[np.ndarray], codec: str) -> List[np.ndarray]:
+    """
+    Reconstruit les poids float32 vus par le serveur : base + delta décodé.
+    Pour "none", le payload contient déjà les poids complets.
+    """
+    _check_codec(codec)
+    if codec == "none":
+        return [np.asarray(p, dtype=np.float32) for p in payload]
+
+    step = _parts_per_tensor(codec)
+    if len(payload) != step * len(base):
+        raise ValueError(
+            f"[CODEC] Payload {codec} incohérent: {len(payload)} tenseurs pour {len(base)} couches"
+        )
+    out = []
+    for i, b in enumerate(base):
+        b = np.asarray(b, dtype=np.float32)
+        d = _decode_tensor(payload[i * step:(i + 1) * step], codec, b.shape)
+        out.append(b + d)
+    return out
@@ -1,12 +1,20 @@
 # utils/zkp_utils.py
 import os
 import json
-import math
-import glob
 import shlex
+import shutil
 import subprocess
-from typing import Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from utils import paths
 from utils.commit_integration import integrate_commitments_for_round
+from utils.commitment import PUBLIC_MODE, PUBLIC_MODES, LEAF_HASH
+from utils.chunk_stream import flat_size, iter_quantized_chunks, load_round_weights
+from utils.poseidon_wrapper import LEAF_HASH_V1, LEAF_HASHES
+from utils.ledger import get_ledger, file_digest
+from utils.poseidon_wrapper import get_pool
+from utils.preflight import PREFLIGHT, preflight_round
 
 # -------------------------------
 # Paramètres via variables d'environnement (avec valeurs par défaut)
@@ -18,6 +26,19 @@ PTAU_PATH     = os.environ.get("ZKP_PTAU", "/app/shared/zkp/ptau/powersOfTau28_h
 AUTOPROVE     = os.environ.get("ZKP_AUTOPROVE", "0") == "1"
 PTAU_GEN      = os.environ.get("ZKP_PTAU_GEN", "0") == "1"
 PTAU_POWER    = int(os.environ.get("ZKP_PTAU_POWER", "20"))  
+PROVER_WORKER = os.environ.get("ZKP_PROVER_WORKER", "1") == "1"   # snarkjs gardé chaud (zkp/prover_worker.js)
+# groth16 : setup propre au circuit (phase 2) ; plonk / fflonk : seul le ptau universel est nécessaire
+# (mais un ptau plus grand : plonk ~ contraintes + additions, fflonk encore davantage)
+BACKENDS      = ("groth16", "plonk", "fflonk")
+BACKEND       = os.environ.get("ZKP_BACKEND", "groth16")
+# Preuve distribuée : chunks en file dans le ledger partagé, pris par tous les pairs (utils/prove_queue.py)
+DISTRIBUTED   = os.environ.get("ZKP_DISTRIBUTED", "0") == "1"
+# Witness natif C++ (circom --c + make), opt-in tant qu'il n'est pas validé contre le wasm sur le circuit
+# déployé (tools/bench_witness.py) : "0" (défaut) = toujours le calculateur wasm, "auto" = utilisé s'il est
+# déjà compilé, "1" = compilé au besoin par _ensure_circuit_built
+NATIVE_WITNESS = os.environ.get("ZKP_NATIVE_WITNESS", "0")
+
+PROVER_JS = os.path.join(paths.APP_DIR, "zkp", "prover_worker.js")
 
 
 # -------------------------------
@@ -42,6 +63,69 @@ def _run(cmd: str, cwd: Optional[str] = None, stdin: Optional[str] = None) -> No
     )
 
 
+# -------------------------------
+# Worker snarkjs persistant
+# -------------------------------
+class ProverWorker:
+    """
+    Processus `node zkp/prover_worker.js` gardé chaud : snarkjs, la zkey, le wasm et la vkey
+    restent chargés entre chunks, rounds et sessions (au lieu d'un `snarkjs` CLI par étape).
+    """
+
+    def __init__(self):
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(
+                ["node", PROVER_JS],
+                cwd=paths.APP_DIR,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+            )
+        return self._proc
+
+    def call(self, **req) -> Dict:
+        with self._lock:
+            proc = self._ensure_started()
+            try:
+                proc.stdin.write(json.dumps(req) + "\n")
+                proc.stdin.flush()
+                line = proc.stdout.readline()
+            except (BrokenPipeError, OSError) as e:
+                self.close()
+                raise RuntimeError(f"[ZKP] Worker snarkjs indisponible: {e}")
+        if not line:
+            self.close()
+            raise RuntimeError(f"[ZKP] Worker snarkjs terminé pendant '{req.get('cmd')}'")
+        out = json.loads(line)
+        if not out.get("ok"):
+            raise RuntimeError(f"[ZKP] {req.get('cmd')} a échoué: {out.get('error')}")
+        return out
+
+    def close(self) -> None:
+        if self._proc is not None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=10)
+            except Exception:
+                self._proc.kill()
+            self._proc = None
+
+
+_PROVER: Optional[ProverWorker] = None
+
+
+def get_prover_worker() -> ProverWorker:
+    global _PROVER
+    if _PROVER is None:
+        _PROVER = ProverWorker()
+    return _PROVER
+
+
 # -------------------------------
 # Ptau
 # -------------------------------
@@ -80,55 +164,35 @@ def _ensure_ptau(ptau_path: str = PTAU_PATH, power: int = PTAU_POWER) -> None:
 
 
 # -------------------------------
-# Export des inputs par chunk (à partir de clients.json/avg.json)
+# Export des inputs par chunk (en flux, à partir des poids du round)
 # -------------------------------
 def export_inputs_for_round(
     round_dir: str,
     scale: int = DEFAULT_SCALE,
     chunk: int = DEFAULT_CHUNK,
+    weights=None,
 ) -> int:
     """
-    Lit clients.json et avg.json dans round_dir, et produit inputs/input_chunk_*.json avec padding.
+    Produit inputs/input_chunk_*.json (padding à droite) à partir des poids du round, en flux :
+    un chunk quantifié à la fois, jamais de liste complète du modèle en mémoire.
+    `weights` = (w1, w2, avg) : tenseurs / vues du serveur ; sinon relus depuis le round
+    (memmaps .npy, ou clients.json/avg.json de l'ancien format).
     Retourne le nombre de chunks générés.
     """
-    clients_path = os.path.join(round_dir, "clients.json")
-    avg_path     = os.path.join(round_dir, "avg.json")
-    if not (os.path.exists(clients_path) and os.path.exists(avg_path)):
-        raise RuntimeError(f"Manque clients.json/avg.json dans {round_dir}")
-
-    with open(clients_path) as f:
-        clients = json.load(f)["clients"]
-    with open(avg_path) as f:
-        avg = json.load(f)["avg"]
-
-    if len(clients) != 2:
-        raise RuntimeError(f"[ZKP] Attendu 2 clients, trouvé {len(clients)}")
-
-    w1 = clients[0]["flat_weights"]
-    w2 = clients[1]["flat_weights"]
-    if not (len(w1) == len(w2) == len(avg)):
+    w1, w2, avg = weights if weights is not None else load_round_weights(round_dir)
+    L = flat_size(w1)
+    if not (L == flat_size(w2) == flat_size(avg)):
         raise RuntimeError("[ZKP] Tailles incohérentes (w1/w2/avg)")
 
-    # Quantification + moyenne publique (floor via //2)
-    W1 = [_q(v, scale) for v in w1]
-    W2 = [_q(v, scale) for v in w2]
-    AVG_pub = [(a + b) // 2 for a, b in zip(W1, W2)]
-
     inputs_dir = os.path.join(round_dir, "inputs")
     os.makedirs(inputs_dir, exist_ok=True)
 
-    L = len(W1)
-    n_chunks = math.ceil(L / chunk)
-    for k in range(n_chunks):
-        a, b = k * chunk, min((k + 1) * chunk, L)
-        pad = chunk - (b - a)
-        payload = {
-            "w1":        W1[a:b] + [0] * pad,
-            "w2":        W2[a:b] + [0] * pad,
-            "w_avg_pub": AVG_pub[a:b] + [0] * pad,
-        }
+    # Quantification + moyenne publique (floor via //2), chunk par chunk
+    n_chunks = 0
+    for k, W1, W2, AVG_pub in iter_quantized_chunks(w1, w2, scale, chunk):
         with open(os.path.join(inputs_dir, f"input_chunk_{k}.json"), "w") as f:
-            json.dump(payload, f)
+            json.dump({"w1": W1, "w2": W2, "w_avg_pub": AVG_pub}, f)
+        n_chunks = k + 1
 
     # Meta utile au debug
     with open(os.path.join(round_dir, "meta.json"), "w") as f:
@@ -144,19 +208,64 @@ def export_inputs_for_round(
 # -------------------------------
 # Build circuit + setup Groth16 si besoin
 # -------------------------------
+_BUILT = set()   # (circuit_dir, ptau_path, mode) déjà vérifiés dans ce processus
+
+
+def circuit_files(
+    circuit_dir: str = CIRCUIT_DIR,
+    mode: str = PUBLIC_MODE,
+    backend: str = BACKEND,
+    leaf_hash: str = LEAF_HASH,
+) -> Dict[str, str]:
+    """
+    Chemins des artefacts du circuit pour un mode de publics, un backend et une convention de feuilles :
+    "full" -> avg2_chunk (w_avg_pub publics), "root" -> avg2_chunk_root (4 publics),
+    suffixe _v2 pour les feuilles poseidon16-sponge-v2.
+    wasm/r1cs sont communs aux backends ; zkey et vkey sont propres à chacun
+    (noms groth16 inchangés pour réutiliser les clés existantes).
+    """
+    if mode not in PUBLIC_MODES:
+        raise ValueError(f"[ZKP] ZKP_PUBLIC_MODE inconnu: {mode}")
+    if backend not in BACKENDS:
+        raise ValueError(f"[ZKP] ZKP_BACKEND inconnu: {backend} (attendu: {', '.join(BACKENDS)})")
+    if leaf_hash not in LEAF_HASHES:
+        raise ValueError(f"[ZKP] ZKP_LEAF_HASH inconnu: {leaf_hash}")
+    name = "avg2_chunk" if mode == "full" else "avg2_chunk_root"
+    suffix = "" if mode == "full" else "_root"
+    if leaf_hash != LEAF_HASH_V1:
+        name += "_v2"
+        suffix += "_v2"
+    key = "final" if backend == "groth16" else backend
+    if backend != "groth16":
+        suffix += f"_{backend}"
+    return {
+        "circom": os.path.join(circuit_dir, f"{name}.circom"),
+        "r1cs":   os.path.join(circuit_dir, f"{name}.r1cs"),
+        "wasm":   os.path.join(circuit_dir, f"{name}_js", f"{name}.wasm"),
+        "genw":   os.path.join(circuit_dir, f"{name}_js", "generate_witness.js"),
+        "cpp":    os.path.join(circuit_dir, f"{name}_cpp"),
+        "native": os.path.join(circuit_dir, f"{name}_cpp", name),
+        "zkey":   os.path.join(circuit_dir, f"{name}_{key}.zkey"),
+        "vkey":   os.path.join(circuit_dir, f"verification_key{suffix}.json"),
+    }
+
+
 def _ensure_circuit_built(
     circuit_dir: str = CIRCUIT_DIR,
     ptau_path: str = PTAU_PATH,
+    mode: str = PUBLIC_MODE,
+    backend: str = BACKEND,
 ) -> None:
     """
-    Compile le circuit si nécessaire, réalise le setup Groth16 si besoin,
+    Compile le circuit si nécessaire, réalise le setup du backend si besoin,
     et exporte la verification key. Appelle _ensure_ptau() avant le setup.
+    Mémoïsé par processus : un pair longue durée ne refait pas ces vérifications.
     """
-    wasm = os.path.join(circuit_dir, "avg2_chunk_js", "avg2_chunk.wasm")
-    r1cs = os.path.join(circuit_dir, "avg2_chunk.r1cs")
-    zkey = os.path.join(circuit_dir, "avg2_chunk_final.zkey")
-    vkey = os.path.join(circuit_dir, "verification_key.json")
-    circom_file = os.path.join(circuit_dir, "avg2_chunk.circom")
+    if (circuit_dir, ptau_path, mode, backend) in _BUILT:
+        return
+    files = circuit_files(circuit_dir, mode, backend)
+    wasm, r1cs, zkey, vkey = files["wasm"], files["r1cs"], files["zkey"], files["vkey"]
+    circom_file = files["circom"]
 
     if not os.path.exists(circom_file):
         raise RuntimeError(f"[ZKP] Circuit introuvable: {circom_file}")
@@ -164,15 +273,166 @@ def _ensure_circuit_built(
     # S'assurer que le ptau est prêt (le générer si autorisé)
     _ensure_ptau(ptau_path)
 
-    # Compiler si wasm/r1cs manquent
-    if not (os.path.exists(wasm) and os.path.exists(r1cs)):
-        _run(f"circom {circom_file} --r1cs --wasm --sym -l /app/node_modules -o {circuit_dir}")
+    # Compiler si wasm/r1cs manquent (+ générateur de witness natif si demandé)
+    _ensure_compiled(files, circuit_dir)
+    if NATIVE_WITNESS == "1":
+        _ensure_native_built(files, circuit_dir)
 
-    # Setup Groth16 + vkey si besoin
+    # Setup (groth16 : propre au circuit ; plonk/fflonk : depuis le ptau universel) + vkey si besoin
     if not os.path.exists(zkey):
-        _run(f"snarkjs groth16 setup {r1cs} {ptau_path} {zkey}")
+        _setup(r1cs, ptau_path, zkey, backend)
     if not os.path.exists(vkey):
         _run(f"snarkjs zkey export verificationkey {zkey} {vkey}")
+    _BUILT.add((circuit_dir, ptau_path, mode, backend))
+
+
+def _ensure_compiled(files: Dict[str, str], circuit_dir: str = CIRCUIT_DIR) -> None:
+    """wasm + r1cs (communs à tous les backends)."""
+    if not (os.path.exists(files["wasm"]) and os.path.exists(files["r1cs"])):
+        _run(f"circom {files['circom']} --r1cs --wasm --sym -l {paths.NODE_MODULES} -o {circuit_dir}")
+
+
+def _ensure_native_built(files: Dict[str, str], circuit_dir: str = CIRCUIT_DIR) -> bool:
+    """
+    Générateur de witness C++ : circom --c puis make (gmp, nlohmann-json, nasm ; x86_64 uniquement).
+    Retourne False (repli wasm) si la chaîne de compilation manque ou échoue.
+    """
+    if os.path.exists(files["native"]):
+        return True
+    missing = [tool for tool in ("make", "g++") if shutil.which(tool) is None]
+    if missing:
+        print(f"[ZKP] Witness natif indisponible (outils manquants: {', '.join(missing)}) : repli wasm")
+        return False
+    try:
+        if not os.path.exists(os.path.join(files["cpp"], "Makefile")):
+            _run(f"circom {files['circom']} --c -l {paths.NODE_MODULES} -o {circuit_dir}")
+        _run(f"make -C {files['cpp']} -j{os.cpu_count() or 1}")
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"[ZKP] Compilation du witness natif impossible ({e}) : repli wasm")
+        return False
+    return os.path.exists(files["native"])
+
+
+def _setup(r1cs: str, ptau_path: str, zkey: str, backend: str = BACKEND) -> None:
+    _run(f"snarkjs {backend} setup {r1cs} {ptau_path} {zkey}")
+
+
+# -------------------------------
+# Étapes witness / prove / verify (worker chaud ou CLI)
+# -------------------------------
+def _witness(wasm: str, genw: str, inp: str, wtns: str) -> None:
+    if PROVER_WORKER:
+        get_prover_worker().call(cmd="witness", wasm=wasm, input=inp, wtns=wtns)
+    else:
+        _run(f"node {genw} {wasm} {inp} {wtns}")
+
+
+def _witness_native(native: str, inp: str, wtns: str) -> None:
+    # le binaire lit <binaire>.dat à côté de lui : chemin absolu requis
+    _run(f"{os.path.abspath(native)} {inp} {wtns}")
+
+
+def read_wtns(path: str) -> Tuple[int, bytes]:
+    """(premier du champ, valeurs du witness) d'un fichier .wtns (format binaire iden3)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != b"wtns":
+        raise RuntimeError(f"[ZKP] Fichier witness invalide: {path}")
+    sections, pos = {}, 12
+    for _ in range(int.from_bytes(data[8:12], "little")):
+        typ = int.from_bytes(data[pos:pos + 4], "little")
+        size = int.from_bytes(data[pos + 4:pos + 12], "little")
+        sections[typ] = data[pos + 12:pos + 12 + size]
+        pos += 12 + size
+    n8 = int.from_bytes(sections[1][:4], "little")
+    return int.from_bytes(sections[1][4:4 + n8], "little"), sections[2]
+
+
+_NATIVE_OK: Dict[str, bool] = {}   # binaire natif -> witness identiques au wasm (contrôlé une fois par processus)
+_NATIVE_LOCK = threading.Lock()
+
+
+def compare_witness(files: Dict[str, str], inp: str, wtns: str) -> Tuple[bool, float, float]:
+    """
+    Calcule le witness de `inp` avec le wasm puis avec le binaire natif (résultat natif dans `wtns`).
+    Retourne (witness identiques, ms wasm, ms natif).
+    """
+    ref = wtns + ".wasm"
+    try:
+        t0 = time.perf_counter()
+        _witness(files["wasm"], files["genw"], inp, ref)
+        t1 = time.perf_counter()
+        _witness_native(files["native"], inp, wtns)
+        t2 = time.perf_counter()
+        same = read_wtns(ref) == read_wtns(wtns)
+        if not same:
+            os.replace(ref, wtns)   # le witness wasm fait foi
+    finally:
+        if os.path.exists(ref):
+            os.remove(ref)
+    return same, 1000 * (t1 - t0), 1000 * (t2 - t1)
+
+
+def _witness_for(files: Dict[str, str], inp: str, wtns: str) -> None:
+    """
+    Witness natif s'il est compilé et validé, wasm sinon. Au premier usage du binaire dans le processus,
+    les deux calculateurs tournent sur le même input : witness comparés octet à octet et accélération affichée ;
+    en cas d'écart (ou d'échec du binaire), repli définitif sur le wasm.
+    """
+    native = files.get("native")
+    if NATIVE_WITNESS == "0" or not native or not os.path.exists(native) or _NATIVE_OK.get(native) is False:
+        _witness(files["wasm"], files["genw"], inp, wtns)
+        return
+    with _NATIVE_LOCK:
+        if native not in _NATIVE_OK:
+            try:
+                same, ms_wasm, ms_native = compare_witness(files, inp, wtns)
+            except Exception as e:
+                print(f"[ZKP] Witness natif en échec ({e}) : repli wasm")
+                _NATIVE_OK[native] = False
+                _witness(files["wasm"], files["genw"], inp, wtns)
+                return
+            _NATIVE_OK[native] = same
+            print(
+                f"[ZKP] Witness natif {'identique' if same else 'DIFFÉRENT (repli wasm)'} : "
+                f"wasm {ms_wasm:.0f} ms, natif {ms_native:.0f} ms (x{ms_wasm / max(ms_native, 1e-9):.1f})"
+            )
+            return
+    try:
+        _witness_native(native, inp, wtns)
+    except Exception as e:
+        print(f"[ZKP] Witness natif en échec ({e}) : repli wasm")
+        _NATIVE_OK[native] = False
+        _witness(files["wasm"], files["genw"], inp, wtns)
+
+
+def _prove(zkey: str, wtns: str, proof: str, publ: str, backend: str = BACKEND) -> None:
+    if PROVER_WORKER:
+        get_prover_worker().call(cmd="prove", backend=backend, zkey=zkey, wtns=wtns, proof=proof, public=publ)
+    else:
+        _run(f"snarkjs {backend} prove {zkey} {wtns} {proof} {publ}")
+
+
+def _verify(vkey: str, publ: str, proof: str, backend: str = BACKEND) -> None:
+    if PROVER_WORKER:
+        out = get_prover_worker().call(cmd="verify", backend=backend, vkey=vkey, public=publ, proof=proof)
+        if not out.get("verified"):
+            raise RuntimeError(f"[ZKP] Preuve invalide: {proof}")
+    else:
+        _run(f"snarkjs {backend} verify {vkey} {publ} {proof}")
+
+
+def warm_up(prove: Optional[bool] = None, circuit_dir: str = CIRCUIT_DIR, ptau_path: str = PTAU_PATH) -> None:
+    """
+    Préchauffe les workers du processus : Poseidon (toujours) et, si preuve activée,
+    circuit compilé + zkey/wasm/vkey chargés dans le worker snarkjs.
+    """
+    get_pool().warm_up()
+    if AUTOPROVE if prove is None else prove:
+        _ensure_circuit_built(circuit_dir, ptau_path)
+        if PROVER_WORKER:
+            files = circuit_files(circuit_dir)
+            get_prover_worker().call(cmd="load", zkey=files["zkey"], wasm=files["wasm"], vkey=files["vkey"])
 
 
 # -------------------------------
@@ -182,73 +442,152 @@ def prove_round_chunks(
     round_dir: str,
     circuit_dir: str = CIRCUIT_DIR,
     ptau_path: str = PTAU_PATH,
+    backend: str = BACKEND,
 ) -> int:
-    _ensure_circuit_built(circuit_dir, ptau_path)
-
-    wasm = os.path.join(circuit_dir, "avg2_chunk_js", "avg2_chunk.wasm")
-    genw = os.path.join(circuit_dir, "avg2_chunk_js", "generate_witness.js")
-    zkey = os.path.join(circuit_dir, "avg2_chunk_final.zkey")
-    vkey = os.path.join(circuit_dir, "verification_key.json")
-
-    # NOUVEAU: on lit inputs commités (avec merkle) + on injecte roots
     round_name = os.path.basename(os.path.normpath(round_dir))
-    commits_dir = os.path.join("/app/commits", round_name)
-    inputs_dir  = os.path.join(commits_dir, "inputs")
+    ledger = get_ledger()
+    input_files, publics = round_circuit_inputs(round_name)
+    # chunks non conformes écartés avant tout processus node (compilation, witness, preuve)
+    rejected = preflight_round(round_name, input_files, publics) if PREFLIGHT else {}
 
-    roots_path = os.path.join(commits_dir, "roots.json")
-    with open(roots_path) as f:
-        roots = json.load(f)
-    root_w1 = int(roots["root_w1"])
-    root_w2 = int(roots["root_w2"])
-
-    input_files = sorted(glob.glob(os.path.join(inputs_dir, "input_chunk_*.json")))
-    if not input_files:
-        raise RuntimeError(f"[ZKP] Aucun input_chunk_*.json dans {inputs_dir}")
+    _ensure_circuit_built(circuit_dir, ptau_path, backend=backend)
+    files = circuit_files(circuit_dir, backend=backend)
+    vkey = files["vkey"]
 
     done = 0
-    for inp in input_files:
-        k = os.path.splitext(os.path.basename(inp))[0].split("_")[-1]
-        wtns = os.path.join(round_dir, f"witness_{k}.wtns")
-        proof = os.path.join(round_dir, f"proof_{k}.json")
-        publ  = os.path.join(round_dir, f"public_{k}.json")
-
-        # Charger l'input enrichi et injecter les roots publiques
-        with open(inp) as f:
-            payload = json.load(f)
-        payload["root_w1"] = root_w1
-        payload["root_w2"] = root_w2
-        # chunkIndex est déjà dedans (ajouté lors du commit); sinon:
-        # payload.setdefault("chunkIndex", int(k))
-
-        # Écrire un input temporaire à passer au witness
-        tmp_inp = os.path.join(round_dir, f"_inp_{k}.json")
-        with open(tmp_inp, "w") as f:
-            json.dump(payload, f)
-
-        _run(f"node {genw} {wasm} {tmp_inp} {wtns}")
-        _run(f"snarkjs groth16 prove {zkey} {wtns} {proof} {publ}")
-        _run(f"snarkjs groth16 verify {vkey} {publ} {proof}")
-
-        os.remove(tmp_inp)
+    for k, inp in enumerate(input_files):
+        if k in rejected:
+            continue
+        proof, publ = prove_chunk(round_dir, k, inp, publics, files, backend)
+        _verify(vkey, publ, proof, backend)
+        ledger.add_artifacts(round_name, [
+            ("proof", k, proof, file_digest(proof)),
+            ("public", k, publ, file_digest(publ)),
+        ])
         done += 1
 
     return done
 
 
+def prove_chunk(
+    round_dir: str,
+    k: int,
+    inp: str,
+    publics: Dict[str, int],
+    files: Dict[str, str],
+    backend: str = BACKEND,
+    tag: str = "",
+) -> Tuple[str, str]:
+    """
+    witness -> prove d'un chunk. proof_k / public_k / witness_k sont écrits sous un nom
+    temporaire (suffixé par `tag`, ex: l'id du worker) puis renommés : un lecteur du volume
+    partagé ne voit jamais de preuve partielle, et deux workers ne s'écrasent pas en cours de route.
+    """
+    sfx = f".{tag}" if tag else ""
+    wtns  = os.path.join(round_dir, f"witness_{k}.wtns")
+    proof = os.path.join(round_dir, f"proof_{k}.json")
+    publ  = os.path.join(round_dir, f"public_{k}.json")
+    tmp_wtns, tmp_proof, tmp_publ = wtns + f"{sfx}.tmp", proof + f"{sfx}.tmp", publ + f"{sfx}.tmp"
+
+    tmp_inp = write_circuit_input(inp, publics, os.path.join(round_dir, f"_inp_{k}{sfx}.json"))
+    try:
+        _witness_for(files, tmp_inp, tmp_wtns)
+        _prove(files["zkey"], tmp_wtns, tmp_proof, tmp_publ, backend)
+        os.replace(tmp_wtns, wtns)
+        os.replace(tmp_publ, publ)
+        os.replace(tmp_proof, proof)
+    finally:
+        for path in (tmp_inp, tmp_wtns, tmp_proof, tmp_publ):
+            if os.path.exists(path):
+                os.remove(path)
+    return proof, publ
+
+
+def round_circuit_inputs(round_name: str) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Inputs commités (avec merkle) d'un round + signaux publics à injecter (roots).
+    Lus dans le ledger (O(1)), roots.json en repli.
+    """
+    info = get_ledger().get_round(round_name) or {}
+    commits_dir = info.get("commit_dir") or os.path.join(paths.COMMITS_DIR, round_name)
+    inputs_dir  = os.path.join(commits_dir, "inputs")
+
+    publics = {}
+    if PUBLIC_MODE == "full" and LEAF_HASH == LEAF_HASH_V1 and info.get("n_chunks") and info.get("root_w1") and info.get("root_w2"):
+        n_chunks = int(info["n_chunks"])
+        publics = {"root_w1": int(info["root_w1"]), "root_w2": int(info["root_w2"])}
+    else:
+        with open(os.path.join(commits_dir, "roots.json")) as f:
+            roots = json.load(f)
+        if roots.get("public_mode", "full") != PUBLIC_MODE:
+            raise RuntimeError(
+                f"[ZKP] {round_name} commité en mode '{roots.get('public_mode', 'full')}', "
+                f"ZKP_PUBLIC_MODE={PUBLIC_MODE} : recommiter le round"
+            )
+        if roots.get("leaf_hash", LEAF_HASH_V1) != LEAF_HASH:
+            raise RuntimeError(
+                f"[ZKP] {round_name} commité avec les feuilles '{roots.get('leaf_hash', LEAF_HASH_V1)}', "
+                f"ZKP_LEAF_HASH={LEAF_HASH} : recommiter le round"
+            )
+        n_chunks = int(roots["n_chunks"])
+        publics = {"root_w1": int(roots["root_w1"]), "root_w2": int(roots["root_w2"])}
+        if PUBLIC_MODE == "root":
+            publics["root_avg"] = int(roots["root_avg"])
+
+    input_files = [os.path.join(inputs_dir, f"input_chunk_{k}.json") for k in range(n_chunks)]
+    if not input_files or not os.path.exists(input_files[0]):
+        raise RuntimeError(f"[ZKP] Aucun input_chunk_*.json dans {inputs_dir}")
+    return input_files, publics
+
+
+def write_circuit_input(inp: str, publics: Dict[str, int], out: str) -> str:
+    """Input enrichi + roots publiques -> fichier passé au witness (chunkIndex déjà présent)."""
+    with open(inp) as f:
+        payload = json.load(f)
+    payload.update(publics)
+    with open(out, "w") as f:
+        json.dump(payload, f)
+    return out
+
+
 
 # -------------------------------
 # Point d'entrée unique: export + (optionnel) prove/verify
 # -------------------------------
-def export_and_maybe_prove(round_dir: str) -> None:
+def export_and_maybe_prove(round_dir: str, weights=None, client_commitments=None) -> None:
     """
-    Exporte les inputs en chunks à partir de clients.json/avg.json.
+    Exporte les inputs en chunks à partir des poids du round
+    (ou directement des tenseurs `weights` = (w1, w2, avg) du serveur).
+    client_commitments : engagements des 2 clients (fit metrics), contrôlés au lieu d'être recalculés.
     Si ZKP_AUTOPROVE=1, enchaîne sur witness → prove → verify.
     """
-    n = export_inputs_for_round(round_dir, DEFAULT_SCALE, DEFAULT_CHUNK)
-    on_round_proved(round_dir)
+    name = os.path.basename(os.path.normpath(round_dir))
+    ledger = get_ledger()
+    ledger.upsert_round(name, zkp_dir=os.path.abspath(round_dir))
+
+    t0 = time.perf_counter()
+    n = export_inputs_for_round(round_dir, DEFAULT_SCALE, DEFAULT_CHUNK, weights=weights)
+    t1 = time.perf_counter()
+    on_round_proved(round_dir, weights=weights, client_commitments=client_commitments)
+    t2 = time.perf_counter()
+    ledger.record_timing(name, "export", t1 - t0)
+    ledger.record_timing(name, "commit", t2 - t1)
+
     if AUTOPROVE:
-        c = prove_round_chunks(round_dir, CIRCUIT_DIR, PTAU_PATH)
-        print(f"[ZKP] Round {os.path.basename(round_dir)} : {c}/{n} chunks prouvés et vérifiés.")
+        ledger.upsert_round(name, proof_status="proving")
+        try:
+            if DISTRIBUTED:
+                # chunks mis en file : les clients inactifs prouvent en parallèle du serveur
+                from utils.prove_queue import prove_round_distributed
+                c = prove_round_distributed(round_dir, CIRCUIT_DIR, PTAU_PATH)
+            else:
+                c = prove_round_chunks(round_dir, CIRCUIT_DIR, PTAU_PATH)
+        except Exception:
+            ledger.upsert_round(name, proof_status="failed")
+            raise
+        ledger.upsert_round(name, proof_status="proved" if c == n else "partial")
+        ledger.record_timing(name, "prove", time.perf_counter() - t2)
+        print(f"[ZKP] Round {os.path.basename(round_dir)} : {c}/{n} chunks prouvés et vérifiés ({BACKEND}).")
     else:
         print(f"[ZKP] Round {os.path.basename(round_dir)} : {n} chunks exportés (AUTO_PROVE désactivé).")
 
@@ -256,6 +595,8 @@ def export_and_maybe_prove(round_dir: str) -> None:
 
 
 
-def on_round_proved(round_dir: str, commits_root: str = "/app/commits"):
-    out_dir = integrate_commitments_for_round(round_dir, commits_root=commits_root)
+def on_round_proved(round_dir: str, commits_root: Optional[str] = None, weights=None, client_commitments=None):
+    out_dir = integrate_commitments_for_round(
+        round_dir, commits_root=commits_root, weights=weights, client_commitments=client_commitments
+    )
     print(f"[Commitments] {os.path.basename(os.path.normpath(round_dir))} -> {out_dir}")
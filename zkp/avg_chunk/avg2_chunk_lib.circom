@@ -0,0 +1,235 @@
+pragma circom 2.1.6;
+
+// Templates partagés par les deux modes de publics :
+//  - avg2_chunk.circom      : w_avg_pub[CHUNK] publics (mode "full")
+//  - avg2_chunk_root.circom : moyenne privée, liée par la racine Merkle root_avg (mode "root")
+// et leurs variantes *_v2.circom (feuilles poseidon16-sponge-v2, paramètre LEAF = 2)
+
+include "circomlib/circuits/poseidon.circom";
+include "circomlib/circuits/bitify.circom";
+
+// Hash fold: acc = 1; for x in arr: acc = Poseidon([acc, x])
+template HashChunk(CHUNK) {
+    signal input arr[CHUNK];   // privés (field elements)
+    signal output out;         // leaf
+
+    component h[CHUNK];
+    signal accs[CHUNK + 1];
+    accs[0] <== 1;
+
+    for (var i = 0; i < CHUNK; i++) {
+        h[i] = Poseidon(2);
+        h[i].inputs[0] <== accs[i];
+        h[i].inputs[1] <== arr[i];
+        accs[i + 1] <== h[i].out;
+    }
+    out <== accs[CHUNK];
+}
+
+// Feuille "poseidon16-sponge-v2" : acc = CHUNK ; par bloc de 15 éléments (dernier complété par 0) :
+// acc = Poseidon([acc, x0..x14]) -> ceil(CHUNK/15) permutations de largeur 17 au lieu de CHUNK Poseidon(2)
+template HashChunkSponge16(CHUNK) {
+    var RATE = 15;
+    var NB = (CHUNK + RATE - 1) \ RATE;
+    signal input arr[CHUNK];   // privés
+    signal output out;         // leaf
+
+    component h[NB];
+    signal accs[NB + 1];
+    accs[0] <== CHUNK;
+
+    for (var b = 0; b < NB; b++) {
+        h[b] = Poseidon(RATE + 1);
+        h[b].inputs[0] <== accs[b];
+        for (var j = 0; j < RATE; j++) {
+            if (b * RATE + j < CHUNK) {
+                h[b].inputs[j + 1] <== arr[b * RATE + j];
+            } else {
+                h[b].inputs[j + 1] <== 0;
+            }
+        }
+        accs[b + 1] <== h[b].out;
+    }
+    out <== accs[NB];
+}
+
+// Convention de feuille choisie à la compilation : LEAF = 1 (poseidon2-fold-v1) | 2 (poseidon16-sponge-v2)
+template LeafHash(CHUNK, LEAF) {
+    signal input arr[CHUNK];
+    signal output out;
+
+    component h;
+    if (LEAF == 2) {
+        h = HashChunkSponge16(CHUNK);
+    } else {
+        h = HashChunk(CHUNK);
+    }
+    for (var i = 0; i < CHUNK; i++) {
+        h.arr[i] <== arr[i];
+    }
+    out <== h.out;
+}
+
+// Vérif Merkle (Poseidon arité 2), path privé
+// pathBits[i] ∈ {0,1}: 0 = (cur,sib), 1 = (sib,cur)
+template MerkleVerify(DEPTH) {
+    signal input leaf;                  // privé
+    signal input root_pub;              // PUBLIC
+    signal input siblings[DEPTH];       // privé
+    signal input pathBits[DEPTH];       // privé
+
+    // états intermédiaires
+    signal cur[DEPTH + 1];
+    signal left[DEPTH];
+    signal right[DEPTH];
+
+    // PRÉ-DÉCLARATION (pas dans la boucle)
+    component h[DEPTH];
+    signal deltaL[DEPTH];
+    signal tmpL[DEPTH];
+    signal deltaR[DEPTH];
+    signal tmpR[DEPTH];
+
+    // départ
+    cur[0] <== leaf;
+
+    for (var i = 0; i < DEPTH; i++) {
+        // bit ∈ {0,1}
+        pathBits[i] * (pathBits[i] - 1) === 0;
+
+        // left = cur + b*(sib - cur)
+        deltaL[i] <== siblings[i] - cur[i];
+        tmpL[i]   <== deltaL[i] * pathBits[i];
+        left[i]   <== cur[i] + tmpL[i];
+
+        // right = sib + b*(cur - sib)
+        deltaR[i] <== cur[i] - siblings[i];
+        tmpR[i]   <== deltaR[i] * pathBits[i];
+        right[i]  <== siblings[i] + tmpR[i];
+
+        // hash
+        h[i] = Poseidon(2);
+        h[i].inputs[0] <== left[i];
+        h[i].inputs[1] <== right[i];
+
+        cur[i + 1] <== h[i].out;
+    }
+
+    // égalité à la racine publique
+    cur[DEPTH] === root_pub;
+}
+
+// Avg + Commitments par chunk
+template Avg2ChunkCommit(CHUNK, DEPTH, LEAF) {
+    // --- Données avg ---
+    signal input w1[CHUNK];            // privés
+    signal input w2[CHUNK];            // privés
+    signal input w_avg_pub[CHUNK];     // PUBLICS
+
+    // --- Engagements (public roots + index; merkle path privé) ---
+    signal input root_w1;              // PUBLIC
+    signal input root_w2;              // PUBLIC
+    signal input chunkIndex;           // PUBLIC (utile dans les publics)
+    signal input siblings1[DEPTH];     // privés
+    signal input pathBits1[DEPTH];     // privés
+    signal input siblings2[DEPTH];     // privés
+    signal input pathBits2[DEPTH];     // privés
+
+    // 1) Contrainte moyenne (comme avant)
+    signal r[CHUNK];
+    for (var i = 0; i < CHUNK; i++) {
+        r[i] <== w1[i] + w2[i] - 2 * w_avg_pub[i];
+        r[i] * (r[i] - 1) === 0;  // r ∈ {0,1}
+    }
+
+    // 2) Hash fold des chunks
+    component hw1 = LeafHash(CHUNK, LEAF);
+    component hw2 = LeafHash(CHUNK, LEAF);
+    for (var j = 0; j < CHUNK; j++) {
+        hw1.arr[j] <== w1[j];
+        hw2.arr[j] <== w2[j];
+    }
+
+    // 3) Vérifs Merkle jusqu'aux racines publiques
+    component mv1 = MerkleVerify(DEPTH);
+    mv1.leaf <== hw1.out;
+    mv1.root_pub <== root_w1;
+    for (var k = 0; k < DEPTH; k++) {
+        mv1.siblings[k] <== siblings1[k];
+        mv1.pathBits[k]  <== pathBits1[k];
+    }
+
+    component mv2 = MerkleVerify(DEPTH);
+    mv2.leaf <== hw2.out;
+    mv2.root_pub <== root_w2;
+    for (var t = 0; t < DEPTH; t++) {
+        mv2.siblings[t] <== siblings2[t];
+        mv2.pathBits[t]  <== pathBits2[t];
+    }
+}
+
+
+// Variante "root" : la moyenne du chunk est privée et liée par un 3e arbre Merkle (root_avg).
+// Publics : root_w1, root_w2, root_avg, chunkIndex (4 signaux au lieu de CHUNK + 3).
+// Les trois chemins doivent correspondre aux bits de chunkIndex (même position dans les 3 arbres).
+template Avg2ChunkRootCommit(CHUNK, DEPTH, LEAF) {
+    signal input w1[CHUNK];            // privés
+    signal input w2[CHUNK];            // privés
+    signal input w_avg[CHUNK];         // privés
+
+    signal input root_w1;              // PUBLIC
+    signal input root_w2;              // PUBLIC
+    signal input root_avg;             // PUBLIC
+    signal input chunkIndex;           // PUBLIC
+    signal input siblings1[DEPTH];     // privés
+    signal input pathBits1[DEPTH];     // privés
+    signal input siblings2[DEPTH];     // privés
+    signal input pathBits2[DEPTH];     // privés
+    signal input siblingsAvg[DEPTH];   // privés
+    signal input pathBitsAvg[DEPTH];   // privés
+
+    // 1) Contrainte moyenne
+    signal r[CHUNK];
+    for (var i = 0; i < CHUNK; i++) {
+        r[i] <== w1[i] + w2[i] - 2 * w_avg[i];
+        r[i] * (r[i] - 1) === 0;  // r ∈ {0,1}
+    }
+
+    // 2) Hash fold des trois chunks
+    component hw1 = LeafHash(CHUNK, LEAF);
+    component hw2 = LeafHash(CHUNK, LEAF);
+    component hwa = LeafHash(CHUNK, LEAF);
+    for (var j = 0; j < CHUNK; j++) {
+        hw1.arr[j] <== w1[j];
+        hw2.arr[j] <== w2[j];
+        hwa.arr[j] <== w_avg[j];
+    }
+
+    // 3) Position : les chemins suivent les bits de chunkIndex
+    component idx = Num2Bits(DEPTH);
+    idx.in <== chunkIndex;
+    for (var b = 0; b < DEPTH; b++) {
+        pathBits1[b] === idx.out[b];
+        pathBits2[b] === idx.out[b];
+        pathBitsAvg[b] === idx.out[b];
+    }
+
+    // 4) Vérifs Merkle jusqu'aux racines publiques
+    component mv1 = MerkleVerify(DEPTH);
+    component mv2 = MerkleVerify(DEPTH);
+    component mva = MerkleVerify(DEPTH);
+    mv1.leaf <== hw1.out;
+    mv2.leaf <== hw2.out;
+    mva.leaf <== hwa.out;
+    mv1.root_pub <== root_w1;
+    mv2.root_pub <== root_w2;
+    mva.root_pub <== root_avg;
+    for (var k = 0; k < DEPTH; k++) {
+        mv1.siblings[k] <== siblings1[k];
+        mv1.pathBits[k] <== pathBits1[k];
+        mv2.siblings[k] <== siblings2[k];
+        mv2.pathBits[k] <== pathBits2[k];
+        mva.siblings[k] <== siblingsAvg[k];
+        mva.pathBits[k] <== pathBitsAvg[k];
+    }
+}
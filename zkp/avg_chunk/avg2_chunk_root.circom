@@ -0,0 +1,6 @@
+pragma circom 2.1.6;
+
+include "avg2_chunk_lib.circom";
+
+// Mode "root" (ZKP_PUBLIC_MODE=root) : 4 signaux publics par preuve
+component main { public [root_w1, root_w2, root_avg, chunkIndex] } = Avg2ChunkRootCommit(4096, 6, 1);
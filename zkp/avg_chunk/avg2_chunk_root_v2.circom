@@ -0,0 +1,6 @@
+pragma circom 2.1.6;
+
+include "avg2_chunk_lib.circom";
+
+// Mode "root" + feuilles "poseidon16-sponge-v2"
+component main { public [root_w1, root_w2, root_avg, chunkIndex] } = Avg2ChunkRootCommit(4096, 6, 2);
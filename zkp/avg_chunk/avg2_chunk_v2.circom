@@ -0,0 +1,6 @@
+pragma circom 2.1.6;
+
+include "avg2_chunk_lib.circom";
+
+// Feuilles "poseidon16-sponge-v2" (ZKP_LEAF_HASH=poseidon16-sponge-v2), w_avg_pub publics
+component main { public [w_avg_pub, root_w1, root_w2, chunkIndex] } = Avg2ChunkCommit(4096, 6, 2);
@@ -2,12 +2,22 @@
 // Usage :
 //   node zkp/poseidon_hash.js '[1,2,3]'           // ok tableaux courts
 //   echo '[1,2,3]' | node zkp/poseidon_hash.js
+//   node zkp/poseidon_hash.js --serve             // worker persistant (voir serve())
+//   node zkp/poseidon_hash.js --scheme=poseidon16-sponge-v2 '[1,2,3]'
 //
-// Conventions :
-// - Si la longueur == 2  -> appel direct poseidon([a,b]) (hash de nœud Merkle)
-// - Sinon (longueur != 2)-> pliage : acc=1 ; pour x : acc = poseidon([acc, x])
+// Conventions (scheme) :
+// - "poseidon2-fold-v1" (défaut) :
+//     longueur == 2  -> appel direct poseidon([a,b]) (hash de nœud Merkle)
+//     sinon          -> pliage : acc=1 ; pour x : acc = poseidon([acc, x])
+// - "poseidon16-sponge-v2" (feuilles de chunk) :
+//     acc = longueur ; par bloc de 15 éléments (dernier bloc complété par des 0) :
+//     acc = poseidon([acc, x0..x14])  -> une permutation de largeur 17 pour 15 éléments
 // - Tous les entiers sont réduits modulo p (support des négatifs)
 
+const SCHEME_V1 = "poseidon2-fold-v1";
+const SCHEME_V2 = "poseidon16-sponge-v2";
+const RATE_V2 = 15;
+
 function parseInput(str) {
   const s = (str || "").trim();
   if (!s) return null;
@@ -25,12 +35,77 @@ async function readFromStdin() {
   });
 }
 
+function normalize(raw, p) {
+  return raw.map((x) => ((BigInt(x) % p) + p) % p);
+}
+
+function spongeHash16(poseidon, arr) {
+  let acc = BigInt(arr.length);
+  for (let i = 0; i < arr.length; i += RATE_V2) {
+    const block = arr.slice(i, i + RATE_V2);
+    while (block.length < RATE_V2) block.push(0n);
+    acc = poseidon([acc, ...block]);
+  }
+  return acc;
+}
+
+function hashArray(poseidon, arr, scheme = SCHEME_V1) {
+  if (scheme === SCHEME_V2) return spongeHash16(poseidon, arr);
+  if (scheme !== SCHEME_V1) throw new Error(`Unknown scheme: ${scheme}`);
+  if (arr.length === 2) {
+    // cas "nœud Merkle" : hash direct de 2 éléments
+    return poseidon(arr);
+  }
+  // cas "feuille chunk" (ou tailles ≠ 2) : pliage à arité 2 avec acc=1
+  let acc = 1n;
+  for (const x of arr) {
+    acc = poseidon([acc, x]);
+  }
+  return acc;
+}
+
+// Worker persistant : une requête JSON par ligne sur stdin, une réponse par ligne sur stdout.
+//   requête  : [[a0,a1,...], [b0,b1], ...]   (lot de tableaux à hacher, scheme v1)
+//           ou {"scheme": "poseidon16-sponge-v2", "arrays": [[...], ...]}
+//   réponse  : ["h(a)", "h(b)", ...]         ou {"error": "..."}
+// Évite de relancer node + reconstruire Poseidon (~1 s) à chaque hash.
+async function serve(poseidon) {
+  const F = poseidon.F;
+  const p = F.p;
+  const readline = require("readline");
+  const rl = readline.createInterface({ input: process.stdin, terminal: false });
+  for await (const line of rl) {
+    if (!line.trim()) continue;
+    let out;
+    try {
+      const req = JSON.parse(line);
+      const batch = Array.isArray(req) ? req : req.arrays;
+      const scheme = Array.isArray(req) ? SCHEME_V1 : req.scheme || SCHEME_V1;
+      if (!Array.isArray(batch)) throw new Error("Batch must be a JSON array of arrays");
+      out = batch.map((arr) => F.toString(hashArray(poseidon, normalize(arr, p), scheme)));
+    } catch (e) {
+      out = { error: String(e.message || e) };
+    }
+    process.stdout.write(JSON.stringify(out) + "\n");
+  }
+}
+
 async function main() {
 
   const { buildPoseidon } = await import("circomlibjs");
-  
+
+  if (process.argv[2] === "--serve") {
+    await serve(await buildPoseidon());
+    return;
+  }
+
+  const args = process.argv.slice(2);
+  const schemeArg = args.find((a) => a.startsWith("--scheme="));
+  const scheme = schemeArg ? schemeArg.slice("--scheme=".length) : SCHEME_V1;
+  const positional = args.filter((a) => !a.startsWith("--"));
+
   let inputJson = !process.stdin.isTTY ? await readFromStdin() : "";
-  if (!inputJson || inputJson.trim() === "") inputJson = process.argv[2] || "";
+  if (!inputJson || inputJson.trim() === "") inputJson = positional[0] || "";
 
   if (!inputJson || inputJson.trim() === "") {
     console.error("Usage: echo '[1,2,3]' | node zkp/poseidon_hash.js");
@@ -43,21 +118,8 @@ async function main() {
   const p = F.p;
 
   // normalise les entiers (support des négatifs)
-  const raw = parseInput(inputJson);
-  const arr = raw.map((x) => ((x % p) + p) % p);
-
-  let out;
-  if (arr.length === 2) {
-    // cas "nœud Merkle" : hash direct de 2 éléments
-    out = poseidon(arr);
-  } else {
-    // cas "feuille chunk" (ou tailles ≠ 2) : pliage à arité 2 avec acc=1
-    let acc = 1n;
-    for (const x of arr) {
-      acc = poseidon([acc, x]);
-    }
-    out = acc;
-  }
+  const arr = normalize(parseInput(inputJson), p);
+  const out = hashArray(poseidon, arr, scheme);
 
   process.stdout.write(F.toString(out) + "\n");
 }
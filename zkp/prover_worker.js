@@ -0,0 +1,93 @@
+// zkp/prover_worker.js
+// Worker snarkjs persistant : snarkjs est chargé une fois, et les zkey / wasm / vkey
+// restent en mémoire entre les chunks, les rounds et les sessions.
+//
+// Usage : node zkp/prover_worker.js
+//   Une requête JSON par ligne sur stdin, une réponse JSON par ligne sur stdout.
+//   {"cmd":"witness", "wasm":..., "input":..., "wtns":...}
+//   {"cmd":"prove",   "zkey":..., "wtns":..., "proof":..., "public":...}   // + "backend": groth16 (défaut) | plonk | fflonk
+//   {"cmd":"verify",  "vkey":..., "public":..., "proof":...}
+//   {"cmd":"load",    "zkey":..., "wasm":..., "vkey":...}     // préchargement
+//   réponse : {"ok":true, "ms":..., ...} ou {"ok":false, "error":"..."}
+
+const fs = require("fs");
+const readline = require("readline");
+
+// cache: chemin -> { mtimeMs, data }
+const cache = new Map();
+
+function cached(path, loader) {
+  const st = fs.statSync(path);
+  const hit = cache.get(path);
+  if (hit && hit.mtimeMs === st.mtimeMs) return hit.data;
+  const data = loader(path);
+  cache.set(path, { mtimeMs: st.mtimeMs, data });
+  return data;
+}
+
+const memFile = (path) => cached(path, (p) => ({ type: "mem", data: new Uint8Array(fs.readFileSync(p)) }));
+const jsonFile = (path) => cached(path, (p) => JSON.parse(fs.readFileSync(p, "utf8")));
+
+function writeAtomic(path, obj) {
+  const tmp = `${path}.tmp`;
+  fs.writeFileSync(tmp, JSON.stringify(obj));
+  fs.renameSync(tmp, path);
+}
+
+async function handle(snarkjs, req) {
+  const proto = req.backend || "groth16";
+  switch (req.cmd) {
+    case "load":
+      if (req.zkey) memFile(req.zkey);
+      if (req.wasm) memFile(req.wasm);
+      if (req.vkey) jsonFile(req.vkey);
+      return {};
+    case "witness": {
+      const input = JSON.parse(fs.readFileSync(req.input, "utf8"));
+      await snarkjs.wtns.calculate(input, memFile(req.wasm), req.wtns);
+      return {};
+    }
+    case "prove": {
+      const { proof, publicSignals } = await snarkjs[proto].prove(memFile(req.zkey), req.wtns);
+      writeAtomic(req.proof, proof);
+      writeAtomic(req.public, publicSignals);
+      return {};
+    }
+    case "verify": {
+      const ok = await snarkjs[proto].verify(
+        jsonFile(req.vkey),
+        JSON.parse(fs.readFileSync(req.public, "utf8")),
+        JSON.parse(fs.readFileSync(req.proof, "utf8"))
+      );
+      return { verified: ok };
+    }
+    default:
+      throw new Error(`Unknown cmd: ${req.cmd}`);
+  }
+}
+
+async function main() {
+  const snarkjs = await import("snarkjs");
+  const rl = readline.createInterface({ input: process.stdin, terminal: false });
+  for await (const line of rl) {
+    if (!line.trim()) continue;
+    const t0 = Date.now();
+    let out;
+    try {
+      const req = JSON.parse(line);
+      out = { ok: true, ...(await handle(snarkjs, req)) };
+    } catch (e) {
+      out = { ok: false, error: String((e && e.message) || e) };
+    }
+    out.ms = Date.now() - t0;
+    process.stdout.write(JSON.stringify(out) + "\n");
+  }
+  // libère les threads ffjavascript (curve workers)
+  if (globalThis.curve_bn128) await globalThis.curve_bn128.terminate();
+  process.exit(0);
+}
+
+main().catch((e) => {
+  console.error("[prover_worker] Error:", e.message || e);
+  process.exit(1);
+});